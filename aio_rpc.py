@@ -0,0 +1,317 @@
+# aio_rpc.py – asyncio XML-RPC over HTTP/1.1: a server front end and a non-blocking client
+import asyncio, struct, time
+import xmlrpc.client
+import binrpc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from urllib.parse import urlsplit
+from rpc_metrics import default_metrics, method_label, PROMETHEUS
+from rpc_pool import RPC_TIMEOUT, MAX_PER_HOST, BINARY_RPC, _binary_hosts
+from rpc_server import OVERLOAD_FAULT, LISTEN_BACKLOG, IDLE_SECS
+from broadcast import BroadcastReport, TargetResult, STRAGGLER_SECS
+from longpoll import Parked, allow_parking
+
+WORKERS = 32         # threads for blocking handlers
+MAX_PENDING = 4096   # blocking calls waiting for a thread before new ones get OVERLOAD_FAULT
+MAX_HEADER = 64 * 1024
+RPC_PATHS = ("/", "/RPC2")
+
+def _response(status, body=b"", content_type="text/xml", close=False):
+    head = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"{binrpc.NEGOTIATE_HEADER}: 1\r\n")
+    if close: head += "Connection: close\r\n"
+    return head.encode() + b"\r\n" + body
+
+def _fault(code, msg):
+    return xmlrpc.client.dumps(xmlrpc.client.Fault(code, msg), methodresponse=True, allow_none=True).encode()
+
+# ---------------- server ----------------
+class AsyncXMLRPCServer:
+    """
+    Same wire format as SimpleXMLRPCServer, but every connection is a
+    coroutine, so idle keep-alive clients cost a socket and a few KB rather
+    than a thread. Handlers registered with inline=True (non-blocking ones,
+    and coroutine functions) run on the event loop; the rest run on a
+    `workers`-thread pool, and once `max_pending` of those are waiting new
+    calls are refused with OVERLOAD_FAULT.
+    """
+    def __init__(self, host, port, workers=WORKERS, max_pending=MAX_PENDING, allow_none=True):
+        self.host, self.port = host, port
+        self.allow_none = allow_none
+        self.max_pending = max_pending
+        self._funcs: Dict[str, tuple] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aio-rpc", initializer=allow_parking)
+        self._pending = 0
+        self.connections = 0
+        self.rejected = 0
+        self.register_function(default_metrics.snapshot, "get_metrics", inline=True)
+        self.register_function(lambda: sorted(self._funcs), "system.listMethods", inline=True)
+
+    def register_function(self, fn, name=None, inline=False):
+        self._funcs[name or fn.__name__] = (fn, inline or asyncio.iscoroutinefunction(fn))
+
+    async def _call(self, method, params):
+        entry = self._funcs.get(method)
+        if entry is None:
+            raise Exception(f'method "{method}" is not supported')
+        fn, inline = entry
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(*params)
+            if inline:
+                return fn(*params)
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                default_metrics.observe_rejected()
+                raise xmlrpc.client.Fault(OVERLOAD_FAULT, "server overloaded; retry later")
+            self._pending += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *params)
+            finally:
+                self._pending -= 1
+        except Parked as p:
+            # long poll (longpoll.py): wait as a coroutine, not on a thread
+            await p.watch.wait_async(p.generation, p.timeout)
+            return p.reply()
+
+    async def _dispatch(self, body):
+        try:
+            params, method = xmlrpc.client.loads(body)
+        except Exception as e:
+            return _fault(1, f"{type(e)}:{e}")
+        name = method_label(method, self._funcs)
+        default_metrics.call_started(name)
+        t, ok = time.perf_counter(), False
+        try:
+            result = await self._call(method, params)
+            out = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=self.allow_none).encode()
+            ok = True
+            return out
+        except xmlrpc.client.Fault as f:
+            return _fault(f.faultCode, f.faultString)
+        except Exception as e:
+            return _fault(1, f"{type(e)}:{e}")
+        finally:
+            default_metrics.call_finished(name, time.perf_counter() - t, ok)
+
+    async def _dispatch_binary(self, payload):
+        try:
+            method, params = payload
+        except (TypeError, ValueError):
+            return binrpc.fault_reply(1, "malformed binary RPC request")
+        name = method_label(method, self._funcs)
+        default_metrics.call_started(name)
+        t, ok = time.perf_counter(), False
+        try:
+            out = binrpc.reply(await self._call(method, tuple(params)))
+            ok = True
+            return out
+        except xmlrpc.client.Fault as f:
+            return binrpc.fault_reply(f.faultCode, f.faultString)
+        except Exception as e:
+            return binrpc.fault_reply(1, f"{type(e)}:{e}")
+        finally:
+            default_metrics.call_finished(name, time.perf_counter() - t, ok)
+
+    async def _serve_conn(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    first = await asyncio.wait_for(reader.readexactly(1), IDLE_SECS)
+                    if first == binrpc.FRAME_MARK:
+                        # binrpc frame (see binrpc.py) instead of an HTTP request
+                        (n,) = struct.unpack(">I", await reader.readexactly(4))
+                        if n > binrpc.MAX_FRAME:
+                            return
+                        writer.write(await self._dispatch_binary(binrpc.loads(await reader.readexactly(n))))
+                        await writer.drain()
+                        continue
+                    head = first + await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_SECS)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError,
+                        ConnectionError, ValueError, IndexError, struct.error):
+                    return  # binrpc.loads raises the last three on a malformed or truncated frame
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    verb, path, version = lines[0].split(" ", 2)
+                except ValueError:
+                    writer.write(_response("400 Bad Request", close=True))
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    k, sep, v = line.partition(":")
+                    if sep: headers[k.strip().lower()] = v.strip()
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                path = path.split("?")[0]
+                if verb == "GET" and PROMETHEUS and path == "/metrics":
+                    writer.write(_response("200 OK", default_metrics.prometheus().encode(),
+                                           "text/plain; version=0.0.4", close))
+                elif verb != "POST" or path not in RPC_PATHS:
+                    body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                    writer.write(_response("404 Not Found", b"No such page", "text/plain", close))
+                elif "content-length" not in headers:
+                    writer.write(_response("411 Length Required", close=True))
+                    return
+                else:
+                    body = await reader.readexactly(int(headers["content-length"]))
+                    writer.write(_response("200 OK", await self._dispatch(body), close=close))
+                await writer.drain()
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve_forever(self):
+        allow_parking()  # inline handlers run on this thread
+        srv = await asyncio.start_server(self._serve_conn, self.host, self.port, backlog=LISTEN_BACKLOG,
+                                         limit=MAX_HEADER, reuse_address=True)
+        async with srv:
+            await srv.serve_forever()
+
+# ---------------- client ----------------
+class AsyncConnectionPool:
+    """Idle keep-alive (reader, writer) pairs per "host:port", at most `max_per_host` open."""
+    def __init__(self, max_per_host=MAX_PER_HOST):
+        self.max_per_host = max_per_host
+        self._idle: Dict[str, list] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+
+    def slot(self, host):
+        s = self._slots.get(host)
+        if s is None:
+            s = self._slots[host] = asyncio.Semaphore(self.max_per_host)
+        return s
+
+    async def connect(self, host):
+        """Return (reader, writer, reused); call inside `async with pool.slot(host)`."""
+        idle = self._idle.setdefault(host, [])
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        name, _, port = host.partition(":")
+        reader, writer = await asyncio.open_connection(name, int(port or 80))
+        return reader, writer, False
+
+    def release(self, host, reader, writer):
+        self._idle.setdefault(host, []).append((reader, writer))
+
+default_async_pool = AsyncConnectionPool()
+
+class AsyncServerProxy:
+    """`await AsyncServerProxy(url).method(*args)` – XML-RPC without blocking the event loop."""
+    def __init__(self, url, timeout=RPC_TIMEOUT, pool=None):
+        u = urlsplit(url)
+        self._host, self._path = u.netloc, u.path or "/"
+        self._timeout = timeout
+        self._pool = pool or default_async_pool
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args: self.call(name, *args)
+
+    async def call(self, method, *args):
+        t, ok = time.perf_counter(), False
+        try:
+            result = await asyncio.wait_for(self._request(method, args), self._timeout)
+            ok = True
+            return result
+        finally:
+            default_metrics.observe_outbound(self._host, time.perf_counter() - t, ok)
+
+    async def _request(self, method, args):
+        if BINARY_RPC and _binary_hosts.get(self._host):
+            return await self._binary_request(method, args)
+        body = xmlrpc.client.dumps(args, method, allow_none=True).encode()
+        req = (f"POST {self._path} HTTP/1.1\r\nHost: {self._host}\r\nContent-Type: text/xml\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+        async with self._pool.slot(self._host):
+            for attempt in (0, 1):
+                reader, writer, reused = await self._pool.connect(self._host)
+                try:
+                    writer.write(req)
+                    await writer.drain()
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue  # the peer dropped an idle connection
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                lines = head.decode("latin-1").split("\r\n")
+                status = int(lines[0].split(" ", 2)[1])
+                headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+                try:
+                    data = await reader.readexactly(int(headers.get("content-length", 0)))
+                except BaseException:
+                    writer.close()
+                    raise
+                if headers.get("connection", "").lower() == "close":
+                    writer.close()
+                else:
+                    self._pool.release(self._host, reader, writer)
+                if status != 200:
+                    raise xmlrpc.client.ProtocolError(self._host + self._path, status, lines[0], headers)
+                if binrpc.NEGOTIATE_HEADER.lower() in headers:
+                    _binary_hosts[self._host] = True
+                return xmlrpc.client.loads(data, use_builtin_types=False)[0][0]
+
+    async def _binary_request(self, method, args):
+        req = binrpc.request(method, args)
+        async with self._pool.slot(self._host):
+            for attempt in (0, 1):
+                reader, writer, reused = await self._pool.connect(self._host)
+                try:
+                    writer.write(req)
+                    await writer.drain()
+                    mark, n = binrpc.HEADER.unpack(await reader.readexactly(binrpc.HEADER.size))
+                    if mark != binrpc.FRAME_MARK:
+                        raise ValueError("not a binary RPC frame")
+                    resp = binrpc.loads(await reader.readexactly(n))
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                self._pool.release(self._host, reader, writer)
+                return binrpc.result_of(resp)
+
+# ---------------- fan-out ----------------
+async def async_broadcast(targets, method, *args, timeout=RPC_TIMEOUT, straggler_secs=STRAGGLER_SECS):
+    """Concurrent `method(*args)` on {target: url}; returns a broadcast.BroadcastReport."""
+    t0 = time.perf_counter()
+
+    async def one(target, url):
+        t = time.perf_counter()
+        try:
+            value = await AsyncServerProxy(url, timeout).call(method, *args)
+            return TargetResult(target, True, value, None, time.perf_counter() - t)
+        except Exception as e:
+            return TargetResult(target, False, None, str(e) or type(e).__name__, time.perf_counter() - t)
+
+    targets = dict(targets)
+    results = await asyncio.gather(*(one(t, u) for t, u in targets.items()))
+    return BroadcastReport(method, {r.target: r for r in results}, time.perf_counter() - t0, straggler_secs)
+
+class AsyncBroadcaster:
+    """broadcast.Broadcaster's interface for threaded callers, with the fan-out running on `loop`."""
+    def __init__(self, loop, straggler_secs=STRAGGLER_SECS):
+        self.loop = loop
+        self.straggler_secs = straggler_secs
+
+    def send_async(self, targets, method, *args, timeout=RPC_TIMEOUT):
+        return asyncio.run_coroutine_threadsafe(
+            async_broadcast(dict(targets), method, *args, timeout=timeout, straggler_secs=self.straggler_secs), self.loop)
+
+    def send(self, targets, method, *args, timeout=RPC_TIMEOUT):
+        return self.send_async(targets, method, *args, timeout=timeout).result()
@@ -0,0 +1,115 @@
+# backend_pool.py – health-checked pool of backup servers with load-aware routing
+import random, threading, time
+from typing import List
+from rpc_pool import proxy, RPC_TIMEOUT
+
+HEALTH_INTERVAL = 2.0  # seconds between ping rounds
+HEALTH_TIMEOUT = 1.0
+
+class Backend:
+    __slots__ = ("url", "healthy", "in_flight", "outstanding", "sent", "failures", "last_ok")
+    def __init__(self, url):
+        self.url = url
+        self.healthy = True  # optimistic until the first ping says otherwise
+        self.in_flight = 0    # calls currently on the wire
+        self.outstanding = 0  # accepted jobs whose result has not come back yet
+        self.sent = 0
+        self.failures = 0
+        self.last_ok = 0.0
+
+class NoBackendAvailable(Exception):
+    pass
+
+class BackendPool:
+    """
+    Routes calls across several backup_server instances. Backends are pinged
+    every `interval` seconds; a failed call or ping takes a backend out of
+    rotation until it answers a ping again. `policy` is "p2c" (power of two
+    random choices, fewer in-flight wins) or "least" (least outstanding).
+    """
+    def __init__(self, urls: List[str], policy="p2c", interval=HEALTH_INTERVAL):
+        self.backends = [Backend(u) for u in urls]
+        self.policy = policy
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checker = None
+
+    def start_health_checks(self):
+        if self._checker is None:
+            self._checker = threading.Thread(target=self._check_loop, name="backend-health", daemon=True)
+            self._checker.start()
+        return self
+
+    def _check_loop(self):
+        while True:
+            for b in self.backends:
+                try:
+                    proxy(b.url, HEALTH_TIMEOUT).ping()
+                    ok = True
+                except Exception:
+                    ok = False
+                with self._lock:
+                    if ok != b.healthy:
+                        print(f"[Backends] {b.url} is {'UP' if ok else 'DOWN'}")
+                    b.healthy = ok
+                    if ok: b.last_ok = time.time()
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _load(b):
+        return b.in_flight + b.outstanding
+
+    def _pick(self, exclude):
+        live = [b for b in self.backends if b.healthy and b.url not in exclude]
+        if not live:
+            return None
+        if self.policy == "least" or len(live) < 3:
+            return min(live, key=self._load)
+        a, b = random.sample(live, 2)
+        return a if self._load(a) <= self._load(b) else b
+
+    def call(self, method, *args, attempts=2, timeout=RPC_TIMEOUT, track=False):
+        """
+        Call `method` on the best backend, retrying on alternates; returns (url, result).
+        With track=True the backend counts one outstanding job until complete(url).
+        """
+        tried = set()
+        last_error = None
+        for _ in range(attempts):
+            with self._lock:
+                b = self._pick(tried)
+                if b is None:
+                    break
+                b.in_flight += 1
+                b.sent += 1
+            tried.add(b.url)
+            try:
+                result = getattr(proxy(b.url, timeout), method)(*args)
+                if track:
+                    with self._lock: b.outstanding += 1
+                return b.url, result
+            except Exception as e:
+                last_error = e
+                with self._lock:
+                    b.failures += 1
+                    b.healthy = False  # until the next successful ping
+                print(f"[Backends] {method} failed on {b.url}: {e}")
+            finally:
+                with self._lock:
+                    b.in_flight -= 1
+        raise NoBackendAvailable(f"{method}: no healthy backend accepted the call (last error: {last_error})")
+
+    def complete(self, url):
+        with self._lock:
+            for b in self.backends:
+                if b.url == url and b.outstanding > 0:
+                    b.outstanding -= 1
+
+    def is_healthy(self, url):
+        with self._lock:
+            return any(b.url == url and b.healthy for b in self.backends)
+
+    def status(self):
+        with self._lock:
+            return [{"url": b.url, "healthy": b.healthy, "in_flight": b.in_flight,
+                     "outstanding": b.outstanding, "sent": b.sent, "failures": b.failures} for b in self.backends]
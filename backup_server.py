@@ -1,37 +1,110 @@
 # backup_server.py – receives forwarded MCQ submissions
-import time, datetime
-from xmlrpc.server import SimpleXMLRPCServer
-from socketserver import ThreadingMixIn
+import sys, time, datetime, threading, itertools
 import xmlrpc.client
+from rpc_pool import proxy, KeepAliveRequestHandler
+from rpc_server import PooledXMLRPCServer
+from scoring import apply_penalty, compute_score, sheet_to_dict
+from work_queue import WorkQueue
 
 MCQ_QUESTIONS={1:{"answer":2},2:{"answer":2},3:{"answer":2},4:{"answer":3},5:{"answer":2},
 6:{"answer":2},7:{"answer":4},8:{"answer":3},9:{"answer":3},10:{"answer":2}}
 MAIN_SERVER="http://127.0.0.1:9000/"
-
-class ThreadingXMLRPCServer(ThreadingMixIn,SimpleXMLRPCServer):daemon_threads=True
+BACKUP_PORT=9010
+BACKUP_WORKERS=4
+PROCESSING_SECS=1.5
+DELIVERY_INTERVAL=0.25  # results are pushed to the main server in batches this often
+RPC_WORKERS=8  # threads serving RPCs; calls only enqueue jobs, so a few suffice
+DELIVERED_TTL=60.0  # delivered jobs are forgotten after this long; get_job_status then says "expired"
 
 def _compute(answers,flags):
-    raw=0
-    for qnum,qdef in MCQ_QUESTIONS.items():
-        if int(answers.get(qnum,0)or 0)==qdef["answer"]:raw+=10
-    if flags>=2:final=0
-    elif flags==1:final=int(raw*0.8)
-    else:final=raw
-    return raw,final
+    # the main server forwards the student's running raw score, so only the penalty is left to apply;
+    # older servers sent an answer sheet (Binary, one byte per question) or {qnum: ans} with string keys
+    if isinstance(answers,int): return answers,apply_penalty(answers,flags)
+    if isinstance(answers,xmlrpc.client.Binary): answers=answers.data
+    if isinstance(answers,bytes): answers=sheet_to_dict(answers,sorted(MCQ_QUESTIONS))
+    return compute_score({int(k):v for k,v in answers.items()},flags,MCQ_QUESTIONS)
+
+# job_id -> {"roll","state":"queued|running|done|delivered","final"}; delivered ones leave after DELIVERED_TTL
+jobs={}
+jobs_lock=threading.Lock()
+_job_ids=itertools.count(1)
+_boot=int(time.time())  # keeps job ids unique across backup restarts
+outbox=[]  # finished jobs waiting to be delivered to the main server
+outbox_ready=threading.Event()
+
+def _process(job_id):
+    with jobs_lock:
+        job=jobs[job_id];job["state"]="running"
+    time.sleep(PROCESSING_SECS)
+    raw,final=_compute(job.pop("answers") or {},int(job.pop("flags") or 0))
+    print(f"[Backup] done roll {job['roll']} final={final}")
+    with jobs_lock:
+        job["final"]=int(final);job["state"]="done"
+        outbox.append({"job_id":job_id,"roll":job["roll"],"final":int(final)})
+    outbox_ready.set()
+
+work=WorkQueue(_process,workers=BACKUP_WORKERS,expected_service=PROCESSING_SECS,name="backup")
+
+def _deliver_loop():
+    # one backup_results_bulk call per batch over the pooled connection
+    main=proxy(MAIN_SERVER)
+    while True:
+        outbox_ready.wait()
+        time.sleep(DELIVERY_INTERVAL)
+        with jobs_lock:
+            batch=outbox[:];outbox.clear();outbox_ready.clear()
+        try:
+            main.backup_results_bulk(batch)
+            with jobs_lock:
+                now=time.monotonic()
+                for r in batch: jobs[r["job_id"]].update(state="delivered",delivered_at=now)
+                _evict_delivered(now)
+            print(f"[Backup] delivered {len(batch)} result(s) to main")
+        except Exception as e:
+            print(f"[Backup] could not deliver {len(batch)} result(s): {e}; will retry")
+            with jobs_lock:
+                outbox[:0]=batch;outbox_ready.set()
+            time.sleep(1.0)
+
+def _evict_delivered(now):
+    # caller holds jobs_lock; the main server acknowledged these results, so only a late status poll could want them
+    for job_id in [j for j,job in jobs.items() if now-job.get("delivered_at",now)>DELIVERED_TTL]:
+        del jobs[job_id]
 
 def process_forwarded_submission(roll,answers,flags):
-    print(f"[Backup] got forwarded roll {roll}")
-    time.sleep(1.5)
-    raw,final=_compute(answers or {},int(flags or 0))
-    print(f"[Backup] done roll {roll} final={final} -> notify main")
-    xmlrpc.client.ServerProxy(MAIN_SERVER,allow_none=True).backup_result(str(roll),int(final))
+    """Accept a forwarded roll and return its job id at once; the result is pushed back later."""
+    job_id=f"{BACKUP_PORT}-{_boot}-{next(_job_ids)}"
+    with jobs_lock:
+        jobs[job_id]={"roll":str(roll),"state":"queued","final":None,"answers":answers,"flags":flags}
+    if not work.submit(job_id):
+        with jobs_lock: del jobs[job_id]
+        raise RuntimeError("backup queue full")
+    print(f"[Backup] accepted roll {roll} as job {job_id}")
+    return job_id
+
+def get_job_status(job_id):
+    with jobs_lock:
+        job=jobs.get(str(job_id))
+        if job is None:
+            # one of ours (this port, this boot) that is gone was delivered and evicted; anything else we never had
+            mine=str(job_id).startswith(f"{BACKUP_PORT}-{_boot}-")
+            return {"job_id":str(job_id),"state":"expired" if mine else "unknown"}
+        return {"job_id":str(job_id),"roll":job["roll"],"state":job["state"],"final":job["final"]}
+
+def ping():
     return True
 
-def run_backup():
-    srv=ThreadingXMLRPCServer(("0.0.0.0",9010),allow_none=True,logRequests=False)
+def run_backup(port=BACKUP_PORT):
+    global BACKUP_PORT
+    BACKUP_PORT=port
+    threading.Thread(target=_deliver_loop,daemon=True).start()
+    srv=PooledXMLRPCServer(("0.0.0.0",port),requestHandler=KeepAliveRequestHandler,workers=RPC_WORKERS,allow_none=True,logRequests=False)
     srv.register_function(process_forwarded_submission,"process_forwarded_submission")
-    print("[Backup] running on 9010 ...")
+    srv.register_function(get_job_status,"get_job_status")
+    srv.register_function(ping,"ping")
+    print(f"[Backup] running on {port} ...")
     srv.serve_forever()
 
 if __name__=="__main__":
-    run_backup()
+    # python backup_server.py [port]  – start one per port listed in server.BACKUP_PORTS
+    run_backup(int(sys.argv[1]) if len(sys.argv)>1 else BACKUP_PORT)
@@ -0,0 +1,75 @@
+# bench_answer_memory.py – memory and scorer feed time of answer storage: dict per student vs. answer sheets
+# usage: python bench_answer_memory.py [n_students]   (default: 100000)
+# MB is what tracemalloc still holds after the build, roll keys included, so it follows StudentExam's
+# __slots__ (8 B per slot). Build seconds are timed with tracemalloc on, and every ExamState put takes a
+# stripe lock and checks the batch; they compare layouts on one machine, they are not a live put rate.
+import sys, time, random, tracemalloc
+from server import MCQ_QUESTIONS
+from exam_state import ExamState
+from scoring import BatchScorer, np
+
+def _answers(n, seed=7):
+    rng = random.Random(seed)
+    return [(str(r), {q: rng.randint(1, 4) for q in MCQ_QUESTIONS}) for r in range(n)]
+
+def build_dicts(rows):
+    # the layout before exam_state.py: Dict[str, Dict[int, int]]
+    store = {}
+    for roll, ans in rows:
+        store.setdefault(roll, {}).update(ans)
+    return store
+
+def build_sheets(rows):
+    exam = ExamState(MCQ_QUESTIONS)
+    for roll, ans in rows:
+        with exam.locked(roll) as rec:
+            exam.put(rec, ans)
+    return exam
+
+def build_matrix(rows):
+    # for reference: one preallocated (students x questions) buffer plus a roll -> row index
+    qnums = sorted(MCQ_QUESTIONS)
+    matrix, slot = np.zeros((len(rows), len(qnums)), dtype=np.int8), {}
+    for roll, ans in rows:
+        i = slot.setdefault(roll, len(slot))
+        for j, q in enumerate(qnums):
+            matrix[i, j] = ans.get(q, 0)
+    return matrix, slot
+
+def measure(build, rows):
+    tracemalloc.start()
+    t = time.perf_counter()
+    store = build(rows)
+    secs = time.perf_counter() - t
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, size, secs
+
+def run(n):
+    rows = _answers(n)
+    scorer = BatchScorer(MCQ_QUESTIONS)
+    flags = [0] * n
+    print(f"{n:,} students x {len(MCQ_QUESTIONS)} answers")
+    print(f"{'layout':<22} {'MB':>8} {'B/student':>10} {'build s':>8} {'score s':>8}")
+    builds = [("dict per student", build_dicts), ("ExamState sheets", build_sheets)]
+    if np is not None:
+        builds.append(("2-D int8 matrix", build_matrix))
+    finals = {}
+    for name, build in builds:
+        store, size, secs = measure(build, rows)
+        t = time.perf_counter()
+        # what finalize_all hands the scorer
+        if build is build_dicts:
+            _, final = scorer.score([dict(a) for a in store.values()], flags)
+        elif build is build_sheets:
+            _, final = scorer.score_sheets([bytes(rec.sheet) for _, rec in store.items()], flags)
+        else:
+            final = scorer.score_matrix(store[0], flags)[1].tolist()
+        score_secs = time.perf_counter() - t
+        finals[name] = sorted(final)
+        print(f"{name:<22} {size / 1e6:>8.1f} {size / n:>10.0f} {secs:>8.3f} {score_secs:>8.3f}")
+        del store
+    assert len({tuple(f) for f in finals.values()}) == 1, "layouts score differently"
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
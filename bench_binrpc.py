@@ -0,0 +1,98 @@
+# bench_binrpc.py – bytes on the wire and CPU per call: XML-RPC vs. binrpc frames, same calls and results
+# usage: python bench_binrpc.py [calls]   (default: 2000)
+import socket, sys, threading, time
+from xmlrpc.server import SimpleXMLRPCServer
+from socketserver import ThreadingMixIn
+from rpc_pool import KeepAliveRequestHandler, proxy
+from rpc_metrics import InstrumentedMixin
+
+PORT, RELAY_PORT = 9410, 9411
+
+class ThreadingXMLRPCServer(InstrumentedMixin, ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+# stand-ins with the real signatures and result shapes, so only codec and transport cost is timed;
+# tests/test_transports.py runs the real server and backup functions over both transports
+def receive_request(from_roll, ts): return True
+def receive_ok(from_roll): return True
+def submit_mcq_answers_bulk(roll, answers): return {int(q): int(a) for q, a in answers.items()} and True
+def process_forwarded_submission(roll, answers, flags): return f"9010-1-{roll}"
+def update_mcq_marks_bulk(marks): return len(marks)
+
+ANSWERS = {q: (q % 4) + 1 for q in range(1, 11)}
+MARKS = {str(r): r % 101 for r in range(1000)}
+SCENARIOS = [
+    ("receive_request", ("17", 123456)),
+    ("receive_ok", ("17",)),
+    ("submit_mcq_answers_bulk", ("17", ANSWERS)),
+    ("process_forwarded_submission", ("17", ANSWERS, 1)),
+    ("update_mcq_marks_bulk (1000)", (MARKS,)),
+]
+
+def _xml_args(args):
+    # XML-RPC needs string keys; binrpc carries the int keys as they are
+    return tuple({str(k): v for k, v in a.items()} if isinstance(a, dict) else a for a in args)
+
+def _serve():
+    srv = ThreadingXMLRPCServer(("127.0.0.1", PORT), requestHandler=KeepAliveRequestHandler,
+                                allow_none=True, logRequests=False)
+    for fn in (receive_request, receive_ok, submit_mcq_answers_bulk, process_forwarded_submission,
+               update_mcq_marks_bulk):
+        srv.register_function(fn, fn.__name__)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+class Relay:
+    """TCP relay in front of the server that counts bytes in each direction."""
+    def __init__(self):
+        self.up = self.down = 0
+        self._lsock = socket.create_server(("127.0.0.1", RELAY_PORT))
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            c, _ = self._lsock.accept()
+            s = socket.create_connection(("127.0.0.1", PORT))
+            threading.Thread(target=self._pump, args=(c, s, "up"), daemon=True).start()
+            threading.Thread(target=self._pump, args=(s, c, "down"), daemon=True).start()
+
+    def _pump(self, src, dst, direction):
+        while True:
+            data = src.recv(1 << 16)
+            if not data:
+                dst.close(); return
+            setattr(self, direction, getattr(self, direction) + len(data))
+            dst.sendall(data)
+
+def _client(port, binary):
+    p = proxy(f"http://127.0.0.1:{port}/", binary=binary)
+    p.receive_ok("warmup")  # the first reply is XML-RPC and advertises binrpc; later calls use frames
+    return p
+
+def run(calls):
+    _serve()
+    relay = Relay()
+    print(f"{'call':<30} {'transport':>9} {'req B':>8} {'resp B':>8} {'CPU us':>9} {'calls/s':>9}")
+    for name, args in SCENARIOS:
+        method = name.split(" ")[0]
+        results = {}
+        for transport in ("xml", "binary"):
+            binary = transport == "binary"
+            a = args if binary else _xml_args(args)
+            # bytes: a few calls through the counting relay
+            p = _client(RELAY_PORT, binary)
+            up, down = relay.up, relay.down
+            for _ in range(10):
+                results[transport] = getattr(p, method)(*a)
+            req, resp = (relay.up - up) / 10, (relay.down - down) / 10
+            # CPU: client and server share this process, so process_time covers both ends
+            p = _client(PORT, binary)
+            n = calls if "1000" not in name else max(1, calls // 20)
+            cpu, wall = time.process_time(), time.perf_counter()
+            for _ in range(n):
+                getattr(p, method)(*a)
+            cpu, wall = (time.process_time() - cpu) / n, time.perf_counter() - wall
+            print(f"{name:<30} {transport:>9} {req:>8.0f} {resp:>8.0f} {cpu * 1e6:>9.1f} {n / wall:>9.0f}")
+        assert results["xml"] == results["binary"], f"{name}: transports disagree"
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,63 @@
+# bench_exam_state.py – stripe-lock contention under answer uploads: one lock (stripes=1) vs. striped exam state
+# usage: python bench_exam_state.py [secs_per_run]   (default: 2)
+#
+# Each writer runs submit_mcq_answers_bulk's critical section – take the roll's stripe lock, put() the
+# answer, append its WAL line – and records whether the lock was already taken (contended), the wait
+# for it and how long it was held. Waits include GIL hand-offs, which both layouts pay alike. The
+# group-commit wal.wait() that follows in the server happens outside the lock and is left out: it is
+# the same 10 ms whatever the striping, and would otherwise be all that gets measured.
+import sys, tempfile, threading, time
+from pathlib import Path
+from exam_state import ExamState, STRIPES
+from server import MCQ_QUESTIONS
+from wal import WriteAheadLog
+
+THREADS = (1, 8, 32, 128)
+ROLLS_PER_THREAD = 50
+
+def _pct(xs, p):
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))] * 1e6 if xs else 0.0
+
+def run_one(wal, stripes, threads, secs):
+    exam = ExamState(MCQ_QUESTIONS, stripes)
+    stop = threading.Event()
+    waits = [[] for _ in range(threads)]
+    holds = [[] for _ in range(threads)]
+    busy = [0] * threads
+
+    def writer(i):
+        rolls = [str(i * ROLLS_PER_THREAD + k) for k in range(ROLLS_PER_THREAD)]
+        n, w, h, clock = 0, waits[i], holds[i], time.perf_counter
+        while not stop.is_set():
+            roll, q, a = rolls[n % ROLLS_PER_THREAD], n % 10 + 1, n % 4 + 1
+            busy[i] += exam._locks[hash(roll) % stripes].locked()
+            t0 = clock()
+            with exam.locked(roll) as rec:
+                t1 = clock()
+                exam.put(rec, {q: a})
+                wal.append("ans", roll, q, a)
+                t2 = clock()
+            w.append(t1 - t0); h.append(t2 - t1)
+            n += 1
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    for t in workers: t.start()
+    time.sleep(secs)
+    stop.set()
+    for t in workers: t.join()
+    w = sorted(x for l in waits for x in l)
+    h = sorted(x for l in holds for x in l)
+    print(f"{stripes:>7} {threads:>7} {len(w) / secs:>10.0f} {100 * sum(busy) / max(1, len(w)):>10.2f} {_pct(w, 50):>11.1f} {_pct(w, 99):>11.1f} "
+          f"{sum(w) / max(1, len(w)) * 1e6:>12.1f} {_pct(h, 50):>11.1f} {_pct(h, 99):>11.1f}")
+
+def run(secs):
+    with tempfile.TemporaryDirectory() as d:
+        wal = WriteAheadLog(Path(d))  # appends as in production; nobody waits for the fsync
+        print(f"{'stripes':>7} {'threads':>7} {'puts/s':>10} {'contended%':>10} {'wait p50 us':>11} {'wait p99 us':>11} "
+              f"{'wait mean us':>12} {'hold p50 us':>11} {'hold p99 us':>11}")
+        for stripes in (1, STRIPES):
+            for threads in THREADS:
+                run_one(wal, stripes, threads, secs)
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0)
@@ -0,0 +1,23 @@
+# bench_mutex.py – messages and latency per CS entry: Ricart-Agrawala vs Maekawa quorums
+# usage: python bench_mutex.py [n_students ...]   (default: 5 50 500)
+import sys, time, statistics
+from mutex import simulate
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+def run(sizes, rounds=2):
+    print("simulated network: 1 ms +0-0.5 ms per message, 2 ms in CS, every student enters the CS "
+          f"{rounds}x")
+    print(f"{'students':>8} {'algo':>8} {'msgs/CS':>9} {'mean ms':>9} {'p95 ms':>9} {'sim wall s':>10}")
+    for n in sizes:
+        for algo in ("ra", "maekawa"):
+            t = time.perf_counter()
+            r = simulate(n, algo, rounds=rounds)
+            lat = r["latencies"]
+            print(f"{n:>8} {algo:>8} {r['messages_per_cs']:>9.1f} {statistics.mean(lat) * 1000:>9.2f} "
+                  f"{_pct(lat, 95) * 1000:>9.2f} {time.perf_counter() - t:>10.2f}")
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [5, 50, 500])
@@ -0,0 +1,122 @@
+# bench_rpc_server.py – ThreadingMixIn vs. PooledXMLRPCServer vs. the asyncio front end under a client stampede
+# usage: python bench_rpc_server.py [clients] [requests_per_client]   (default: 1000 10)
+import asyncio, resource, subprocess, sys, threading, time
+import xmlrpc.client
+
+PORT = 9400
+WORK_SECS = 0.005  # per call: mostly waiting (like wal.wait), a little CPU
+
+def serve(kind, port):
+    from socketserver import ThreadingMixIn
+    from xmlrpc.server import SimpleXMLRPCServer
+    from rpc_pool import KeepAliveRequestHandler
+    from rpc_server import PooledXMLRPCServer
+
+    class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+        daemon_threads = True
+
+    def work(n):
+        time.sleep(WORK_SECS)
+        return sum(range(int(n)))
+
+    if kind == "asyncio":
+        import asyncio
+        from aio_rpc import AsyncXMLRPCServer
+        srv = AsyncXMLRPCServer("127.0.0.1", port)
+        srv.register_function(work, "work")
+        print("ready", flush=True)
+        asyncio.run(srv.serve_forever())
+        return
+    if kind == "mixin":
+        srv = ThreadingXMLRPCServer(("127.0.0.1", port), requestHandler=KeepAliveRequestHandler,
+                                    allow_none=True, logRequests=False)
+    else:
+        srv = PooledXMLRPCServer(("127.0.0.1", port), requestHandler=KeepAliveRequestHandler,
+                                 allow_none=True, logRequests=False)
+    srv.register_function(work, "work")
+    print("ready", flush=True)
+    srv.serve_forever()
+
+def _proc_status(pid):
+    out = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            k, _, v = line.partition(":")
+            if k in ("VmRSS", "VmHWM", "Threads"):
+                out[k] = int(v.split()[0])
+    return out
+
+async def _client(body, requests, lat, tally):
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    except OSError:
+        tally["connect_errors"] += 1
+        return
+    head = (f"POST /RPC2 HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: text/xml\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode()
+    try:
+        for _ in range(requests):
+            t = time.perf_counter()
+            writer.write(head + body)
+            headers = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 60)
+            n = int(next(l.split(b":")[1] for l in headers.split(b"\r\n") if l.lower().startswith(b"content-length")))
+            resp = await asyncio.wait_for(reader.readexactly(n), 60)
+            lat.append(time.perf_counter() - t)
+            if b"faultCode" in resp:
+                tally["overload_faults"] += 1
+                break  # the server closes the connection after an overload reply
+            tally["ok"] += 1
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, StopIteration):
+        tally["errors"] += 1
+    finally:
+        writer.close()
+
+async def _stampede(clients, requests):
+    body = xmlrpc.client.dumps((200,), "work").encode()
+    lat, tally = [], {"ok": 0, "overload_faults": 0, "errors": 0, "connect_errors": 0}
+    t = time.perf_counter()
+    await asyncio.gather(*(_client(body, requests, lat, tally) for _ in range(clients)))
+    return lat, tally, time.perf_counter() - t
+
+def run(kind, clients, requests):
+    proc = subprocess.Popen([sys.executable, __file__, "--serve", kind, str(PORT)], stdout=subprocess.PIPE, text=True)
+    try:
+        proc.stdout.readline()
+        base = _proc_status(proc.pid)
+        peak = dict(base)
+        stop = threading.Event()
+        def sample():
+            while not stop.is_set():
+                try:
+                    s = _proc_status(proc.pid)
+                except OSError:
+                    return
+                peak["Threads"] = max(peak["Threads"], s["Threads"])
+                peak["VmHWM"] = max(peak["VmHWM"], s["VmHWM"])
+                time.sleep(0.02)
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        lat, tally, wall = asyncio.run(_stampede(clients, requests))
+        stop.set(); sampler.join()
+    finally:
+        proc.terminate(); proc.wait()
+    lat.sort()
+    pct = lambda p: lat[min(len(lat) - 1, int(p / 100 * len(lat)))] * 1000 if lat else 0.0
+    print(f"{kind:>7} {tally['ok'] / wall:>9.0f} {pct(50):>9.1f} {pct(99):>9.1f} {lat[-1] * 1000 if lat else 0:>9.1f} "
+          f"{peak['Threads']:>8} {(peak['VmHWM'] - base['VmRSS']) / 1024:>10.1f} "
+          f"{tally['overload_faults']:>9} {tally['errors'] + tally['connect_errors']:>7}")
+
+def main(clients=1000, requests=10):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * clients + 256)), hard))
+    print(f"{clients} concurrent keep-alive clients x {requests} calls, {WORK_SECS * 1000:.0f} ms per call")
+    print(f"{'server':>7} {'calls/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'threads':>8} "
+          f"{'+RSS MB':>10} {'overload':>9} {'errors':>7}")
+    for kind in ("mixin", "pooled", "asyncio"):
+        run(kind, clients, requests)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"]:
+        serve(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(*(int(a) for a in sys.argv[1:3]))
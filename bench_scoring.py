@@ -0,0 +1,41 @@
+# bench_scoring.py – per-student loop vs vectorized batch scoring
+# usage: python bench_scoring.py [n_students ...]   (default: 10000 100000)
+import sys, time, random
+from server import MCQ_QUESTIONS
+from scoring import BatchScorer, compute_score, np
+
+def _make_class(n, seed=7):
+    rng = random.Random(seed)
+    answers = [{q: rng.randint(0, 4) for q in MCQ_QUESTIONS} for _ in range(n)]
+    flags = [rng.choice((0, 0, 0, 1, 2)) for _ in range(n)]
+    return answers, flags
+
+def _rate(n, secs):
+    return f"{secs:8.3f}s  {n / secs:12,.0f} students/s"
+
+def run(n):
+    answers, flags = _make_class(n)
+    scorer = BatchScorer(MCQ_QUESTIONS)
+
+    t = time.perf_counter()
+    loop = [compute_score(a, f, MCQ_QUESTIONS)[1] for a, f in zip(answers, flags)]
+    t_loop = time.perf_counter() - t
+
+    t = time.perf_counter()
+    matrix = scorer.pack(answers)
+    t_pack = time.perf_counter() - t
+    t = time.perf_counter()
+    _, final = scorer.score_matrix(matrix, flags)
+    t_vec = time.perf_counter() - t
+
+    assert final.tolist() == loop, "vectorized scores differ from the loop"
+    print(f"--- {n:,} students ---")
+    print(f"python loop         {_rate(n, t_loop)}")
+    print(f"pack + vectorized   {_rate(n, t_pack + t_vec)}")
+    print(f"vectorized only     {_rate(n, t_vec)}")
+
+if __name__ == "__main__":
+    if np is None:
+        raise SystemExit("Please install numpy: pip install numpy")
+    for n in [int(a) for a in sys.argv[1:]] or [10_000, 100_000]:
+        run(n)
@@ -0,0 +1,290 @@
+# bench_suite.py – end-to-end RPC benchmarks against real server/backup/teacher processes
+# usage: python bench_suite.py [--quick] [--only answers finalize teacher ra registry] [--json bench.json]
+#                              [--compare old.json]
+#
+# Every benchmark starts its own nodes (server.run_server, backup_server.run_backup,
+# teacher.run_teacher) as subprocesses on the usual localhost ports, each in a
+# fresh temp directory so results.xlsx and the WAL start empty. The ports must be free.
+import argparse, json, os, platform, socket, subprocess, sys, tempfile, threading, time
+import xmlrpc.client
+import multiprocessing as mp
+from contextlib import contextmanager
+from pathlib import Path
+from rpc_pool import proxy, MAX_PER_HOST
+
+REPO = Path(__file__).resolve().parent
+SERVER_URL, TEACHER_URL = "http://127.0.0.1:9000/", "http://127.0.0.1:9001/"
+BACKUP_PORTS = (9010, 9011)
+RA_BASE_PORT = 9301  # RA peers listen on RA_BASE_PORT + i
+NODES = {
+    "server": ("import server; server.run_server()", 9000),
+    "teacher": ("import teacher; teacher.run_teacher()", 9001),
+    **{f"backup{p}": (f"import backup_server; backup_server.run_backup({p})", p) for p in BACKUP_PORTS},
+}
+
+def _summary(xs):
+    xs = sorted(xs)
+    if not xs:
+        return {"count": 0}
+    pct = lambda p: xs[min(len(xs) - 1, int(p / 100 * len(xs)))] * 1000
+    return {"count": len(xs), "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": xs[-1] * 1000}
+
+# ---------------- cluster ----------------
+def _wait_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+@contextmanager
+def cluster(*names, setup=None):
+    """Run the named NODES in a temp dir; `setup(dir)` may seed files first. Yields the dir."""
+    for name in names:
+        try:
+            socket.create_connection(("127.0.0.1", NODES[name][1]), 0.2).close()
+            raise RuntimeError(f"port {NODES[name][1]} ({name}) is already in use")
+        except OSError:
+            pass
+    with tempfile.TemporaryDirectory(prefix="bench-") as d:
+        if setup: setup(Path(d))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(REPO), os.environ.get("PYTHONPATH", "")]))
+        procs = []
+        try:
+            for name in names:
+                code, port = NODES[name]
+                log = open(Path(d) / f"{name}.log", "w")
+                procs.append(subprocess.Popen([sys.executable, "-c", code], cwd=d, env=env,
+                                              stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT))
+                _wait_port(port)
+            yield Path(d)
+        finally:
+            for p in procs: p.terminate()
+            for p in procs: p.wait(10)
+
+def _run_threads(n, fn):
+    threads = [threading.Thread(target=fn, args=(i,)) for i in range(n)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+# ---------------- submit_mcq_answer throughput ----------------
+def bench_answers(quick):
+    """Answer uploads per second, one RPC per answer vs. 10 answers per bulk call."""
+    secs = 1.0 if quick else 3.0
+    out = {}
+    with cluster("server"):
+        for threads in (1, 8, 32):
+            for mode in ("single", "bulk"):
+                lat, answers = [], [0]
+                lock = threading.Lock()
+                stop = time.monotonic() + secs
+                def worker(i):
+                    p, mine, n = proxy(SERVER_URL), [], 0
+                    roll = f"{mode}{threads}-{i}"
+                    while time.monotonic() < stop:
+                        t = time.perf_counter()
+                        if mode == "single":
+                            p.submit_mcq_answer(roll, n % 10 + 1, n % 4 + 1); k = 1
+                        else:
+                            p.submit_mcq_answers_bulk(roll, {str(q): (q + n) % 4 + 1 for q in range(1, 11)}); k = 10
+                        mine.append(time.perf_counter() - t); n += k
+                    with lock:
+                        lat.extend(mine); answers[0] += n
+                t0 = time.perf_counter()
+                _run_threads(threads, worker)
+                wall = time.perf_counter() - t0
+                out[f"{mode}_t{threads}"] = {"threads": threads, "answers_per_sec": answers[0] / wall,
+                                            "calls_per_sec": len(lat) / wall, **_summary(lat)}
+                print(f"  {mode:>6} x{threads:<3} {answers[0] / wall:>10,.0f} answers/s  "
+                      f"p50 {out[f'{mode}_t{threads}']['p50_ms']:.2f} ms")
+    return out
+
+# ---------------- submit_mcq_final end to end ----------------
+def _finalize_round(rolls, threads):
+    """Submit `rolls` from `threads` clients; returns per-roll seconds until the teacher has the mark."""
+    p = proxy(SERVER_URL)
+    for r in rolls:
+        p.submit_mcq_answers_bulk(r, {str(q): 2 for q in range(1, 11)})
+    sent, done = {}, {}
+    def worker(i):
+        c = proxy(SERVER_URL)
+        for r in rolls[i::threads]:
+            sent[r] = time.perf_counter()
+            c.submit_mcq_final(r)
+    t = threading.Thread(target=_run_threads, args=(threads, worker))
+    t.start()
+    teacher, deadline = proxy(TEACHER_URL), time.monotonic() + 120
+    while len(done) < len(rolls) and time.monotonic() < deadline:
+        now = time.perf_counter()
+        for row in teacher.get_results():
+            r = str(row[0])
+            if r in sent and r not in done and row[3] not in (None, "NA"):
+                done[r] = now - sent[r]
+        time.sleep(0.02)
+    t.join()
+    return [done[r] for r in rolls if r in done], len(rolls) - len(done)
+
+def bench_finalize(quick):
+    """submit_mcq_final latency until the teacher holds the mark: light load (local) vs. a burst (forwarded)."""
+    out = {}
+    burst = 30 if quick else 80
+    with cluster("teacher", *(f"backup{p}" for p in BACKUP_PORTS), "server"):
+        for name, rolls, threads in (("local", [f"L{i}" for i in range(3)], 1),
+                                     ("burst", [f"B{i}" for i in range(burst)], 16)):
+            before = sum(b["sent"] for b in proxy(SERVER_URL).get_processing_metrics()["backups"])
+            lat, lost = _finalize_round(rolls, threads)
+            m = proxy(SERVER_URL).get_processing_metrics()
+            forwarded = sum(b["sent"] for b in m["backups"]) - before
+            out[name] = {"rolls": len(rolls), "forwarded": forwarded, "incomplete": lost, **_summary(lat)}
+            print(f"  {name:>6} {len(rolls):>4} rolls, {forwarded} forwarded: p50 {out[name]['p50_ms']:.0f} ms "
+                  f"p95 {out[name]['p95_ms']:.0f} ms max {out[name]['max_ms']:.0f} ms")
+    return out
+
+# ---------------- update_mcq_marks vs. results.xlsx size ----------------
+def _seed_results(rows):
+    def setup(d):
+        from openpyxl import Workbook
+        wb = Workbook(); ws = wb.active
+        ws.append(["Roll", "Name", "Marks", "MCQ", "ISA"])
+        for i in range(rows):
+            ws.append([str(i), f"Student{i}", "NA", "NA", "NA"])
+        wb.save(d / "results.xlsx")
+    return setup
+
+def bench_teacher(quick):
+    """update_mcq_marks RPC latency and time until results.xlsx reflects it, by sheet size."""
+    out = {}
+    calls = 50 if quick else 200
+    for rows in ((100, 1000) if quick else (100, 1000, 10_000)):
+        with cluster("teacher", setup=_seed_results(rows)) as d:
+            path = d / "results.xlsx"
+            p, lat = proxy(TEACHER_URL), []
+            for i in range(calls):
+                t = time.perf_counter()
+                p.update_mcq_marks(str(i * 7 % rows), i % 100)
+                lat.append(time.perf_counter() - t)
+            # first update seeds/loads the sheet; then wait for the batched save to land
+            stamp, t = path.stat().st_mtime_ns, time.perf_counter()
+            p.update_mcq_marks(str(rows - 1), 42)
+            while path.stat().st_mtime_ns == stamp and time.perf_counter() - t < 60:
+                time.sleep(0.005)
+            out[str(rows)] = {"rows": rows, "save_visible_ms": (time.perf_counter() - t) * 1000, **_summary(lat[1:]),
+                              "first_call_ms": lat[0] * 1000}
+            print(f"  {rows:>6} rows: call p50 {out[str(rows)]['p50_ms']:.2f} ms, first call "
+                  f"{lat[0] * 1000:.0f} ms, on disk after {out[str(rows)]['save_visible_ms']:.0f} ms")
+    return out
+
+# ---------------- RA CS-entry latency vs. peers ----------------
+def _ra_peer(roll, n, rounds, cs_secs, barrier, results):
+    import random
+    import student_common as sc
+    sc._log = lambda msg: None
+    sc.my_roll, sc.my_url = str(roll), f"http://127.0.0.1:{RA_BASE_PORT + roll - 1}/"
+    threading.Thread(target=sc._run_rpc_server, args=("127.0.0.1", RA_BASE_PORT + roll - 1), daemon=True).start()
+    sc.peers.update({str(r): f"http://127.0.0.1:{RA_BASE_PORT + r - 1}/" for r in range(1, n + 1)})
+    rng = random.Random(roll)
+    barrier.wait()
+    for _ in range(rounds):
+        # same steps as student_common._main_prompt_loop, minus the prompts
+        threading.Thread(target=sc._start_ra_request, daemon=True).start()
+        sc.enter_cs_event.wait(); sc.enter_cs_event.clear()
+        time.sleep(cs_secs)
+        sc._exit_cs()
+        sc.requesting = False; sc.in_cs = False; sc.my_ts = None
+        sc.ok_received.clear(); sc.deferred.clear()
+        time.sleep(rng.uniform(0, 0.02))
+    results.put(list(sc.ra_stats))
+    barrier.wait()  # keep answering peers until everyone is done
+
+def bench_ra(quick):
+    """Request-to-CS latency of student_common's RA over real XML-RPC, every peer contending."""
+    out = {}
+    rounds = 3 if quick else 5
+    for n in ((2, 4, 8) if quick else (2, 4, 8, 16)):
+        barrier, results = mp.Barrier(n), mp.Queue()
+        procs = [mp.Process(target=_ra_peer, args=(r, n, rounds, 0.005, barrier, results), daemon=True)
+                 for r in range(1, n + 1)]
+        for p in procs: p.start()
+        stats = [s for _ in procs for s in results.get(timeout=300)]
+        for p in procs: p.join(10)
+        lat = [s["latency"] for s in stats if s["entered"]]
+        out[str(n)] = {"peers": n, "entries": len(lat), "retransmits": sum(s["retransmits"] for s in stats),
+                       **_summary(lat)}
+        print(f"  {n:>3} peers: {len(lat)} entries, p50 {out[str(n)]['p50_ms']:.1f} ms "
+              f"p99 {out[str(n)]['p99_ms']:.1f} ms, {out[str(n)]['retransmits']} retransmits")
+    return out
+
+# ---------------- registry sync per ISA event ----------------
+def bench_registry(quick):
+    """Registry bytes/latency per student ISA event: full get_registry vs. get_registry_since with nothing new."""
+    out = {}
+    for n in ((100, 1000) if quick else (100, 1000, 10_000)):
+        with cluster("server"):
+            # registration waits for the WAL, so register from one thread per pooled connection
+            _run_threads(MAX_PER_HOST, lambda i: [proxy(SERVER_URL).register_student(str(r), f"http://127.0.0.1:{20000 + r}/")
+                                                  for r in range(i, n, MAX_PER_HOST)])
+            p, calls = proxy(SERVER_URL), 50
+            base = p.get_registry_since(0, "")
+            row = {"students": n}
+            for kind, call in (("full", lambda: p.get_registry()),
+                               ("delta", lambda: p.get_registry_since(base["version"], base["epoch"]))):
+                lat = []
+                for _ in range(calls):
+                    t = time.perf_counter()
+                    res = call()
+                    lat.append(time.perf_counter() - t)
+                row[kind] = {"resp_bytes": len(xmlrpc.client.dumps((res,), methodresponse=True, allow_none=True)),
+                             **_summary(lat)}
+            out[str(n)] = row
+            print(f"  {n:>6} students: full {row['full']['resp_bytes']:>9,} B p50 {row['full']['p50_ms']:.2f} ms; "
+                  f"delta {row['delta']['resp_bytes']:>5,} B p50 {row['delta']['p50_ms']:.2f} ms")
+    return out
+
+BENCHES = {"answers": bench_answers, "finalize": bench_finalize, "teacher": bench_teacher, "ra": bench_ra,
+           "registry": bench_registry}
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(old, new, path=()):
+    """Print latency/throughput metrics that moved by more than 10% between two runs."""
+    for k, v in new.items():
+        o = old.get(k) if isinstance(old, dict) else None
+        if isinstance(v, dict):
+            compare(o or {}, v, path + (k,))
+        elif isinstance(v, (int, float)) and isinstance(o, (int, float)) and o and \
+                (k.endswith("_ms") or k.endswith("_per_sec")) and abs(v / o - 1) > 0.10:
+            better = (v > o) == k.endswith("_per_sec")
+            print(f"  {'/'.join(path + (k,)):<40} {o:>12.2f} -> {v:>12.2f}  ({'better' if better else 'WORSE'})")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="End-to-end RPC benchmarks for the exam system.")
+    ap.add_argument("--quick", action="store_true", help="smaller sizes, for a smoke run")
+    ap.add_argument("--only", nargs="+", choices=sorted(BENCHES), default=list(BENCHES))
+    ap.add_argument("--json", help="write results here")
+    ap.add_argument("--compare", help="earlier --json output to diff against")
+    a = ap.parse_args(argv)
+    report = {"rev": _git_rev(), "python": platform.python_version(), "platform": platform.platform(),
+              "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": a.quick, "results": {}}
+    for name in a.only:
+        print(f"[{name}] {BENCHES[name].__doc__}")
+        report["results"][name] = BENCHES[name](a.quick)
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if a.compare:
+        with open(a.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        print(f"changes vs {old.get('rev')}:")
+        compare(old["results"], report["results"])
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# bench_timer_wheel.py – per-student deadlines: one TimingWheel thread vs. a threading.Timer each
+# usage: python bench_timer_wheel.py [n_timers] [spread_secs]   (default: 100000 timers due over 5s)
+import random, sys, threading, time
+from timer_wheel import TimingWheel
+
+THREAD_TIMERS = 2000  # threading.Timer starts a thread per timer; more than this mostly measures the OS
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))] * 1000 if xs else 0.0
+
+def _run(n, spread, schedule, cancel):
+    rng = random.Random(1)
+    delays = [1.0 + rng.random() * spread for _ in range(n)]
+    late, done = [], threading.Event()
+    left = [n - len(range(0, n, 10))]  # all but the cancelled ones
+
+    def fire(due):
+        late.append(time.monotonic() - due)
+        left[0] -= 1
+        if not left[0]: done.set()
+
+    peak = threading.active_count()
+    t = time.perf_counter()
+    timers = [schedule(d, fire, time.monotonic() + d) for d in delays]
+    put = (time.perf_counter() - t) / n
+    peak = max(peak, threading.active_count())
+    t = time.perf_counter()
+    for tm in timers[::10]:  # one student in ten submits early
+        cancel(tm)
+    drop = (time.perf_counter() - t) / len(timers[::10])
+    done.wait(spread + 30)
+    return put, drop, late, peak
+
+def _thread_timer(delay, fn, *args):
+    tm = threading.Timer(delay, fn, args)
+    tm.start()
+    return tm
+
+def run(n, spread):
+    wheel = TimingWheel()
+    print(f"{'scheduler':<22} {'timers':>7} {'threads':>8} {'add us':>7} {'cancel us':>9} "
+          f"{'late p50 ms':>11} {'p99 ms':>7} {'max ms':>7}")
+    for name, count, schedule, cancel in (
+            ("TimingWheel", n, wheel.schedule, lambda tm: tm.cancel()),
+            ("threading.Timer", min(n, THREAD_TIMERS), _thread_timer, lambda tm: tm.cancel())):
+        put, drop, late, peak = _run(count, spread, schedule, cancel)
+        print(f"{name:<22} {count:>7} {peak:>8} {put * 1e6:>7.1f} {drop * 1e6:>9.1f} "
+              f"{_pct(late, 50):>11.1f} {_pct(late, 99):>7.1f} {max(late) * 1000:>7.1f}")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 5.0)
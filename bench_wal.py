@@ -0,0 +1,42 @@
+# bench_wal.py – WAL append and crash-recovery replay throughput
+# usage: python bench_wal.py [n_events]   (default: 1000000)
+import sys, time, random, tempfile
+from pathlib import Path
+import server
+from wal import WriteAheadLog
+
+def _reset():
+    for d in (server.students_registry, server.exam, server.forwarded_jobs, server.forwarded_pending):
+        d.clear()
+
+def run(n, students=100_000):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as d:
+        server.wal = wal = WriteAheadLog(Path(d))
+        t = time.perf_counter()
+        for i in range(n):
+            wal.append("ans", rng.randrange(students), rng.randint(1, 10), rng.randint(0, 4))
+        wal.sync()
+        t_append = time.perf_counter() - t
+        size = sum(p.stat().st_size for p in Path(d).glob("wal-*.log"))
+        print(f"append+fsync  {n:,} events  {t_append:7.3f}s  {n / t_append:12,.0f} events/s  ({size / 1e6:.1f} MB)")
+
+        _reset()
+        server.wal = WriteAheadLog(Path(d))
+        t = time.perf_counter()
+        replayed = server.recover_state()
+        t_replay = time.perf_counter() - t
+        print(f"replay        {replayed:,} events  {t_replay:7.3f}s  {replayed / t_replay:12,.0f} events/s")
+
+        t = time.perf_counter()
+        server.take_snapshot()
+        t_snap = time.perf_counter() - t
+        _reset()
+        server.wal = WriteAheadLog(Path(d))
+        t = time.perf_counter()
+        server.recover_state()
+        print(f"snapshot      {t_snap:7.3f}s; restart from snapshot {time.perf_counter() - t:7.3f}s "
+              f"({len(server.exam):,} students)")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
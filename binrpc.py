@@ -0,0 +1,128 @@
+# binrpc.py – compact binary encoding and framing for the opt-in binary RPC transport
+#
+# A frame is FRAME_MARK, a 4-byte big-endian payload length, then the payload.
+# FRAME_MARK can never start an HTTP request, so servers tell the two
+# protocols apart by the first byte of each request and serve both on one port.
+# Requests encode [method, params]; responses [0, result] or [1, fault code, fault string].
+import struct
+import xmlrpc.client
+
+FRAME_MARK = b"\xb7"
+HEADER = struct.Struct(">cI")
+MAX_FRAME = 64 * 1024 * 1024
+NEGOTIATE_HEADER = "X-Binary-RPC"  # sent on XML-RPC responses by nodes that accept frames
+
+_I64 = struct.Struct(">q")
+_F64 = struct.Struct(">d")
+_U32 = struct.Struct(">I")
+
+def _enc(v, out):
+    t = type(v)
+    if v is None:
+        out.append(b"N")
+    elif t is bool:
+        out.append(b"T" if v else b"F")
+    elif t is int:
+        if -(1 << 63) <= v < (1 << 63):
+            out.append(b"i"); out.append(_I64.pack(v))
+        else:
+            s = str(v).encode(); out.append(b"I"); out.append(_U32.pack(len(s))); out.append(s)
+    elif t is str:
+        s = v.encode(); out.append(b"s"); out.append(_U32.pack(len(s))); out.append(s)
+    elif t is float:
+        out.append(b"d"); out.append(_F64.pack(v))
+    elif t is dict:
+        out.append(b"m"); out.append(_U32.pack(len(v)))
+        for k, x in v.items():
+            _enc(k, out); _enc(x, out)
+    elif t is list or t is tuple:
+        out.append(b"l"); out.append(_U32.pack(len(v)))
+        for x in v:
+            _enc(x, out)
+    elif t is bytes or t is bytearray:
+        out.append(b"b"); out.append(_U32.pack(len(v))); out.append(bytes(v))
+    elif t is xmlrpc.client.Binary:
+        _enc(v.data, out)
+    else:
+        for base in (int, float, str, dict, list, tuple):  # subclasses, e.g. IntEnum
+            if isinstance(v, base):
+                return _enc(base(v), out)
+        raise TypeError(f"cannot encode {t.__name__} for binary RPC")
+
+def dumps(value) -> bytes:
+    out = []
+    _enc(value, out)
+    return b"".join(out)
+
+def _dec(b, i):
+    tag = b[i]; i += 1
+    if tag == 0x69:  # i
+        return _I64.unpack_from(b, i)[0], i + 8
+    if tag == 0x73:  # s
+        n = _U32.unpack_from(b, i)[0]; i += 4
+        return bytes(b[i:i + n]).decode(), i + n
+    if tag == 0x6c:  # l
+        n = _U32.unpack_from(b, i)[0]; i += 4
+        items = []
+        for _ in range(n):
+            x, i = _dec(b, i); items.append(x)
+        return items, i
+    if tag == 0x6d:  # m
+        n = _U32.unpack_from(b, i)[0]; i += 4
+        d = {}
+        for _ in range(n):
+            k, i = _dec(b, i); x, i = _dec(b, i); d[k] = x
+        return d, i
+    if tag == 0x4e: return None, i   # N
+    if tag == 0x54: return True, i   # T
+    if tag == 0x46: return False, i  # F
+    if tag == 0x64:  # d
+        return _F64.unpack_from(b, i)[0], i + 8
+    if tag == 0x62:  # b
+        n = _U32.unpack_from(b, i)[0]; i += 4
+        return bytes(b[i:i + n]), i + n
+    if tag == 0x49:  # I
+        n = _U32.unpack_from(b, i)[0]; i += 4
+        return int(bytes(b[i:i + n])), i + n
+    raise ValueError(f"bad binary RPC tag {tag:#x} at offset {i - 1}")
+
+def loads(b):
+    value, end = _dec(memoryview(b), 0)
+    if end != len(b):
+        raise ValueError("trailing bytes in binary RPC payload")
+    return value
+
+def frame(value) -> bytes:
+    payload = dumps(value)
+    return HEADER.pack(FRAME_MARK, len(payload)) + payload
+
+def read_frame(read):
+    """Read one frame with `read(n)` (returns exactly n bytes or raises); returns the decoded value."""
+    mark, n = HEADER.unpack(read(HEADER.size))
+    if mark != FRAME_MARK or n > MAX_FRAME:
+        raise ValueError("not a binary RPC frame")
+    return loads(read(n))
+
+def request(method, params) -> bytes:
+    return frame([method, list(params)])
+
+def reply(result) -> bytes:
+    return frame([0, result])
+
+def fault_reply(code, msg) -> bytes:
+    return frame([1, code, msg])
+
+def dispatch(call, payload):
+    """Run `call(method, params)` for one decoded request; returns the reply frame."""
+    try:
+        method, params = payload
+        return reply(call(method, tuple(params)))
+    except xmlrpc.client.Fault as f:
+        return fault_reply(f.faultCode, f.faultString)
+    except Exception as e:
+        return fault_reply(1, f"{type(e)}:{e}")
+
+def result_of(response):
+    if response[0] == 0:
+        return response[1]
+    raise xmlrpc.client.Fault(response[1], response[2])
@@ -0,0 +1,80 @@
+# broadcast.py – concurrent fan-out of one RPC to many nodes
+import time, threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+from rpc_pool import proxy, RPC_TIMEOUT
+
+MAX_WORKERS = 32
+STRAGGLER_SECS = 1.0  # calls slower than this are reported as stragglers
+
+TargetResult = namedtuple("TargetResult", "target ok value error latency")
+
+class BroadcastReport:
+    def __init__(self, method, results: Dict[str, TargetResult], elapsed, straggler_secs):
+        self.method = method
+        self.results = results
+        self.elapsed = elapsed
+        self.failed = sorted(t for t, r in results.items() if not r.ok)
+        self.stragglers = sorted(t for t, r in results.items() if r.ok and r.latency > straggler_secs)
+
+    def latencies(self):
+        return {t: r.latency for t, r in self.results.items()}
+
+    def summary(self):
+        s = f"{self.method} -> {len(self.results)} target(s) in {self.elapsed:.3f}s"
+        if self.failed: s += f"; failed {self.failed}"
+        if self.stragglers: s += f"; slow {self.stragglers}"
+        return s
+
+class Broadcaster:
+    """
+    Sends the same call to many targets from a bounded thread pool so one
+    slow or dead node only costs its own timeout, not everyone else's.
+    """
+    def __init__(self, max_workers=MAX_WORKERS, straggler_secs=STRAGGLER_SECS):
+        self.straggler_secs = straggler_secs
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="broadcast")
+
+    def _call(self, target, url, method, args, timeout):
+        t0 = time.perf_counter()
+        try:
+            value = getattr(proxy(url, timeout), method)(*args)
+            return TargetResult(target, True, value, None, time.perf_counter() - t0)
+        except Exception as e:
+            return TargetResult(target, False, None, str(e), time.perf_counter() - t0)
+
+    def send_async(self, targets: Dict[str, str], method, *args, timeout=RPC_TIMEOUT) -> Future:
+        """Fan `method(*args)` out to {target: url}; the returned future resolves to a BroadcastReport."""
+        done = Future()
+        targets = dict(targets)
+        t0 = time.perf_counter()
+        results: Dict[str, TargetResult] = {}
+        lock = threading.Lock()
+
+        def _finish():
+            done.set_result(BroadcastReport(method, results, time.perf_counter() - t0, self.straggler_secs))
+
+        if not targets:
+            _finish()
+            return done
+
+        def _collect(f, target):
+            with lock:
+                try:
+                    results[target] = f.result()
+                except Exception as e:  # executor shut down / cancelled
+                    results[target] = TargetResult(target, False, None, str(e), 0.0)
+                last = len(results) == len(targets)
+            if last:
+                _finish()
+
+        for target, url in targets.items():
+            f = self._pool.submit(self._call, target, url, method, args, timeout)
+            f.add_done_callback(lambda f, target=target: _collect(f, target))
+        return done
+
+    def send(self, targets: Dict[str, str], method, *args, timeout=RPC_TIMEOUT) -> BroadcastReport:
+        return self.send_async(targets, method, *args, timeout=timeout).result()
+
+default_broadcaster = Broadcaster()
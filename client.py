@@ -1,23 +1,24 @@
-import xmlrpc.client
 import random
 import time
 import datetime
 from xmlrpc.server import SimpleXMLRPCServer
 import threading
 from socketserver import ThreadingMixIn
+from rpc_pool import proxy, KeepAliveRequestHandler
+from rpc_metrics import InstrumentedMixin
 
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 9000
 TEACHER_HOST = "127.0.0.1"
 TEACHER_PORT = 9001
 
-class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+class ThreadingXMLRPCServer(InstrumentedMixin, ThreadingMixIn, SimpleXMLRPCServer):
     daemon_threads = True
 
 roll_numbers = ["1", "2", "3", "4", "5"]
 
-server_proxy = xmlrpc.client.ServerProxy(f"http://{SERVER_HOST}:{SERVER_PORT}/", allow_none=True)
-teacher_proxy = xmlrpc.client.ServerProxy(f"http://{TEACHER_HOST}:{TEACHER_PORT}/", allow_none=True)
+server_proxy = proxy(f"http://{SERVER_HOST}:{SERVER_PORT}/")
+teacher_proxy = proxy(f"http://{TEACHER_HOST}:{TEACHER_PORT}/")
 
 local_time = None
 exam_start_event = threading.Event()
@@ -53,7 +54,8 @@ def start_exam():
     return True
 
 def run_client_server():
-    server = ThreadingXMLRPCServer(("0.0.0.0", 9002), allow_none=True, logRequests=False)
+    server = ThreadingXMLRPCServer(("0.0.0.0", 9002), requestHandler=KeepAliveRequestHandler,
+                                   allow_none=True, logRequests=False)
     server.register_function(input_time, "input_time")
     server.register_function(calculate_cv, "calculate_cv")
     server.register_function(apply_adjustment, "apply_adjustment")
@@ -0,0 +1,133 @@
+# exam_state.py – per-roll MCQ state striped over a fixed set of locks
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Dict
+from longpoll import Watch
+from scoring import MARKS_PER_QUESTION
+
+STRIPES = 64
+
+class StudentExam:
+    __slots__ = ("sheet", "raw", "submitted", "final", "deadline", "timer")
+    def __init__(self, width):
+        self.sheet = bytearray(width)  # one byte per question, in ExamState.qnums order; 0 = unanswered
+        self.raw = 0                   # marks the sheet scores now, before any penalty
+        self.submitted = False         # claimed for finalisation (no more answers)
+        self.final = None              # final mark once scored
+        self.deadline = None           # wall-clock auto-submit time, set once the student starts
+        self.timer = None              # the server's timer for `deadline` (timer_wheel.Timer)
+
+class ExamState:
+    """
+    MCQ answers, submissions and final marks for every roll. Rolls hash to
+    one of `stripes` shards, each a dict guarded by its own lock, so calls for
+    different students rarely wait on each other.
+
+    Answers live in a fixed-width answer sheet per student (a bytearray, one
+    byte per question) rather than a dict of boxed ints. put() keeps each
+    student's raw score current as answers change, so finalising a student
+    is a penalty on a number: no sheet is scanned at finalisation.
+
+    `active` and `started_at` are plain attributes: readers take no lock
+    (a single attribute load is atomic), writers go through set_active(),
+    which also bumps `watch` so long polls on the exam state wake up.
+    """
+    def __init__(self, questions: Dict[int, dict], stripes=STRIPES):
+        self.qnums = sorted(questions)
+        self.column: Dict[int, int] = {q: i for i, q in enumerate(self.qnums)}
+        self.key = bytes(questions[q]["answer"] for q in self.qnums)  # correct option per column
+        # highest valid option per column (0 = unanswered); answer-key-only definitions allow any byte
+        self.options = bytes(len(questions[q].get("options", range(255))) for q in self.qnums)
+        self.stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._shards = [{} for _ in range(stripes)]
+        self._flag_lock = threading.Lock()
+        self.active = False
+        self.started_at = None
+        self.watch = Watch()
+
+    @contextmanager
+    def locked(self, roll):
+        """Hold roll's stripe lock; yields its StudentExam (created if new)."""
+        i = hash(roll) % self.stripes
+        with self._locks[i]:
+            shard = self._shards[i]
+            rec = shard.get(roll)
+            if rec is None:
+                rec = shard[roll] = StudentExam(len(self.qnums))
+            yield rec
+
+    def get(self, roll):
+        """Lock-free lookup; None for a roll with no state yet."""
+        return self._shards[hash(roll) % self.stripes].get(roll)
+
+    def record(self, roll):
+        """Get or create without locking – for recovery, before the server serves calls."""
+        shard = self._shards[hash(roll) % self.stripes]
+        rec = shard.get(roll)
+        if rec is None:
+            rec = shard[roll] = StudentExam(len(self.qnums))
+        return rec
+
+    def put(self, rec, answers):
+        """
+        Write {qnum: option} into rec's sheet (hold its stripe lock) and update
+        rec.raw. The whole batch is checked first, so a bad entry changes nothing.
+        """
+        column, options, cells = self.column, self.options, []
+        for q, a in answers.items():
+            i = column.get(q)
+            if i is None:
+                raise ValueError(f"no question {q}")
+            if not 0 <= a <= options[i]:
+                raise ValueError(f"option {a} out of range for question {q}")
+            cells.append((i, a))
+        sheet, key = rec.sheet, self.key
+        delta = 0  # correct answers gained (wrong->right) less lost (right->wrong)
+        for i, a in cells:
+            k = key[i]
+            delta += (a == k) - (sheet[i] == k)
+            sheet[i] = a
+        rec.raw += delta * MARKS_PER_QUESTION
+
+    def rescore(self):
+        """Recompute every raw score from its sheet – after recovery wrote sheets directly."""
+        key = self.key
+        for shard in self._shards:
+            for rec in shard.values():
+                rec.raw = sum(a == k for a, k in zip(rec.sheet, key)) * MARKS_PER_QUESTION
+
+    def set_active(self, active, started_at=None, log=None):
+        """Flip the exam flag; `log()` runs under the same lock so the WAL sees flips in order."""
+        with self._flag_lock:
+            self.active = active
+            if started_at is not None:
+                self.started_at = started_at
+            if log: log()
+        self.watch.bump()
+
+    @contextmanager
+    def all_locked(self):
+        """Every stripe (in index order) plus the flag: a consistent cut for snapshots."""
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock)
+            stack.enter_context(self._flag_lock)
+            yield self
+
+    def items(self):
+        """(roll, StudentExam) pairs; take all_locked() first for a consistent view."""
+        for shard in self._shards:
+            yield from list(shard.items())
+
+    def finals(self):
+        return {r: rec.final for r, rec in self.items() if rec.final is not None}
+
+    def __len__(self):
+        return sum(len(s) for s in self._shards)
+
+    def clear(self):
+        with self.all_locked():
+            for shard in self._shards:
+                shard.clear()
+            self.active, self.started_at = False, None
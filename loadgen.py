@@ -0,0 +1,355 @@
+# loadgen.py – headless virtual students: drives server/backup/teacher end-to-end and reports per-RPC latency
+#
+# usage: python loadgen.py --students 2000 --procs 4 [--think exp:1.0] [--json report.json]
+#
+# Each process runs an asyncio loop with one task per virtual student; blocking
+# XML-RPC calls go through a thread pool sized by --concurrency. Students
+# register with the server, fetch the paper and answer the 10 MCQs with think
+# times drawn from --think, upload answers in batches like student_common's
+# AnswerBuffer, submit (or wait for auto-submit), then contend for ISA entry
+# with the mutex.py cores (messages delivered in-process, within one process's students).
+# All students of a process share one callback listener for the server's pushes.
+import argparse, asyncio, json, os, random, threading, time
+import multiprocessing as mp
+import xmlrpc.client
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from xmlrpc.server import SimpleXMLRPCServer
+from socketserver import ThreadingMixIn
+from rpc_pool import ConnectionPool, TimeoutTransport, KeepAliveRequestHandler
+from aio_rpc import AsyncServerProxy, AsyncConnectionPool
+from mutex import RicartAgrawalaSite, MaekawaSite, grid_quorum
+
+SERVER_URL = "http://127.0.0.1:9000/"
+LISTEN_HOST, LISTEN_PORT = "127.0.0.1", 9200  # process i listens on LISTEN_PORT + i
+ROLL_BASE = 1000  # virtual rolls start here, clear of the real students 1-5
+QUESTIONS = 10
+POLL_SECS = 0.5   # get_mcq_active polling (--poll), as student_common._mcq_worker did before wait_exam_state
+LONG_POLL_SECS = 30.0  # wait_exam_state hold time, as in student_common
+
+# ---------------- timing distributions ----------------
+def timing(spec):
+    """
+    Parse a delay distribution: "const:S", "uniform:A:B", "exp:MEAN",
+    "normal:MU:SD" or "lognormal:MU:SIGMA" (seconds). Returns f(rng) -> seconds >= 0.
+    """
+    kind, *p = spec.split(":")
+    p = [float(x) for x in p]
+    dists = {
+        "const": lambda r: p[0],
+        "uniform": lambda r: r.uniform(p[0], p[1]),
+        "exp": lambda r: r.expovariate(1 / p[0]) if p[0] > 0 else 0.0,
+        "normal": lambda r: r.gauss(p[0], p[1]),
+        "lognormal": lambda r: r.lognormvariate(p[0], p[1]),
+    }
+    if kind not in dists:
+        raise ValueError(f"unknown timing distribution {spec!r}")
+    f = dists[kind]
+    return lambda r: max(0.0, f(r))
+
+# ---------------- measurements ----------------
+class Recorder:
+    """Latencies (seconds) and error counts per RPC name; plain dicts so they pickle across processes."""
+    def __init__(self):
+        self.lat = defaultdict(list)
+        self.errors = Counter()
+        self.last_error = {}
+
+    async def timed(self, name, coro):
+        t0 = time.perf_counter()
+        try:
+            return await coro
+        except Exception as e:
+            self.errors[name] += 1
+            self.last_error[name] = str(e)[:200]
+            return None
+        finally:
+            self.lat[name].append(time.perf_counter() - t0)
+
+    def dump(self):
+        return {"lat": dict(self.lat), "errors": dict(self.errors), "last_error": self.last_error}
+
+def _pct(xs, p):
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))] if xs else 0.0
+
+def report(dumps, wall):
+    lat, errors, last = defaultdict(list), Counter(), {}
+    for d in dumps:
+        for k, v in d["lat"].items(): lat[k] += v
+        errors.update(d["errors"]); last.update(d["last_error"])
+    rows = {}
+    for name in sorted(lat):
+        xs = sorted(lat[name])
+        rows[name] = {"count": len(xs), "errors": errors.get(name, 0), "per_sec": len(xs) / wall,
+                      "p50_ms": _pct(xs, 50) * 1000, "p95_ms": _pct(xs, 95) * 1000,
+                      "p99_ms": _pct(xs, 99) * 1000, "max_ms": xs[-1] * 1000}
+        if name in last: rows[name]["last_error"] = last[name]
+    return {"wall_secs": wall, "rpcs": rows}
+
+def print_report(rep):
+    print(f"\n{'rpc':<26} {'count':>8} {'errors':>7} {'/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, r in rep["rpcs"].items():
+        print(f"{name:<26} {r['count']:>8} {r['errors']:>7} {r['per_sec']:>9.1f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['max_ms']:>9.2f}")
+    for name, r in rep["rpcs"].items():
+        if "last_error" in r: print(f"  {name}: {r['last_error']}")
+    print(f"wall time {rep['wall_secs']:.1f}s")
+
+# ---------------- shared callback listener ----------------
+class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+class Listener:
+    """
+    Stands in for every virtual student's RPC server. The server's pushes do
+    not say which roll they are for, so they act per process: the first
+    start_mcq / ask_to_request wakes all students of this process.
+    """
+    def __init__(self, loop, port):
+        self.loop = loop
+        self.mcq_started = asyncio.Event()
+        self.isa_open = asyncio.Event()
+        self.calls = Counter()
+        srv = ThreadingXMLRPCServer((LISTEN_HOST, port), requestHandler=KeepAliveRequestHandler,
+                                    allow_none=True, logRequests=False)
+        for name, ev in (("start_mcq", self.mcq_started), ("ask_to_request", self.isa_open),
+                         ("notify_mcq_submitted", None), ("ping", None), ("show_results", None),
+                         ("isa_phase_done", None), ("send_time", None)):
+            srv.register_function(self._handler(name, ev), name)
+        self.url = f"http://{LISTEN_HOST}:{port}/"
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    def _handler(self, name, ev):
+        def handle(*args):
+            self.calls[name] += 1
+            if ev is not None: self.loop.call_soon_threadsafe(ev.set)
+            return True
+        return handle
+
+# ---------------- in-process ISA mutual exclusion ----------------
+class MutexGroup:
+    """Runs mutex.py sites for one process's students; message delivery is a call_later on the loop."""
+    def __init__(self, loop, rolls, algo, latency):
+        self.loop, self.latency = loop, latency
+        ids = [int(r) for r in rolls]
+        if algo == "maekawa":
+            self.sites = {s: MaekawaSite(s, grid_quorum(s, ids)) for s in ids}
+        else:
+            self.sites = {s: RicartAgrawalaSite(s, ids) for s in ids}
+        self.clock = {s: 0 for s in ids}
+        self.entered = {s: asyncio.Event() for s in ids}
+        self.messages = 0
+
+    def _deliver(self, frm, msgs):
+        for dest, kind, ts in msgs:
+            if dest != frm: self.messages += 1
+            delay = self.latency if dest != frm else 0
+            self.loop.call_later(delay, self._receive, dest, frm, kind, ts)
+
+    def _receive(self, s, frm, kind, ts):
+        site = self.sites[s]
+        self.clock[s] = max(self.clock[s], ts) + 1
+        self._deliver(s, site.on_message(frm, kind, ts))
+        if site.in_cs: self.entered[s].set()
+
+    async def acquire(self, s):
+        self.clock[s] += 1
+        self.entered[s].clear()
+        self._deliver(s, self.sites[s].request(self.clock[s]))
+        if self.sites[s].in_cs: self.entered[s].set()
+        await self.entered[s].wait()
+
+    def release(self, s):
+        self._deliver(s, self.sites[s].release())
+
+# ---------------- one virtual student ----------------
+async def student(roll, cfg, rpc, rec, listener, group, rng):
+    think, pace = timing(cfg["think"]), timing(cfg["isa_think"])
+    await rec.timed("register_student", rpc("register_student", roll, listener.url))
+    await cfg["registered"]()
+
+    # wait for the exam: server push, or the wait_exam_state long poll (--poll: get_mcq_active every POLL_SECS)
+    generation = -1
+    while not listener.mcq_started.is_set():
+        if cfg["poll"]:
+            if await rec.timed("get_mcq_active", rpc("get_mcq_active")):
+                break
+            try:
+                await asyncio.wait_for(listener.mcq_started.wait(), POLL_SECS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        state = await rec.timed("wait_exam_state", cfg["wait_exam_state"](generation, LONG_POLL_SECS))
+        if state is None:
+            await asyncio.sleep(POLL_SECS)  # failed (counted by rec); back off before polling again
+        elif state["active"]:
+            break
+        else:
+            generation = state["generation"]
+
+    pending, last_flush = {}, time.monotonic()
+    if not cfg["per_question"]:
+        await rec.timed("get_exam_paper", rpc("get_exam_paper", roll, ""))  # a fresh student: no cached hash
+    for q in range(1, QUESTIONS + 1):
+        if listener.isa_open.is_set():
+            break  # auto-submitted while we were answering
+        if cfg["per_question"]:
+            await rec.timed("get_question_for_student", rpc("get_question_for_student", roll, q))
+        await asyncio.sleep(think(rng))
+        if rng.random() >= cfg["skip"]:
+            pending[str(q)] = rng.randint(1, 4)
+        if cfg["per_answer"] and pending:
+            (qs, a), = pending.items(); pending.clear()
+            await rec.timed("submit_mcq_answer", rpc("submit_mcq_answer", roll, int(qs), a))
+        elif pending and time.monotonic() - last_flush >= cfg["flush"]:
+            await rec.timed("submit_mcq_answers_bulk", rpc("submit_mcq_answers_bulk", roll, pending))
+            pending, last_flush = {}, time.monotonic()
+    if pending:
+        await rec.timed("submit_mcq_answers_bulk", rpc("submit_mcq_answers_bulk", roll, pending))
+    if not listener.isa_open.is_set() and rng.random() < cfg["submit_frac"]:
+        await rec.timed("submit_mcq_final", rpc("submit_mcq_final", roll))
+
+    # ISA phase opens when the server broadcasts ask_to_request after the exam
+    try:
+        await asyncio.wait_for(listener.isa_open.wait(), cfg["isa_wait"])
+    except asyncio.TimeoutError:
+        rec.errors["ask_to_request (never came)"] += 1
+        return
+    if rng.random() >= cfg["isa_frac"]:
+        return
+    await asyncio.sleep(pace(rng))
+    await rec.timed("isa_cs_acquire (local)", group.acquire(int(roll)))
+    try:
+        await rec.timed("update_isa", rpc("update_isa", roll, rng.randint(0, 20)))
+    finally:
+        group.release(int(roll))
+
+# ---------------- one process ----------------
+async def _shard_main(cfg, index, rolls, barrier):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=cfg["concurrency"], thread_name_prefix="rpc")
+    pool = ConnectionPool(max_per_host=cfg["concurrency"])
+    local = threading.local()
+
+    def call(method, *args):
+        p = getattr(local, "proxy", None)
+        if p is None:
+            p = local.proxy = xmlrpc.client.ServerProxy(cfg["server"], allow_none=True,
+                                                        transport=TimeoutTransport(cfg["timeout"], pool))
+        return getattr(p, method)(*args)
+
+    def rpc(method, *args):
+        return loop.run_in_executor(executor, call, method, *args)
+
+    listener = Listener(loop, cfg["listen_port"] + index)
+    group = MutexGroup(loop, rolls, cfg["mutex"], cfg["peer_latency"])
+    rec = Recorder()
+    left = [len(rolls)]
+    all_registered = asyncio.Event()
+
+    async def registered():
+        left[0] -= 1
+        if left[0] == 0:
+            # tell the parent, which starts the exam once every process is in
+            await loop.run_in_executor(None, barrier.wait)
+            all_registered.set()
+        await all_registered.wait()
+
+    # long polls are coroutines on their own connections, so they never hold an executor thread
+    lobby = AsyncServerProxy(cfg["server"], LONG_POLL_SECS + cfg["timeout"], AsyncConnectionPool(len(rolls)))
+    cfg = dict(cfg, registered=registered, wait_exam_state=lobby.wait_exam_state)
+    seed = cfg["seed"]
+    await asyncio.gather(*(student(r, cfg, rpc, rec, listener, group, random.Random(f"{seed}-{r}"))
+                           for r in rolls))
+    out = rec.dump()
+    out["pushes"] = dict(listener.calls)
+    out["isa_messages"] = group.messages
+    executor.shutdown(wait=False)
+    return out
+
+def _run_shard(cfg, index, rolls, barrier, results):
+    try:
+        results.put((index, asyncio.run(_shard_main(cfg, index, rolls, barrier))))
+    except BaseException as e:
+        results.put((index, {"failed": repr(e)}))
+        raise
+
+def run(cfg):
+    rolls = [str(cfg["roll_base"] + i) for i in range(cfg["students"])]
+    procs = max(1, min(cfg["procs"], len(rolls)))
+    shards = [rolls[i::procs] for i in range(procs)]
+    barrier, results = mp.Barrier(procs + 1), mp.Queue()
+    workers = [mp.Process(target=_run_shard, args=(cfg, i, s, barrier, results), daemon=True)
+               for i, s in enumerate(shards)]
+    t0 = time.perf_counter()
+    for w in workers: w.start()
+    barrier.wait(timeout=cfg["isa_wait"] + 60)
+    print(f"[Loadgen] {len(rolls)} students registered across {procs} process(es) "
+          f"in {time.perf_counter() - t0:.1f}s")
+    if cfg["start"]:
+        if cfg["lobby"]:
+            print(f"[Loadgen] students waiting in the lobby for {cfg['lobby']:.0f}s ...")
+            time.sleep(cfg["lobby"])
+        xmlrpc.client.ServerProxy(cfg["server"], allow_none=True).start_mcq()
+        print("[Loadgen] start_mcq sent; waiting for the exam to run its course ...")
+    dumps = []
+    for _ in workers:
+        index, d = results.get()
+        if "failed" in d:
+            print(f"[Loadgen] process {index} failed: {d['failed']}")
+        else:
+            dumps.append(d)
+    for w in workers: w.join()
+    rep = report(dumps, time.perf_counter() - t0)
+    rep["students"], rep["procs"] = len(rolls), procs
+    rep["isa_messages"] = sum(d["isa_messages"] for d in dumps)
+    lobby_calls = sum(rep["rpcs"].get(m, {}).get("count", 0) for m in ("get_mcq_active", "wait_exam_state"))
+    rep["lobby"] = {"secs": cfg["lobby"], "calls": lobby_calls,
+                    "calls_per_student_per_sec": lobby_calls / len(rolls) / cfg["lobby"] if cfg["lobby"] else None}
+    pushes = Counter()
+    for d in dumps: pushes.update(d["pushes"])
+    rep["server_pushes"] = dict(pushes)
+    return rep
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless virtual students for load testing the exam system.")
+    ap.add_argument("--students", type=int, default=100)
+    ap.add_argument("--procs", type=int, default=1, help="worker processes (students are split evenly)")
+    ap.add_argument("--concurrency", type=int, default=64, help="RPC threads/connections per process")
+    ap.add_argument("--server", default=SERVER_URL)
+    ap.add_argument("--listen-port", type=int, default=LISTEN_PORT)
+    ap.add_argument("--roll-base", type=int, default=ROLL_BASE)
+    ap.add_argument("--think", default="exp:1.0", help="time spent on each question (see timing())")
+    ap.add_argument("--skip", type=float, default=0.05, help="probability of skipping a question")
+    ap.add_argument("--flush", type=float, default=0.0,
+                    help="seconds between batched answer uploads (0: upload each answer, like AnswerBuffer)")
+    ap.add_argument("--per-question", action="store_true", help="get_question_for_student per question, not get_exam_paper")
+    ap.add_argument("--per-answer", action="store_true", help="one submit_mcq_answer per question instead")
+    ap.add_argument("--submit-frac", type=float, default=0.8, help="fraction submitting before the timeout")
+    ap.add_argument("--isa-frac", type=float, default=0.2, help="fraction entering ISA marks")
+    ap.add_argument("--isa-think", default="uniform:0:2", help="delay before requesting ISA entry")
+    ap.add_argument("--isa-wait", type=float, default=120.0, help="max seconds to wait for the ISA phase")
+    ap.add_argument("--mutex", choices=("ra", "maekawa"), default=os.environ.get("EXAM_MUTEX", "ra"))
+    ap.add_argument("--peer-latency", type=float, default=0.001, help="simulated student-to-student delay")
+    ap.add_argument("--timeout", type=float, default=30.0, help="per-RPC timeout")
+    ap.add_argument("--no-start", dest="start", action="store_false", help="do not call start_mcq")
+    ap.add_argument("--lobby", type=float, default=0.0, help="seconds between registration and start_mcq")
+    ap.add_argument("--poll", action="store_true", help="poll get_mcq_active instead of the wait_exam_state long poll")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="also write the report here")
+    a = ap.parse_args(argv)
+    for spec in (a.think, a.isa_think): timing(spec)  # fail fast on a bad spec
+    cfg = {k: v for k, v in vars(a).items() if k != "json"}
+    rep = run(cfg)
+    print_report(rep)
+    print(f"ISA mutex messages: {rep['isa_messages']}; server pushes received: {rep['server_pushes']}")
+    if a.lobby:
+        print(f"lobby: {rep['lobby']['calls']} exam-state RPCs in {a.lobby:.0f}s, "
+              f"{rep['lobby']['calls_per_student_per_sec']:.3f} per student per second")
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f:
+            json.dump(rep, f, indent=2)
+    return rep
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# longpoll.py – generation counters that long-poll RPCs wait on without pinning server threads
+import asyncio, threading
+
+class Watch:
+    """
+    A generation number that bump() advances. Each generation has its own
+    Event and callback set, so a waiter wakes exactly when the generation it
+    saw is over, never on unrelated notifications.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._over = threading.Event()  # set when the current generation ends
+        self._callbacks = {}
+
+    def bump(self):
+        with self._lock:
+            self.generation += 1
+            over, self._over = self._over, threading.Event()
+            callbacks, self._callbacks = self._callbacks, {}
+        over.set()
+        for cb in callbacks.values():
+            cb()
+
+    def wait(self, generation, timeout):
+        """Block until the generation is past `generation` or `timeout` passes; returns the current one."""
+        with self._lock:
+            over = self._over if self.generation == generation else None
+        if over is not None:
+            over.wait(timeout)
+        return self.generation
+
+    def subscribe(self, generation, callback):
+        """Call callback() once the generation moves past `generation` (at once if it already has)."""
+        with self._lock:
+            if self.generation == generation:
+                token = object()
+                self._callbacks[token] = callback
+                return token
+        callback()
+        return None
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._callbacks.pop(token, None)
+
+    async def wait_async(self, generation, timeout):
+        """wait() for coroutines: parks on the event loop instead of a thread."""
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        def wake():
+            loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+        token = self.subscribe(generation, wake)
+        try:
+            await asyncio.wait_for(done, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.unsubscribe(token)
+        return self.generation
+
+class Parked(Exception):
+    """
+    Raised by long_poll() on threads that allow_parking(): the server takes
+    the connection off its worker and sends reply() once `watch` is past
+    `generation` or `timeout` seconds pass (rpc_server.py, aio_rpc.py).
+    """
+    def __init__(self, watch, generation, timeout, reply):
+        super().__init__("long poll parked")
+        self.watch, self.generation, self.timeout, self.reply = watch, generation, timeout, reply
+
+_parking = threading.local()
+
+def allow_parking():
+    """Mark this thread as a server thread whose caller handles Parked."""
+    _parking.ok = True
+
+def long_poll(watch, generation, timeout, reply):
+    """
+    Body of a long-poll RPC: reply() now if `watch` is already past
+    `generation`, else once it moves or `timeout` passes. On server threads
+    that allow_parking() this raises Parked and frees the thread; anywhere
+    else it blocks.
+    """
+    if watch.generation != generation or timeout <= 0:
+        return reply()
+    if getattr(_parking, "ok", False):
+        raise Parked(watch, generation, timeout, reply)
+    watch.wait(generation, timeout)
+    return reply()
@@ -0,0 +1,239 @@
+# mutex.py – event-driven mutual-exclusion cores (Ricart-Agrawala, Maekawa) and a simulator
+#
+# The cores do no I/O: every handler returns a list of (dest, kind, ts)
+# messages for the caller to deliver, so the same code runs over XML-RPC in
+# student_common.py and inside the discrete-event simulator below.
+import heapq, math, random
+from typing import Dict, List, Tuple
+
+Msg = Tuple[int, str, int]  # (destination site, kind, timestamp)
+
+def grid_quorum(site: int, sites: List[int]) -> List[int]:
+    """Maekawa grid quorum: the site's row plus its column in a ceil(sqrt(N)) wide grid."""
+    sites = sorted(sites)
+    k = math.ceil(math.sqrt(len(sites)))
+    r, c = divmod(sites.index(site), k)
+    return sorted(set(sites[r * k:(r + 1) * k]) | set(sites[c::k]))
+
+class RicartAgrawalaSite:
+    """The protocol student_common runs by default: REQUEST to all, enter after N-1 OKs."""
+    def __init__(self, site: int, sites: List[int]):
+        self.site = site
+        self.peers = [s for s in sites if s != site]
+        self.my_req = None
+        self.oks = set()
+        self.deferred = set()
+        self.in_cs = False
+
+    def request(self, ts) -> List[Msg]:
+        self.my_req = (ts, self.site)
+        self.oks = set()
+        if not self.peers:
+            self.in_cs = True
+        return [(p, "request", ts) for p in self.peers]
+
+    def on_message(self, frm, kind, ts) -> List[Msg]:
+        if kind == "request":
+            if self.in_cs or (self.my_req is not None and self.my_req < (ts, frm)):
+                self.deferred.add(frm)
+                return []
+            return [(frm, "ok", ts)]
+        if kind == "ok" and self.my_req is not None:
+            self.oks.add(frm)
+            if len(self.oks) >= len(self.peers):
+                self.in_cs = True
+        return []
+
+    def release(self) -> List[Msg]:
+        ts = self.my_req[0]
+        self.in_cs, self.my_req = False, None
+        out = [(d, "ok", ts) for d in sorted(self.deferred)]
+        self.deferred.clear()
+        return out
+
+class MaekawaSite:
+    """
+    Maekawa's quorum algorithm with the INQUIRE/YIELD/FAILED extension that
+    makes it deadlock-free. Every site is a voter that locks for one request at
+    a time; a requester needs the votes of its whole quorum (about 2*sqrt(N)
+    sites, itself included), so one CS entry costs O(sqrt(N)) messages.
+
+    Requests are re-sent when votes are slow to come, so a voter ignores one
+    it already holds or has queued; a stale one (its request already over)
+    gets a grant the requester hands straight back. RELEASE and YIELD only
+    count for the exact (ts, site) request holding the vote.
+    """
+    def __init__(self, site: int, quorum: List[int]):
+        self.site = site
+        self.quorum = set(quorum)
+        # voter side
+        self.locked_for = None  # (ts, site) currently holding our vote
+        self.waiting = []       # heap of (ts, site)
+        self.inquired = False
+        # requester side
+        self.my_req = None
+        self.grants = set()
+        self.failed_from = set()
+        self.yielded_to = set()
+        self.inquiries = set()
+        self.in_cs = False
+
+    # ---- requester ----
+    def request(self, ts) -> List[Msg]:
+        self.my_req = (ts, self.site)
+        self.grants, self.failed_from, self.yielded_to, self.inquiries = set(), set(), set(), set()
+        return [(v, "request", ts) for v in sorted(self.quorum)]
+
+    def release(self) -> List[Msg]:
+        ts = self.my_req[0]
+        self.in_cs, self.my_req = False, None
+        return [(v, "release", ts) for v in sorted(self.quorum)]
+
+    def _blocked(self):
+        return bool(self.failed_from or self.yielded_to)
+
+    def _yield(self, v) -> Msg:
+        self.grants.discard(v)
+        self.yielded_to.add(v)
+        self.inquiries.discard(v)
+        return (v, "yield", self.my_req[0])
+
+    # ---- voter ----
+    def _grant_next(self) -> List[Msg]:
+        self.inquired = False
+        if not self.waiting:
+            self.locked_for = None
+            return []
+        self.locked_for = heapq.heappop(self.waiting)
+        return [(self.locked_for[1], "grant", self.locked_for[0])]
+
+    def on_message(self, frm, kind, ts) -> List[Msg]:
+        out = []
+        if kind == "request":
+            req = (ts, frm)
+            if req == self.locked_for or req in self.waiting:
+                pass  # re-sent: it already got our GRANT or FAILED/INQUIRE
+            elif self.locked_for is None:
+                self.locked_for = req
+                out.append((frm, "grant", ts))
+            else:
+                best = min([self.locked_for] + self.waiting[:1])
+                if req < best:
+                    # outranks everyone: ask the holder to give the vote back
+                    if self.waiting:
+                        out.append((self.waiting[0][1], "failed", self.waiting[0][0]))
+                    if not self.inquired:
+                        self.inquired = True
+                        out.append((self.locked_for[1], "inquire", self.locked_for[0]))
+                else:
+                    out.append((frm, "failed", ts))
+                heapq.heappush(self.waiting, req)
+        elif kind == "release":
+            if self.locked_for == (ts, frm):
+                out += self._grant_next()
+            elif (ts, frm) in self.waiting:
+                # requester gave up before we voted for it
+                self.waiting.remove((ts, frm))
+                heapq.heapify(self.waiting)
+        elif kind == "yield":
+            if self.locked_for == (ts, frm):
+                heapq.heappush(self.waiting, self.locked_for)
+                out += self._grant_next()
+        # requester side
+        elif self.my_req is None or ts != self.my_req[0]:
+            if kind == "grant":
+                out.append((frm, "release", ts))  # vote for an abandoned request: hand it back
+        elif kind == "grant":
+            self.grants.add(frm)
+            self.failed_from.discard(frm)
+            self.yielded_to.discard(frm)
+            if frm in self.inquiries and self._blocked():
+                out.append(self._yield(frm))
+            elif self.grants >= self.quorum:
+                self.in_cs = True
+                self.inquiries.clear()
+        elif kind == "failed":
+            self.failed_from.add(frm)
+            for v in sorted(self.inquiries & self.grants):
+                out.append(self._yield(v))
+        elif kind == "inquire" and not self.in_cs:
+            if frm in self.grants and self._blocked():
+                out.append(self._yield(frm))
+            else:
+                self.inquiries.add(frm)  # answer once we know we are blocked
+        return out
+
+# ---------------- simulator ----------------
+def simulate(n, algo="ra", rounds=1, latency=0.001, jitter=0.0005, cs_time=0.002, window=0.05, seed=1,
+             duplicate=0.0):
+    """
+    Run `rounds` CS requests per site over a simulated network with random
+    per-message delay; with `duplicate` > 0 that fraction of REQUESTs is
+    delivered a second time, later (a retransmit that crossed the votes; only
+    meaningful for "maekawa" – RA's OK does not say which request it answers). Returns
+    messages per CS entry and request-to-CS latencies (seconds of simulated
+    time). Raises AssertionError if two sites ever share the CS.
+    """
+    rng = random.Random(seed)
+    sites = list(range(1, n + 1))
+    if algo == "ra":
+        nodes = {s: RicartAgrawalaSite(s, sites) for s in sites}
+    elif algo == "maekawa":
+        nodes = {s: MaekawaSite(s, grid_quorum(s, sites)) for s in sites}
+    else:
+        raise ValueError(f"unknown algorithm {algo!r}")
+    clock: Dict[int, int] = {s: 0 for s in sites}
+    events = []  # (time, seq, type, site, payload)
+    seq = 0
+
+    def push(t, typ, site, payload=None):
+        nonlocal seq
+        seq += 1
+        heapq.heappush(events, (t, seq, typ, site, payload))
+
+    sent = 0
+    def deliver(now, frm, msgs):
+        nonlocal sent
+        for dest, kind, ts in msgs:
+            if dest == frm:
+                push(now, "msg", dest, (frm, kind, ts))  # self-vote, not on the wire
+            else:
+                sent += 1
+                push(now + latency + rng.uniform(0, jitter), "msg", dest, (frm, kind, ts))
+                if kind == "request" and duplicate and rng.random() < duplicate:
+                    push(now + latency + rng.uniform(0, 20 * jitter), "msg", dest, (frm, kind, ts))
+
+    remaining = {s: rounds for s in sites}
+    for s in sites:
+        push(rng.uniform(0, window), "want", s)
+    requested_at, latencies, in_cs = {}, [], set()
+
+    while events:
+        now, _, typ, s, payload = heapq.heappop(events)
+        node = nodes[s]
+        was_in = node.in_cs
+        if typ == "want":
+            clock[s] += 1
+            requested_at[s] = now
+            deliver(now, s, node.request(clock[s]))
+        elif typ == "msg":
+            frm, kind, ts = payload
+            clock[s] = max(clock[s], ts) + 1
+            deliver(now, s, node.on_message(frm, kind, ts))
+        elif typ == "exit":
+            in_cs.discard(s)
+            deliver(now, s, node.release())
+            remaining[s] -= 1
+            if remaining[s]:
+                push(now + rng.uniform(0, window), "want", s)
+            continue
+        if node.in_cs and not was_in:
+            assert not in_cs, f"mutual exclusion violated: {s} entered while {in_cs} inside"
+            in_cs.add(s)
+            latencies.append(now - requested_at[s])
+            push(now + cs_time, "exit", s)
+
+    entries = len(latencies)
+    assert entries == n * rounds, f"only {entries}/{n * rounds} CS entries completed"
+    return {"algo": algo, "students": n, "entries": entries,
+            "messages_per_cs": sent / entries, "latencies": latencies}
@@ -0,0 +1,133 @@
+# results_store.py – batched, index-backed writer for results.xlsx
+import os, time, atexit, tempfile, threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from openpyxl import Workbook, load_workbook
+
+HEADER = ["Roll", "Name", "Marks", "MCQ", "ISA"]
+
+class ResultsStore:
+    """
+    Keeps results.xlsx in memory with a roll -> row index and buffers cell
+    updates. Pending updates are flushed as one save when `flush_every`
+    updates have queued up or `flush_interval` seconds have passed, whichever
+    comes first. Saves go to a temp file that is renamed over the real one,
+    so readers never see a half-written workbook.
+    """
+    def __init__(self, path, flush_every: int = 50, flush_interval: float = 0.5):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()     # guards the pending buffers
+        self._io_lock = threading.Lock()  # serialises load/save of the workbook
+        self._wake = threading.Event()
+        self._wb = None
+        self._index: Dict[str, int] = {}
+        self._stamp = None  # (mtime_ns, size) of the file we last loaded/wrote
+        self._pending: Dict[str, Dict[int, object]] = {}
+        self._new_rows: Dict[str, List] = {}
+        self._flusher = None
+        self.flushes = 0
+        atexit.register(self.flush)
+
+    # ---- loading ----
+    def _file_stamp(self):
+        try:
+            st = self.path.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        # reload only if someone else touched the file since our last write
+        stamp = self._file_stamp()
+        if self._wb is not None and stamp == self._stamp:
+            return
+        if stamp is not None:
+            self._wb = load_workbook(self.path)
+        else:
+            self._wb = Workbook()
+            self._wb.active.append(HEADER)
+        ws = self._wb.active
+        self._index = {}
+        for row in ws.iter_rows(min_row=2, max_col=1):
+            if row[0].value is not None:
+                self._index[str(row[0].value)] = row[0].row
+        self._stamp = stamp
+
+    def exists(self):
+        with self._lock:
+            return self.path.exists() or bool(self._new_rows)
+
+    # ---- updates ----
+    def update(self, roll, cells: Dict[int, object], new_row: Optional[List] = None):
+        """Queue `cells` (column -> value) for `roll`; append `new_row` if the roll has no row yet."""
+        roll = str(roll)
+        with self._lock:
+            self._pending.setdefault(roll, {}).update(cells)
+            if new_row is not None and roll not in self._new_rows:
+                self._new_rows[roll] = list(new_row)
+            queued = len(self._pending)
+        self._ensure_flusher()
+        if queued >= self.flush_every:
+            self._wake.set()
+        return True
+
+    def flush(self):
+        with self._io_lock:
+            with self._lock:
+                if not self._pending:
+                    return False
+                pending, new_rows = self._pending, self._new_rows
+                self._pending, self._new_rows = {}, {}
+            try:
+                self._load()
+                ws = self._wb.active
+                for roll, cells in pending.items():
+                    r = self._index.get(roll)
+                    if r is None:
+                        row = new_rows.get(roll) or [roll, f"Student{roll}", "NA", "NA", "NA"]
+                        ws.append(row)
+                        r = self._index[roll] = ws.max_row
+                    for col, value in cells.items():
+                        ws.cell(row=r, column=col, value=value)
+                fd, tmp = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp",
+                                           dir=self.path.parent)
+                os.close(fd)
+                try:
+                    self._wb.save(tmp)
+                    os.replace(tmp, self.path)
+                except Exception:
+                    if os.path.exists(tmp): os.unlink(tmp)
+                    raise
+                self._stamp = self._file_stamp()
+                self.flushes += 1
+            except Exception:
+                # keep the updates for the next attempt, newer values win
+                with self._lock:
+                    for roll, cells in pending.items():
+                        self._pending[roll] = {**cells, **self._pending.get(roll, {})}
+                    for roll, row in new_rows.items():
+                        self._new_rows.setdefault(roll, row)
+                self._wb = None
+                raise
+        return True
+
+    # ---- background flusher ----
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[Results] ERROR flushing {self.path}: {e}")
+                time.sleep(self.flush_interval)
@@ -0,0 +1,142 @@
+# rpc_metrics.py – per-method and per-peer RPC latency/throughput counters for every node
+import os, time, threading
+from bisect import bisect_left
+from typing import Dict
+from longpoll import Parked
+
+# upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# serve Prometheus text at GET /metrics on every node's RPC port when set
+PROMETHEUS = os.environ.get("EXAM_PROMETHEUS", "") not in ("", "0")
+UNKNOWN_METHOD = "<unknown>"  # one histogram for every call to an unregistered name
+
+def method_label(method, registered):
+    """The name to record a call under: clients cannot mint histograms by calling made-up methods."""
+    return method if isinstance(method, str) and method in registered else UNKNOWN_METHOD
+
+def _escape(value):
+    # Prometheus label values: backslash, double quote and newline are escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "errors", "in_flight")
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+        self.in_flight = 0
+
+    def observe(self, secs, ok):
+        self.counts[bisect_left(BUCKETS, secs)] += 1
+        self.sum += secs
+        self.count += 1
+        if not ok: self.errors += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation (+Inf reports the last finite bound)
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BUCKETS[min(i, len(BUCKETS) - 1)]
+        return BUCKETS[-1]
+
+    def summary(self):
+        return {"calls": self.count, "errors": self.errors, "in_flight": self.in_flight,
+                "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+                "p50_ms": self.quantile(0.50) * 1000, "p95_ms": self.quantile(0.95) * 1000,
+                "p99_ms": self.quantile(0.99) * 1000,
+                "buckets": {**{str(b * 1000): c for b, c in zip(BUCKETS, self.counts)}, "+Inf": self.counts[-1]}}
+
+class Metrics:
+    """
+    Counters for RPCs this node serves (per method) and makes (per peer
+    host:port). Latencies go into fixed buckets, so recording is O(1) and
+    memory does not grow with traffic.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.methods: Dict[str, Histogram] = {}
+        self.peers: Dict[str, Histogram] = {}
+        self.rejected = 0  # requests refused by an overloaded server (rpc_server.py)
+        self.started_at = time.time()
+
+    def _hist(self, table, key):
+        h = table.get(key)
+        if h is None:
+            h = table[key] = Histogram()
+        return h
+
+    def call_started(self, method):
+        with self._lock:
+            self._hist(self.methods, method).in_flight += 1
+
+    def call_finished(self, method, secs, ok):
+        with self._lock:
+            h = self._hist(self.methods, method)
+            h.in_flight -= 1
+            h.observe(secs, ok)
+
+    def observe_outbound(self, peer, secs, ok):
+        with self._lock:
+            self._hist(self.peers, peer).observe(secs, ok)
+
+    def observe_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"uptime_secs": round(time.time() - self.started_at, 3), "rejected": self.rejected,
+                    "methods": {m: h.summary() for m, h in self.methods.items()},
+                    "peers": {p: h.summary() for p, h in self.peers.items()}}
+
+    def prometheus(self):
+        out = []
+        with self._lock:
+            for table, prefix, label in ((self.methods, "rpc_server", "method"), (self.peers, "rpc_client", "peer")):
+                out.append(f"# TYPE {prefix}_latency_seconds histogram")
+                for key, h in sorted(table.items()):
+                    lbl = f'{label}="{_escape(key)}"'
+                    cum = 0
+                    for b, c in zip(BUCKETS, h.counts):
+                        cum += c
+                        out.append(f'{prefix}_latency_seconds_bucket{{{lbl},le="{b}"}} {cum}')
+                    out.append(f'{prefix}_latency_seconds_bucket{{{lbl},le="+Inf"}} {h.count}')
+                    out.append(f"{prefix}_latency_seconds_sum{{{lbl}}} {h.sum}")
+                    out.append(f"{prefix}_latency_seconds_count{{{lbl}}} {h.count}")
+                out.append(f"# TYPE {prefix}_errors_total counter")
+                out += [f'{prefix}_errors_total{{{label}="{_escape(k)}"}} {h.errors}' for k, h in sorted(table.items())]
+            out.append("# TYPE rpc_server_rejected_total counter")
+            out.append(f"rpc_server_rejected_total {self.rejected}")
+            out.append("# TYPE rpc_server_in_flight gauge")
+            out += [f'rpc_server_in_flight{{method="{_escape(k)}"}} {h.in_flight}' for k, h in sorted(self.methods.items())]
+        return "\n".join(out) + "\n"
+
+default_metrics = Metrics()
+
+class InstrumentedMixin:
+    """
+    Put first in a SimpleXMLRPCServer subclass's bases: times every dispatched
+    call into default_metrics and registers a get_metrics() RPC.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.register_function(default_metrics.snapshot, "get_metrics")
+
+    def _dispatch(self, method, params):
+        name = method_label(method, self.funcs)
+        default_metrics.call_started(name)
+        t, ok = time.perf_counter(), False
+        try:
+            result = super()._dispatch(method, params)
+            ok = True
+            return result
+        except Parked:
+            ok = True  # a long poll handed to the server to finish; not a failure
+            raise
+        finally:
+            default_metrics.call_finished(name, time.perf_counter() - t, ok)
@@ -0,0 +1,295 @@
+# rpc_pool.py – shared keep-alive connection pool for XML-RPC proxies
+import os, struct, time, threading, urllib.parse
+import xmlrpc.client, http.client
+import binrpc
+from xmlrpc.server import SimpleXMLRPCRequestHandler
+from typing import Dict, List, Tuple
+from rpc_metrics import default_metrics, PROMETHEUS
+
+RPC_TIMEOUT = 5.0
+MAX_PER_HOST = 8      # open connections (idle + in use) per host
+MAX_IDLE_SECS = 30.0  # idle connections older than this are closed
+SWEEP_SECS = 5.0      # how often acquire/release also evict stale idle connections to every other host
+# opt-in: talk binrpc frames to peers that advertised support on an earlier XML-RPC reply
+BINARY_RPC = os.environ.get("EXAM_BINARY_RPC", "") not in ("", "0")
+_binary_hosts: Dict[str, bool] = {}  # "host:port" -> peer accepts binrpc frames
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent HTTPConnections keyed by "host:port".
+    A connection is checked out for exactly one request/response and then
+    returned; at most `max_per_host` connections exist per host, and callers
+    block (up to their timeout) when all of them are busy.
+
+    Idle connections older than `max_idle` are closed: for the host being
+    acquired on every call, and for all hosts every SWEEP_SECS, so a node
+    that talked to thousands of peers once does not keep their sockets.
+    """
+    def __init__(self, max_per_host=MAX_PER_HOST, max_idle=MAX_IDLE_SECS):
+        self.max_per_host = max_per_host
+        self.max_idle = max_idle
+        self._cond = threading.Condition()
+        self._idle: Dict[str, List[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._open: Dict[str, int] = {}
+        self._swept = time.monotonic()
+        self.created = 0
+        self.reused = 0
+
+    def _evict(self, host, now):
+        idle = self._idle.get(host, [])
+        keep = []
+        for conn, last in idle:
+            if now - last > self.max_idle:
+                conn.close(); self._open[host] -= 1
+            else:
+                keep.append((conn, last))
+        self._idle[host] = keep
+
+    def _sweep(self, now):
+        # caller holds the lock
+        if now - self._swept < SWEEP_SECS:
+            return
+        self._swept = now
+        for host in list(self._idle):
+            self._evict(host, now)
+            if not self._idle[host]:
+                del self._idle[host]
+                if not self._open.get(host):
+                    self._open.pop(host, None)
+
+    def acquire(self, host, timeout=RPC_TIMEOUT):
+        """Return (connection, reused) for `host`."""
+        deadline = time.monotonic() + (timeout or RPC_TIMEOUT)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._sweep(now)
+                self._evict(host, now)
+                idle = self._idle[host]
+                if idle:
+                    conn, _ = idle.pop()  # most recently used first
+                    conn.timeout = timeout
+                    if conn.sock is not None: conn.sock.settimeout(timeout)
+                    self.reused += 1
+                    return conn, True
+                if self._open.get(host, 0) < self.max_per_host:
+                    self._open[host] = self._open.get(host, 0) + 1
+                    self.created += 1
+                    return http.client.HTTPConnection(host, timeout=timeout), False
+                if now >= deadline:
+                    raise TimeoutError(f"connection pool for {host} exhausted ({self.max_per_host} busy)")
+                self._cond.wait(deadline - now)
+
+    def release(self, host, conn):
+        with self._cond:
+            now = time.monotonic()
+            self._sweep(now)
+            self._idle.setdefault(host, []).append((conn, now))
+            self._cond.notify()
+
+    def discard(self, host, conn):
+        conn.close()
+        with self._cond:
+            self._open[host] = max(0, self._open.get(host, 1) - 1)
+            self._cond.notify()
+
+    def close_idle(self, host):
+        """Close every idle connection to `host`, e.g. once one of them turned out stale."""
+        with self._cond:
+            for conn, _ in self._idle.pop(host, []):
+                conn.close()
+                self._open[host] -= 1
+            self._cond.notify_all()
+
+    def close_all(self):
+        with self._cond:
+            for host, idle in self._idle.items():
+                for conn, _ in idle:
+                    conn.close()
+                self._open[host] = max(0, self._open.get(host, 0) - len(idle))
+            self._idle.clear()
+
+default_pool = ConnectionPool()
+
+class TimeoutTransport(xmlrpc.client.Transport):
+    """Transport with a socket timeout that borrows connections from a ConnectionPool."""
+    def __init__(self, timeout=RPC_TIMEOUT, pool=None):
+        super().__init__()
+        self._timeout = timeout
+        self._pool = pool or default_pool
+        self._local = threading.local()
+
+    def make_connection(self, host):
+        # send_request() calls this; hand it the connection checked out in request()
+        return self._local.conn
+
+    def request(self, host, handler, request_body, verbose=False):
+        t, ok = time.perf_counter(), False
+        try:
+            result = self._request(host, handler, request_body, verbose)
+            ok = True
+            return result
+        finally:
+            default_metrics.observe_outbound(host, time.perf_counter() - t, ok)
+
+    def _request(self, host, handler, request_body, verbose):
+        for attempt in (0, 1):
+            conn, reused = self._pool.acquire(host, self._timeout)
+            self._local.conn = conn
+            try:
+                self.send_request(host, handler, request_body, verbose)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine):
+                # the peer closed an idle keep-alive connection: retry once on a fresh one.
+                # If it restarted, every other idle connection to it is dead as well.
+                self._pool.discard(host, conn)
+                if reused and attempt == 0:
+                    self._pool.close_idle(host)
+                    continue
+                raise
+            except Exception:
+                self._pool.discard(host, conn)
+                raise
+            finally:
+                self._local.conn = None
+            if resp.status == 200:
+                if resp.getheader(binrpc.NEGOTIATE_HEADER):
+                    _binary_hosts[host] = True
+                try:
+                    self.verbose = verbose
+                    result = self.parse_response(resp)
+                except Exception:
+                    self._pool.discard(host, conn)
+                    raise
+                if resp.will_close:
+                    self._pool.discard(host, conn)
+                else:
+                    self._pool.release(host, conn)
+                return result
+            resp.read()
+            self._pool.discard(host, conn)
+            raise xmlrpc.client.ProtocolError(host + handler, resp.status, resp.reason,
+                                              dict(resp.getheaders()))
+
+    def close(self):
+        pass  # connections belong to the pool
+
+def _recv_exactly(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionResetError("peer closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+class _Method:
+    def __init__(self, call, name):
+        self._call, self._name = call, name
+    def __getattr__(self, name):
+        return _Method(self._call, f"{self._name}.{name}")
+    def __call__(self, *args):
+        return self._call(self._name, args)
+
+class BinaryServerProxy:
+    """
+    ServerProxy look-alike that sends binrpc frames over the pooled
+    connections once the peer has advertised NEGOTIATE_HEADER, and plain
+    XML-RPC until then (or forever, for peers that never do).
+    """
+    def __init__(self, url, timeout=RPC_TIMEOUT, pool=None):
+        self._xml = xmlrpc.client.ServerProxy(url, allow_none=True, transport=TimeoutTransport(timeout, pool))
+        self._host = urllib.parse.urlsplit(url).netloc
+        self._timeout = timeout
+        self._pool = pool or default_pool
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _Method(self._call, name)
+
+    def _call(self, method, params):
+        if not _binary_hosts.get(self._host):
+            return getattr(self._xml, method)(*params)
+        t, ok = time.perf_counter(), False
+        try:
+            result = self._binary_call(method, params)
+            ok = True
+            return result
+        finally:
+            default_metrics.observe_outbound(self._host, time.perf_counter() - t, ok)
+
+    def _binary_call(self, method, params):
+        data = binrpc.request(method, params)
+        for attempt in (0, 1):
+            conn, reused = self._pool.acquire(self._host, self._timeout)
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                sock = conn.sock
+                sock.sendall(data)
+                resp = binrpc.read_frame(lambda n: _recv_exactly(sock, n))
+            except ConnectionError:
+                self._pool.discard(self._host, conn)
+                if reused and attempt == 0:
+                    self._pool.close_idle(self._host)
+                    continue
+                raise
+            except Exception:
+                self._pool.discard(self._host, conn)
+                raise
+            self._pool.release(self._host, conn)
+            return binrpc.result_of(resp)
+
+def proxy(url, timeout=RPC_TIMEOUT, binary=None):
+    if binary is None:
+        binary = BINARY_RPC
+    if binary:
+        return BinaryServerProxy(url, timeout)
+    return xmlrpc.client.ServerProxy(url, allow_none=True, transport=TimeoutTransport(timeout))
+
+class KeepAliveRequestHandler(SimpleXMLRPCRequestHandler):
+    """HTTP/1.1 request handler so pooled client connections are kept open."""
+    protocol_version = "HTTP/1.1"
+    timeout = 60  # drop idle client connections server-side
+    binary = False  # the request being served arrived as a binrpc frame
+
+    def end_headers(self):
+        self.send_header(binrpc.NEGOTIATE_HEADER, "1")  # we also accept binrpc frames
+        super().end_headers()
+
+    def _read_exactly(self, n):
+        data = self.rfile.read(n)
+        if len(data) < n:
+            raise ConnectionResetError("peer closed the connection")
+        return data
+
+    def handle_one_request(self):
+        # a binrpc frame or an HTTP request, told apart by the first byte
+        try:
+            first = self.rfile.peek(1)[:1]
+        except OSError:
+            self.close_connection = True
+            return
+        if first != binrpc.FRAME_MARK:
+            return super().handle_one_request()
+        self.binary = True
+        try:
+            payload = binrpc.read_frame(self._read_exactly)
+            self.wfile.write(binrpc.dispatch(self.server._dispatch, payload))
+            self.wfile.flush()
+            self.close_connection = False
+        except (OSError, ValueError, struct.error):
+            self.close_connection = True
+
+    def do_GET(self):
+        # Prometheus scrape endpoint (EXAM_PROMETHEUS=1); XML-RPC itself is POST-only
+        if not PROMETHEUS or self.path.split("?")[0] != "/metrics":
+            self.report_404()
+            return
+        body = default_metrics.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,209 @@
+# rpc_server.py – XML-RPC server with a fixed worker pool and a bounded request queue
+import io, queue, selectors, socket, threading, time
+import xmlrpc.client
+import binrpc
+from collections import deque
+from xmlrpc.server import SimpleXMLRPCServer
+from rpc_pool import KeepAliveRequestHandler
+from rpc_metrics import InstrumentedMixin, default_metrics
+from longpoll import Parked, allow_parking
+
+WORKERS = 32           # threads executing requests
+QUEUE_LIMIT = 1024     # requests waiting for a worker before new ones are refused
+LISTEN_BACKLOG = 1024  # pending TCP connects (socketserver's default is 5)
+IDLE_SECS = 60.0       # idle keep-alive connections are closed after this long
+OVERLOAD_FAULT = -32001  # XML-RPC fault code sent when the queue is full
+
+class _OneRequest:
+    """Mixed into the request handler: serve one request, leave the socket open."""
+    parked = None  # the call raised Parked: the server replies later, from the poller
+
+    def setup(self):
+        super().setup()
+        # hold the reply back until we know the call did not park
+        self._out, self.wfile = self.wfile, io.BytesIO()
+
+    def handle(self):
+        self.close_connection = True
+        try:
+            self.handle_one_request()
+        finally:
+            self.parked = self.server._take_parked()
+        if self.parked is None:
+            self._out.write(self.wfile.getvalue())
+
+    def finish(self):
+        self.wfile = self._out
+        super().finish()
+
+class PooledXMLRPCServer(InstrumentedMixin, SimpleXMLRPCServer):
+    """
+    Drop-in for the ThreadingMixIn servers, which start one thread per
+    connection and keep it for the connection's whole keep-alive life.
+
+    Here idle connections sit in one selector thread. When one becomes
+    readable it is queued for `workers` threads that each serve a single
+    request and hand the connection back. If `queue_limit` requests are
+    already waiting, the new one is answered at once with an OVERLOAD_FAULT
+    fault and the connection is closed, so a stampede gets fast refusals
+    instead of unbounded threads.
+
+    Long-poll calls (longpoll.long_poll) do not hold a worker while they
+    wait: the connection is parked until its Watch moves or the poll times
+    out, and the poller thread then sends the reply.
+    """
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, addr, requestHandler=KeepAliveRequestHandler, workers=WORKERS,
+                 queue_limit=QUEUE_LIMIT, **kwargs):
+        handler = type(f"OneRequest{requestHandler.__name__}", (_OneRequest, requestHandler), {})
+        super().__init__(addr, requestHandler=handler, **kwargs)
+        self.workers = workers
+        self._jobs = queue.Queue(maxsize=queue_limit)
+        self._sel = selectors.DefaultSelector()
+        self._idle = {}  # socket -> (client address, idle since)
+        self._returned = deque()  # (sock, addr, reply to send first or None) to (re)watch, from other threads
+        self._parked = {}  # socket -> [client address, Parked, binary?, deadline, watch token]
+        self._park_lock = threading.Lock()
+        self._local = threading.local()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ)
+        self.rejected = 0
+        threading.Thread(target=self._poll_loop, name="rpc-poller", daemon=True).start()
+        for i in range(workers):
+            threading.Thread(target=self._work_loop, name=f"rpc-worker-{i}", daemon=True).start()
+
+    def queue_depth(self):
+        return self._jobs.qsize()
+
+    # ---- socketserver hooks ----
+    def process_request(self, request, client_address):
+        self._watch(request, client_address)
+
+    def _watch(self, sock, addr, reply=None):
+        self._returned.append((sock, addr, reply))
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    # ---- selector thread ----
+    def _poll_loop(self):
+        last_sweep = time.monotonic()
+        while True:
+            for key, _ in self._sel.select(1.0):
+                if key.fileobj is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096): pass
+                    except OSError:
+                        pass
+                    continue
+                sock = key.fileobj
+                self._sel.unregister(sock)
+                addr, _ = self._idle.pop(sock)
+                try:
+                    self._jobs.put_nowait((sock, addr))
+                except queue.Full:
+                    self._reject(sock)
+            while self._returned:
+                sock, addr, reply = self._returned.popleft()
+                if reply:
+                    try:
+                        sock.sendall(reply)
+                    except OSError:
+                        self.shutdown_request(sock)
+                        continue
+                self._idle[sock] = (addr, time.monotonic())
+                self._sel.register(sock, selectors.EVENT_READ)
+            now = time.monotonic()
+            if now - last_sweep >= 1.0:
+                last_sweep = now
+                for sock, (_, since) in list(self._idle.items()):
+                    if now - since > IDLE_SECS:
+                        self._sel.unregister(sock)
+                        del self._idle[sock]
+                        self.shutdown_request(sock)
+                with self._park_lock:
+                    expired = [sock for sock, p in self._parked.items() if p[3] <= now]
+                for sock in expired:
+                    self._unpark(sock)
+
+    def _reject(self, sock):
+        self.rejected += 1
+        default_metrics.observe_rejected()
+        body = xmlrpc.client.dumps(xmlrpc.client.Fault(OVERLOAD_FAULT, "server overloaded; retry later"),
+                                   methodresponse=True).encode()
+        head = (f"HTTP/1.1 200 OK\r\nContent-Type: text/xml\r\nContent-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n").encode()
+        try:
+            sock.setblocking(False)
+            try:
+                sock.recv(1 << 16)  # drain the request so closing does not reset the reply
+            except OSError:
+                pass
+            sock.send(head + body)
+        except OSError:
+            pass
+        self.shutdown_request(sock)
+
+    # ---- long polls ----
+    def _dispatch(self, method, params):
+        try:
+            return super()._dispatch(method, params)
+        except Parked as p:
+            self._local.parked = p
+            return None  # placeholder; _OneRequest drops it
+
+    def _take_parked(self):
+        p, self._local.parked = getattr(self._local, "parked", None), None
+        return p
+
+    def _park(self, sock, addr, p, binary):
+        entry = [addr, p, binary, time.monotonic() + p.timeout, None]
+        with self._park_lock:
+            self._parked[sock] = entry
+        token = p.watch.subscribe(p.generation, lambda: self._unpark(sock))
+        with self._park_lock:
+            entry[4] = token
+
+    def _unpark(self, sock):
+        with self._park_lock:
+            entry = self._parked.pop(sock, None)
+        if entry is None:
+            return
+        addr, p, binary, _, token = entry
+        p.watch.unsubscribe(token)
+        self._watch(sock, addr, self._parked_reply(p, binary))
+
+    def _parked_reply(self, p, binary):
+        try:
+            result = p.reply()
+            if binary:
+                return binrpc.reply(result)
+            body = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=self.allow_none)
+        except Exception as e:
+            if binary:
+                return binrpc.fault_reply(1, f"{type(e)}:{e}")
+            body = xmlrpc.client.dumps(xmlrpc.client.Fault(1, f"{type(e)}:{e}"), methodresponse=True)
+        body = body.encode()
+        return (f"HTTP/1.1 200 OK\r\nContent-Type: text/xml\r\nContent-Length: {len(body)}\r\n"
+                f"{binrpc.NEGOTIATE_HEADER}: 1\r\n\r\n").encode() + body
+
+    # ---- workers ----
+    def _work_loop(self):
+        allow_parking()
+        while True:
+            sock, addr = self._jobs.get()
+            try:
+                h = self.RequestHandlerClass(sock, addr, self)
+                parked, keep = h.parked, not h.close_connection
+            except Exception:
+                self.handle_error(sock, addr)
+                parked, keep = None, False
+            if parked is not None:
+                self._park(sock, addr, parked, h.binary)
+            elif keep:
+                self._watch(sock, addr)
+            else:
+                self.shutdown_request(sock)
@@ -0,0 +1,81 @@
+# scoring.py – MCQ scoring, per student and vectorized over a whole class
+from typing import Dict, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # scoring still works, just one student at a time
+    np = None
+
+MARKS_PER_QUESTION = 10
+
+def apply_penalty(raw, flags):
+    # one warning keeps 80% of the marks, two or more warnings score zero
+    if flags >= 2: return 0
+    if flags == 1: return int(raw * 0.8)
+    return raw
+
+def compute_score(answers, flags, questions):
+    """Score one student: answers {qnum: ans}, questions {qnum: {"answer": n, ...}}."""
+    raw = 0
+    for qnum, qdef in questions.items():
+        if int(answers.get(qnum, 0) or 0) == qdef["answer"]: raw += MARKS_PER_QUESTION
+    return raw, apply_penalty(raw, flags)
+
+def sheet_to_dict(sheet, qnums):
+    """{qnum: ans} from an answer sheet holding one byte per question of sorted `qnums`."""
+    return {q: a for q, a in zip(qnums, sheet) if a}
+
+class BatchScorer:
+    """
+    Scores many students at once. Answers are packed into a
+    (students x questions) int8 matrix and compared against the answer key
+    in one pass; without NumPy it falls back to compute_score per student.
+    """
+    def __init__(self, questions: Dict[int, dict]):
+        self.questions = questions
+        self.qnums = sorted(questions)
+        if np is not None:
+            self.key = np.array([questions[q]["answer"] for q in self.qnums], dtype=np.int8)
+
+    def pack(self, answers: Sequence[Dict[int, int]]):
+        """Pack a list of {qnum: ans} dicts into a (students x questions) matrix; 0 = unanswered."""
+        qnums = self.qnums
+        rows = []
+        for ans in answers:
+            if ans and not isinstance(next(iter(ans)), int):
+                ans = {int(q): a for q, a in ans.items()}  # XML-RPC string keys
+            get = ans.get
+            rows.append([get(q) or 0 for q in qnums])
+        return np.array(rows, dtype=np.int8).reshape(len(answers), len(qnums))
+
+    def score_matrix(self, matrix, flags):
+        """Return (raw, final) int arrays for a packed answer matrix and per-student flag counts."""
+        raw = (matrix == self.key).sum(axis=1, dtype=np.int32) * MARKS_PER_QUESTION
+        flags = np.asarray(flags, dtype=np.int32)
+        final = np.where(flags >= 2, 0, np.where(flags == 1, (raw * 0.8).astype(np.int32), raw))
+        return raw, final
+
+    def score_sheets(self, sheets: Sequence[bytes], flags: Sequence[int]):
+        """
+        Like score(), for answer sheets: one byte per question in sorted qnum
+        order (see exam_state.py). The server finalises from running raw
+        scores instead; this is kept for the benches (bench_answer_memory.py).
+        """
+        if np is None:
+            return self.score([sheet_to_dict(s, self.qnums) for s in sheets], flags)
+        if not sheets:
+            return [], []
+        matrix = np.frombuffer(b"".join(sheets), dtype=np.int8).reshape(len(sheets), len(self.qnums))
+        raw, final = self.score_matrix(matrix, flags)
+        return raw.tolist(), final.tolist()
+
+    def score(self, answers: Sequence[Dict[int, int]], flags: Sequence[int]):
+        """Return (raw, final) lists for parallel sequences of answer dicts and flag counts."""
+        if np is None:
+            pairs = [compute_score({int(q): a for q, a in ans.items()}, int(f), self.questions)
+                     for ans, f in zip(answers, flags)]
+            return [p[0] for p in pairs], [p[1] for p in pairs]
+        if not answers:
+            return [], []
+        raw, final = self.score_matrix(self.pack(answers), flags)
+        return raw.tolist(), final.tolist()
@@ -1,38 +1,52 @@
 # server_lb.py – Main server with capacity limit and backup offload
-import time, datetime, threading
+import os, sys, time, datetime, threading, json, hashlib
+from collections import Counter, deque
 from pathlib import Path
 from typing import Dict, Set
-from xmlrpc.server import SimpleXMLRPCServer
-from socketserver import ThreadingMixIn
-import xmlrpc.client, http.client
-from openpyxl import Workbook, load_workbook
+from results_store import ResultsStore
+from rpc_pool import proxy, KeepAliveRequestHandler
+from rpc_server import PooledXMLRPCServer
+from broadcast import default_broadcaster as broadcaster
+from scoring import apply_penalty
+from work_queue import WorkQueue
+from backend_pool import BackendPool
+from wal import WriteAheadLog
+from exam_state import ExamState
+from longpoll import long_poll
+from timer_wheel import TimingWheel
 
 SERVER_HOST, SERVER_PORT = "0.0.0.0", 9000
 TEACHER_HOST, TEACHER_PORT = "127.0.0.1", 9001
 CLIENT_HOST, CLIENT_PORT = "127.0.0.1", 9002
-BACKUP_HOST, BACKUP_PORT = "127.0.0.1", 9010  # backup server
+BACKUP_HOST, BACKUP_PORTS = "127.0.0.1", (9010, 9011)  # backup servers, one process per port
 
 PROCESSING_CAPACITY = 3  # main server can do 3 concurrent MCQ finalisations
+PROCESSING_SECS = 1.0    # simulated cost of one local finalisation
+QUEUE_LIMIT = 1000       # finalisations allowed to wait locally
+MAX_LOCAL_WAIT = 5.0     # forward to backup when the projected local wait exceeds this
+FORWARD_POLL_SECS = 5.0  # how often forwarded jobs are checked
+FORWARD_STUCK_SECS = 10.0  # a forwarded roll with no result after this long gets polled
+EXAM_SECS = 30.0         # exam duration before auto-submit, counted per student from when they get the paper
+SNAPSHOT_EVERY = 50_000  # WAL events between state snapshots
+REGISTRY_LOG = 100_000   # recent registry changes kept for get_registry_since deltas
+LONG_POLL_SECS = 30.0    # longest a wait_exam_state call is held open
+RPC_WORKERS = 32         # threads serving RPCs (see rpc_server.py)
+RPC_QUEUE_LIMIT = 2048   # RPCs allowed to wait for a worker; beyond this callers get an overload fault
 
-# --- RPC proxy helpers ---
-class TimeoutTransport(xmlrpc.client.Transport):
-    def __init__(self, timeout=5.0):
-        super().__init__(); self._timeout=timeout
-    def make_connection(self, host):
-        return http.client.HTTPConnection(host, timeout=self._timeout)
-
-def proxy(url): 
-    return xmlrpc.client.ServerProxy(url, allow_none=True, transport=TimeoutTransport())
-
-teacher_proxy = proxy(f"http://{TEACHER_HOST}:{TEACHER_PORT}/")
-client_proxy  = proxy(f"http://{CLIENT_HOST}:{CLIENT_PORT}/")
-backup_proxy  = proxy(f"http://{BACKUP_HOST}:{BACKUP_PORT}/")
-
-class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
-    daemon_threads=True
+# --- RPC proxies (pooled keep-alive connections, see rpc_pool.py) ---
+TEACHER_URL = f"http://{TEACHER_HOST}:{TEACHER_PORT}/"
+CLIENT_URL  = f"http://{CLIENT_HOST}:{CLIENT_PORT}/"
+teacher_proxy = proxy(TEACHER_URL)
+backups = BackendPool([f"http://{BACKUP_HOST}:{p}/" for p in BACKUP_PORTS])
 
 # ---- state ----
 students_registry: Dict[str,str] = {}  # roll -> student xmlrpc URL
+# bumped on every membership change; students sync with get_registry_since(version, epoch).
+# the epoch changes each boot, so a restarted server sends everyone one full copy
+registry_version=0
+registry_changes=deque(maxlen=REGISTRY_LOG)  # (version, roll, url), oldest first
+registry_lock=threading.Lock()
+REGISTRY_EPOCH=os.urandom(4).hex()
 student_flags: Dict[str,int]={}
 terminated_students:Set[str]=set()
 roll_to_name={"1":"Swaroop","2":"Tanisha","3":"Siddhesh","4":"Ayush","5":"Nidhi"}
@@ -53,29 +67,83 @@ MCQ_QUESTIONS={
     10:{"q":"Which data structure logs RA intents?","options":["list","heap","set","dict"],"answer":2}
 }
 
-mcq_lock=threading.Lock()
-mcq_active=False  # exam running?
-mcq_student_answers:Dict[str,Dict[int,int]]={}
-mcq_submitted_students:Set[str]=set()
-mcq_final_scores:Dict[str,int]={}
+def _build_paper():
+    # the whole paper without answers, as JSON text; the digest names this version of it
+    qs={str(q):{"q":v["q"],"options":v["options"]} for q,v in sorted(MCQ_QUESTIONS.items())}
+    text=json.dumps({"questions":qs},sort_keys=True,separators=(",",":"))
+    return hashlib.sha256(text.encode()).hexdigest()[:16],text
+
+# (hash, json text), serialised once; rebuild after changing MCQ_QUESTIONS
+exam_paper=_build_paper()
+
+# answers/running raw score/submitted/finals per roll, lock-striped (see exam_state.py); exam.active is a
+# lock-free read, exam.started_at (wall clock) lets a restarted server re-arm the exam timer
+exam=ExamState(MCQ_QUESTIONS)
 
-processing_semaphore=threading.BoundedSemaphore(PROCESSING_CAPACITY)
-processing_now:Set[str]=set()
+processing_now:Set[str]=set()  # accepted locally: queued or being finalised
 forwarded_pending:Set[str]=set()
+forwarded_jobs:Dict[str,tuple]={}  # roll -> (backup url, job id, forwarded at)
 processing_lock=threading.Lock()
 
+ra_audit=deque(maxlen=100_000)  # [time, kind, *fields, reporting roll] from student telemetry
+ra_audit_counts=Counter()
+ra_audit_lock=threading.Lock()  # ingest_telemetry runs on many RPC workers at once
+
 excel_path=Path("results.xlsx")
+results=ResultsStore(excel_path)
+wal=WriteAheadLog(Path("wal"))
+
+# exam end and per-student deadlines: 100k+ timers on one thread, O(1) to set, move or cancel
+wheel=TimingWheel()
+exam_end=None  # wheel timer for exam_completed; moved later when a student's deadline runs past it
+exam_end_at=0.0
+exam_end_lock=threading.Lock()
+deadline_due=deque()  # rolls whose own deadline passed, for _deadline_loop to finalise in batches
+deadline_ready=threading.Event()
+
+def _run_blocking(fn):
+    # timer work does I/O, so it leaves the wheel thread; run_server_async swaps in the loop's executor
+    threading.Thread(target=fn,daemon=True).start()
 
-# helper to convert int keys to str for XML-RPC
-def _stringify_keys(d: dict) -> dict:
-    return {str(k): v for k, v in d.items()}
+def _call_later(secs,fn):
+    return wheel.schedule(secs,lambda: _run_blocking(fn))
 
 # ---- functions ----
+def _registry_set(roll,url):
+    # caller holds registry_lock (or is replaying the WAL)
+    global registry_version
+    if students_registry.get(roll)==url: return
+    students_registry[roll]=url
+    registry_version+=1
+    registry_changes.append((registry_version,roll,url))
+
 def register_student(roll, student_url):
-    students_registry[str(roll)] = student_url
+    with registry_lock:
+        _registry_set(str(roll),student_url)
+        seq=wal.append("reg",roll,student_url)
+    wal.wait(seq)
     print(f"[Server] Registered student {roll} at {student_url}")
     return True
 
+def get_registry():
+    with registry_lock: return dict(students_registry)
+
+def get_registry_since(version=0,epoch=""):
+    """Registry changes after `version`, or all of it ("full") for another epoch or a version too old to diff."""
+    version=int(version)
+    with registry_lock:
+        current=epoch==REGISTRY_EPOCH and version<=registry_version
+        if current and version==registry_version:
+            changes,full={},False
+        elif current and registry_changes and registry_changes[0][0]<=version+1:
+            changes,full={},False
+            for v,roll,url in reversed(registry_changes):
+                if v<=version: break
+                changes.setdefault(roll,url)  # newest URL per roll
+        else:
+            changes,full=dict(students_registry),True
+        return {"epoch":REGISTRY_EPOCH,"version":registry_version,"full":full,"changes":changes}
+
 def input_time():
     global local_time
     s=input("[Server] Enter current time (HH-MM-SS): ")
@@ -87,141 +155,513 @@ def input_time():
 def get_time(): 
     return local_time.strftime('%H-%M-%S') if local_time else ""
 
+def _report_broadcast(report, what):
+    for t in report.failed:
+        print(f"[Server] Could not {what} {t}: {report.results[t].error}")
+    print(f"[Server] Broadcast {report.summary()}")
+    return report
+
+def _report_broadcast_later(fut, what):
+    # log failures/stragglers when the fan-out finishes, without waiting for it
+    fut.add_done_callback(lambda f: _report_broadcast(f.result(), what))
+
 def start_synchronization():
     print("\n[Server] Starting time synchronization ...\n"+"-"*60)
-    try:
-        teacher_proxy.send_time()
-    except Exception as e:
-        print("[Server] Could not sync teacher:", e)
-    try:
-        client_proxy.send_time()
-    except Exception as e:
-        print("[Server] Could not sync client:", e)
+    _report_broadcast(broadcaster.send({"teacher":TEACHER_URL,"client":CLIENT_URL},"send_time"),"sync")
     return True
 
 def start_mcq():
-    global mcq_active
-    with mcq_lock:
-        mcq_active=True
+    if exam.started_at is not None and not exam.active: _new_exam()  # the last exam is over
+    now=time.time()
+    exam.set_active(True,now,log=lambda: wal.append("start",now))
     print("[Server] MCQ exam started; notifying students...")
-    for roll, url in students_registry.items():
+    _report_broadcast_later(broadcaster.send_async(students_registry,"start_mcq"),"notify student")
+    _arm_exam_end(now+EXAM_SECS)
+    return True
+
+def _new_exam():
+    """Forget the previous exam's answers, marks, deadlines and jobs; the WAL restarts from a snapshot of that."""
+    global exam_end
+    with exam_end_lock:
+        if exam_end is not None: exam_end.cancel()
+        exam_end=None
+    for _,rec in exam.items():
+        if rec.timer is not None: rec.timer.cancel()
+    exam.clear()
+    with processing_lock:
+        forwarded_pending.clear();forwarded_jobs.clear()
+    take_snapshot()
+    print("[Server] Previous exam state cleared")
+
+def _arm_exam_end(at):
+    """Run exam_completed at wall-clock `at`, unless it is already due later."""
+    global exam_end,exam_end_at
+    with exam_end_lock:
+        if exam_end is not None and exam_end.pending:
+            if exam_end_at>=at: return
+            exam_end.cancel()
+        exam_end_at=at
+        exam_end=_call_later(at-time.time(),exam_completed)
+
+def _set_deadline(roll,rec,at):
+    # caller holds roll's stripe lock; the WAL line keeps extensions and late starts across restarts
+    if rec.timer is not None: rec.timer.cancel()
+    rec.deadline=at
+    rec.timer=wheel.schedule(at-time.time(),_deadline_passed,roll)
+    _arm_exam_end(at)
+    return wal.append("deadline",roll,at)
+
+def _start_clock(roll):
+    # a student's EXAM_SECS start when they first get questions, so late starters get the full time
+    if not exam.active: return
+    rec=exam.get(roll)
+    if rec is not None and (rec.deadline is not None or rec.submitted): return  # lock-free fast path
+    with exam.locked(roll) as rec:
+        if rec.deadline is None and not rec.submitted: _set_deadline(roll,rec,time.time()+EXAM_SECS)
+
+def extend_deadline(roll,secs):
+    """Give one student `secs` more (e.g. an approved extension); returns the new deadline, or 0 if none applies."""
+    roll=str(roll)
+    if not exam.active: return 0
+    with exam.locked(roll) as rec:
+        if rec.submitted: return 0
+        at=(rec.deadline or time.time()+EXAM_SECS)+float(secs)  # not started yet: full time from now, plus secs
+        seq=_set_deadline(roll,rec,at)
+    wal.wait(seq)
+    print(f"[Server] Deadline for roll {roll} moved to {datetime.datetime.fromtimestamp(at):%H:%M:%S}")
+    return at
+
+def _deadline_passed(roll):
+    # wheel thread: only hand off, finalising does I/O
+    deadline_due.append(roll)
+    deadline_ready.set()
+
+def _deadline_loop():
+    # rolls that come due together are finalised together; spread-out deadlines spread the work
+    while True:
+        deadline_ready.wait()
+        deadline_ready.clear()
+        rolls=[]
+        while deadline_due: rolls.append(deadline_due.popleft())
         try:
-            xmlrpc.client.ServerProxy(url, allow_none=True).start_mcq()
+            scores=_finalize_rolls(rolls,"Deadline")
+            # tell them, or they keep answering into rejected uploads until the exam-wide ask_to_request
+            targets={r:students_registry[r] for r in scores if r in students_registry}
+            if targets: _report_broadcast_later(broadcaster.send_async(targets,"notify_mcq_submitted"),"notify auto-submit to student")
         except Exception as e:
-            print(f"[Server] Could not notify student {roll}: {e}")
-    threading.Timer(30.0, exam_completed).start()
-    return True
+            print(f"[Server] Deadline finalisation failed ({e}); auto-submitting one by one")
+            for roll in rolls:
+                try: submit_mcq_final(roll)
+                except Exception as e: print(f"[Server] Could not auto-submit roll {roll}: {e}")
 
 def get_mcq_active():
-    with mcq_lock: return mcq_active
+    return exam.active
+
+def _exam_state():
+    return {"generation":exam.watch.generation,"active":exam.active,"started_at":exam.started_at}
+
+def wait_exam_state(generation=-1,timeout=LONG_POLL_SECS):
+    """Long poll: the exam state once it is past `generation`, or as it is after `timeout` seconds."""
+    # parks the connection rather than a worker thread (rpc_server.py / aio_rpc.py)
+    return long_poll(exam.watch,int(generation),min(float(timeout),LONG_POLL_SECS),_exam_state)
 
 def get_question_for_student(roll,qnum:int):
     q=MCQ_QUESTIONS.get(int(qnum))
     if not q: return {}
+    _start_clock(str(roll))
     return {"qnum":int(qnum),"q":q["q"],"options":q["options"]}
 
+def get_exam_paper(roll,have=""):
+    """Every question in one call: {"hash","paper"} (paper is JSON text), or just {"hash"} if `have` is current."""
+    h,text=exam_paper
+    _start_clock(str(roll))
+    if have==h: return {"hash":h}
+    return {"hash":h,"paper":text}
+
 def submit_mcq_answer(roll,qnum,ans):
-    with mcq_lock:
-        mcq_student_answers.setdefault(str(roll),{})[int(qnum)]=int(ans)
+    with exam.locked(str(roll)) as rec:
+        if rec.submitted: return False
+        exam.put(rec,{int(qnum):int(ans)})
+        seq=wal.append("ans",roll,int(qnum),int(ans))
+    wal.wait(seq)
     print(f"[Server] recorded ans roll={roll} q={qnum} ans={ans}")
     return True
 
+def submit_mcq_answers_bulk(roll,answers):
+    # answers: {qnum: ans}; keys arrive as strings over XML-RPC
+    roll=str(roll)
+    batch={int(q):int(a) for q,a in (answers or {}).items()}
+    with exam.locked(roll) as rec:
+        if rec.submitted: return False
+        exam.put(rec,batch)
+        seq=0
+        for q,a in batch.items(): seq=wal.append("ans",roll,q,a)
+    wal.wait(seq)
+    print(f"[Server] recorded {len(batch)} ans roll={roll} q={sorted(batch)}")
+    return True
+
 def exam_completed():
-    global mcq_active
     print("[Server] Exam duration over – auto-submitting MCQs...")
-    with mcq_lock:
-        mcq_active = False
-    for roll in list(students_registry.keys()):
-        try:
-            submit_mcq_final(roll)
-        except Exception as e:
-            print(f"[Server] Could not auto-submit roll {roll}: {e}")
+    exam.set_active(False,log=lambda: wal.append("end"))
+    try:
+        finalize_all()
+    except Exception as e:
+        print(f"[Server] Batch finalisation failed ({e}); auto-submitting one by one")
+        for roll in list(students_registry.keys()):
+            try:
+                submit_mcq_final(roll)
+            except Exception as e:
+                print(f"[Server] Could not auto-submit roll {roll}: {e}")
     print("[Server] Broadcasting to students to start ISA marks entry...")
-    for roll, url in students_registry.items():
-        try:
-            xmlrpc.client.ServerProxy(url, allow_none=True).ask_to_request()
-        except Exception as e:
-            print(f"[Server] Could not notify student {roll} to start ISA: {e}")
+    _report_broadcast_later(broadcaster.send_async(students_registry,"ask_to_request"),"notify ISA start to student")
     return True
 
-def _compute_score(answers,flags):
-    raw=0
-    for qnum,qdef in MCQ_QUESTIONS.items():
-        if int(answers.get(qnum,0)or 0)==qdef["answer"]: raw+=10
-    if flags>=2:final=0
-    elif flags==1:final=int(raw*0.8)
-    else:final=raw
-    return raw,final
+def finalize_all():
+    """Finalise every registered roll not yet submitted/in flight: its running raw score less any penalty."""
+    return len(_finalize_rolls(list(students_registry),"Batch"))
+
+def _finalize_rolls(rolls,what):
+    # returns {roll: final} for the rolls this call finalised
+    with processing_lock: busy=processing_now|forwarded_pending
+    scores={}
+    for r in rolls:
+        if r in busy: continue
+        with exam.locked(r) as rec:
+            if rec.submitted: continue
+            # claim the roll so a concurrent submit_mcq_final treats it as done
+            rec.submitted=True
+            scores[r]=apply_penalty(rec.raw,student_flags.get(r,0))
+    if not scores: return scores
+    wal.wait(_record_finals(scores))
+    print(f"[Server] {what}-finalised {len(scores)} roll(s)")
+    _publish_finals(scores)
+    return scores
+
+def _publish_finals(scores):
+    try:
+        teacher_proxy.update_mcq_marks_bulk(scores)
+    except Exception as e:
+        print(f"[Server] Could not send batch marks to teacher: {e}")
+    for roll,final in scores.items():
+        results.update(roll,{4:final},[roll,roll_to_name.get(roll,f"Student{roll}"),"NA",final,"NA"])
+
+def _record_finals(scores):
+    # WAL append under the roll's stripe lock keeps each roll's events in the order they were applied
+    seq=0
+    for roll,final in scores.items():
+        with exam.locked(roll) as rec:
+            rec.final=final;rec.submitted=True
+            if rec.timer is not None: rec.timer.cancel();rec.timer=None
+            seq=wal.append("final",roll,final)
+    return seq
+
+def _raw_of(roll):
+    with exam.locked(roll) as rec: return rec.raw
 
 def _finalize_local(roll):
     try:
         print(f"[Server] Processing LOCALLY roll {roll}")
-        ans=mcq_student_answers.get(roll,{})
-        flags=student_flags.get(roll,0)
-        raw,final=_compute_score(ans,flags)
-        time.sleep(1.0)
-        with mcq_lock:
-            mcq_final_scores[roll]=final;mcq_submitted_students.add(roll)
+        raw=_raw_of(roll)
+        final=apply_penalty(raw,student_flags.get(roll,0))
+        time.sleep(PROCESSING_SECS)
+        _record_finals({roll:final})
         print(f"[Server] Local done roll={roll} raw={raw} final={final}")
         teacher_proxy.update_mcq_marks(str(roll),int(final))
-        wb=load_workbook(excel_path) if excel_path.exists() else Workbook()
-        ws=wb.active
-        found=False
-        for row in ws.iter_rows(min_row=2):
-            if str(row[0].value)==roll:
-                ws.cell(row=row[0].row,column=4,value=int(final))
-                found=True;break
-        if not found:
-            ws.append([roll,roll_to_name.get(roll,f"Student{roll}"),"NA",int(final),"NA"])
-        wb.save(excel_path)
+        results.update(roll,{4:int(final)},[roll,roll_to_name.get(roll,f"Student{roll}"),"NA",int(final),"NA"])
     finally:
         with processing_lock:processing_now.discard(roll)
-        processing_semaphore.release()
+
+finalize_queue=WorkQueue(_finalize_local,workers=PROCESSING_CAPACITY,maxsize=QUEUE_LIMIT,
+                         expected_service=PROCESSING_SECS,name="finalize")
 
 def submit_mcq_final(roll):
     roll=str(roll)
-    with mcq_lock:
-        if roll in mcq_submitted_students: return True
-    if processing_semaphore.acquire(blocking=False):
-        with processing_lock:processing_now.add(roll)
-        threading.Thread(target=_finalize_local,args=(roll,),daemon=True).start()
-        print(f"[Server] Accepted roll {roll} local (cap {len(processing_now)}/3)")
-        return True
-    else:
-        ans=mcq_student_answers.get(roll,{})
-        flags=student_flags.get(roll,0)
-        print(f"[Server] Capacity full -> forward roll {roll}")
-        try:
-            backup_proxy.process_forwarded_submission(roll,_stringify_keys(ans),int(flags))
-            with processing_lock:forwarded_pending.add(roll)
-        except Exception as e:
-            print(f"[Server] Could not auto-submit roll {roll}: {e}")
+    with exam.locked(roll) as rec:
+        if rec.submitted: return True
+        rec.submitted=True  # claimed: later answers are refused, so the mark is this sheet's
+    if _dispatch_final(roll): return True
+    with exam.locked(roll) as rec:
+        if rec.final is None: rec.submitted=False
+    return False
+
+def _dispatch_final(roll):
+    # queue locally first; only offload when the local wait would be too long
+    wait=finalize_queue.projected_wait()
+    with processing_lock:
+        if roll in processing_now or roll in forwarded_pending: return True
+        local=wait<=MAX_LOCAL_WAIT
+        if local: processing_now.add(roll)
+    if local:
+        if finalize_queue.submit(roll):
+            print(f"[Server] Accepted roll {roll} local (queue {finalize_queue.depth()}, est wait {wait:.1f}s)")
+            return True
+        with processing_lock:processing_now.discard(roll)
+    raw=_raw_of(roll)
+    flags=student_flags.get(roll,0)
+    print(f"[Server] Local queue too long (est wait {wait:.1f}s) -> forward roll {roll}")
+    with processing_lock:forwarded_pending.add(roll)
+    try:
+        # the running raw score: the backup only applies the penalty and does the bookkeeping
+        url,job_id=backups.call("process_forwarded_submission",roll,raw,int(flags),track=True)
+        with processing_lock:
+            if roll in forwarded_pending:
+                forwarded_jobs[roll]=(url,str(job_id),time.monotonic())
+                wal.append("fwd",roll,url,job_id)
+            else: backups.complete(url)  # result already came back
+        print(f"[Server] Forwarded roll {roll} to {url} as job {job_id}")
         return True
+    except Exception as e:
+        print(f"[Server] Could not forward roll {roll}: {e}; queueing locally instead")
+    with processing_lock:
+        forwarded_pending.discard(roll)
+        processing_now.add(roll)
+    if finalize_queue.submit(roll): return True
+    with processing_lock:processing_now.discard(roll)
+    print(f"[Server] Could not auto-submit roll {roll}: local queue full and no backup available")
+    return False
+
+def get_processing_metrics():
+    m=finalize_queue.metrics()
+    with processing_lock:
+        m.update(processing_now=len(processing_now),forwarded_pending=len(forwarded_pending))
+    m["projected_wait"]=round(finalize_queue.projected_wait(),3)
+    m["backups"]=backups.status()
+    m["timers"]=len(wheel)
+    return m
+
+def _record_backup_results(scores):
+    wal.wait(_record_finals(scores))
+    with processing_lock:
+        for roll in scores:
+            forwarded_pending.discard(roll)
+            job=forwarded_jobs.pop(roll,None)
+            if job: backups.complete(job[0])
 
 def backup_result(roll,final_score):
     roll=str(roll)
     print(f"[Server] got BACKUP result roll {roll}={final_score}")
-    with mcq_lock:
-        mcq_final_scores[roll]=int(final_score);mcq_submitted_students.add(roll)
+    _record_backup_results({roll:int(final_score)})
     teacher_proxy.update_mcq_marks(str(roll),int(final_score))
-    with processing_lock:forwarded_pending.discard(roll)
     return True
 
+def backup_results_bulk(results):
+    # results: [{"job_id","roll","final"}, ...] pushed by a backup in one call
+    scores={str(r["roll"]):int(r["final"]) for r in results}
+    print(f"[Server] got {len(scores)} BACKUP result(s): {scores}")
+    _record_backup_results(scores)
+    try:
+        teacher_proxy.update_mcq_marks_bulk(scores)
+    except Exception as e:
+        print(f"[Server] Could not send backup marks to teacher: {e}")
+    return True
+
+def poll_forwarded_jobs():
+    """Ask backups about rolls stuck in forwarded_pending; re-submit ones the backup lost."""
+    now=time.monotonic()
+    with processing_lock:
+        stuck={r:j for r,j in forwarded_jobs.items() if now-j[2]>=FORWARD_STUCK_SECS}
+    recovered,resubmitted=0,[]
+    for roll,(url,job_id,_) in stuck.items():
+        try:
+            st=proxy(url).get_job_status(job_id)
+        except Exception:
+            st={"state":"unreachable"}
+        if st.get("state") in ("done","delivered") and str(st.get("roll"))==roll:
+            _record_backup_results({roll:int(st["final"])})
+            try: teacher_proxy.update_mcq_marks(roll,int(st["final"]))
+            except Exception as e: print(f"[Server] Could not send mark for roll {roll} to teacher: {e}")
+            recovered+=1
+        # "expired": the backup delivered it long ago, yet it never got here
+        elif st.get("state") in ("unknown","expired") or (st.get("state")=="unreachable" and not backups.is_healthy(url)):
+            with processing_lock:
+                forwarded_pending.discard(roll);forwarded_jobs.pop(roll,None)
+                wal.append("unfwd",roll)
+            backups.complete(url)
+            resubmitted.append(roll)
+            _dispatch_final(roll)  # the roll stays claimed
+    if stuck:
+        print(f"[Server] Polled {len(stuck)} stuck job(s): {recovered} recovered, re-submitted {resubmitted}")
+    return {"polled":len(stuck),"recovered":recovered,"resubmitted":resubmitted}
+
+def _poll_forwarded_loop():
+    while True:
+        time.sleep(FORWARD_POLL_SECS)
+        try:
+            poll_forwarded_jobs()
+        except Exception as e:
+            print(f"[Server] Forwarded-job poll failed: {e}")
+
+# ---- write-ahead log recovery ----
+def _snapshot_state():
+    with exam.all_locked(), processing_lock, registry_lock:
+        segment=wal.rotate()
+        state={
+            "registry":dict(students_registry),
+            "active":exam.active,"started_at":exam.started_at,
+            "columns":exam.qnums,"sheets":{r:rec.sheet.hex() for r,rec in exam.items()},
+            "finals":exam.finals(),
+            "deadlines":{r:rec.deadline for r,rec in exam.items() if rec.deadline is not None},
+            "forwarded":{r:[u,j] for r,(u,j,_) in forwarded_jobs.items()},
+        }
+    return state,segment
+
+def take_snapshot():
+    t0=time.perf_counter()
+    state,segment=_snapshot_state()
+    wal.write_snapshot(state,segment)
+    print(f"[Server] WAL snapshot at segment {segment} ({len(state['sheets'])} students) in {time.perf_counter()-t0:.3f}s")
+    return segment
+
+def _snapshot_loop():
+    while True:
+        time.sleep(1.0)
+        if wal.events_since_snapshot>=SNAPSHOT_EVERY:
+            try: take_snapshot()
+            except Exception as e: print(f"[Server] WAL snapshot failed: {e}")
+
+def _apply_event(ev):
+    # recovery runs before the server takes calls, so no stripe locks here
+    kind=ev[0]
+    if kind=="ans":
+        exam.put(exam.record(ev[1]),{int(ev[2]):int(ev[3])})
+    elif kind=="final":
+        rec=exam.record(ev[1]);rec.final=int(ev[2]);rec.submitted=True
+        forwarded_pending.discard(ev[1]);forwarded_jobs.pop(ev[1],None)
+    elif kind=="reg":
+        _registry_set(ev[1],ev[2])
+    elif kind=="fwd":
+        forwarded_pending.add(ev[1]);forwarded_jobs[ev[1]]=(ev[2],ev[3],0.0)
+    elif kind=="unfwd":
+        forwarded_pending.discard(ev[1]);forwarded_jobs.pop(ev[1],None)
+    elif kind=="start":
+        exam.active=True;exam.started_at=float(ev[1])
+    elif kind=="end":
+        exam.active=False
+    elif kind=="deadline":
+        exam.record(ev[1]).deadline=float(ev[2])
+
+def recover_state():
+    """Rebuild exam state from the latest snapshot plus the WAL tail."""
+    t0=time.perf_counter()
+    state,events=wal.load()
+    if state:
+        students_registry.update(state["registry"])
+        exam.active,exam.started_at=state["active"],state["started_at"]
+        if state.get("columns")==exam.qnums:
+            for r,h in state["sheets"].items(): exam.record(r).sheet[:]=bytes.fromhex(h)
+        else:  # older snapshot layout: {roll: {qnum: ans}}
+            for r,a in state.get("answers",{}).items(): exam.put(exam.record(r),{int(q):v for q,v in a.items()})
+        for r,f in state["finals"].items():
+            rec=exam.record(r);rec.final=f;rec.submitted=True
+        for r,at in state.get("deadlines",{}).items(): exam.record(r).deadline=at
+        for r,(u,j) in state["forwarded"].items():
+            forwarded_pending.add(r);forwarded_jobs[r]=(u,j,0.0)
+    n=0
+    sheets,column={},exam.column  # roll -> its sheet, saves the stripe lookup per event
+    for ev in events:
+        n+=1
+        if ev[0]=="ans":  # the bulk of any log; kept inline for replay speed
+            s=sheets.get(ev[1])
+            if s is None: s=sheets[ev[1]]=exam.record(ev[1]).sheet
+            s[column[int(ev[2])]]=int(ev[3])
+        else:
+            _apply_event(ev)
+    exam.rescore()  # the sheets above were written without put()
+    if state or n:
+        print(f"[Server] Recovered {len(exam)} students, {len(exam.finals())} finals "
+              f"from {'snapshot + ' if state else ''}{n} WAL events in {time.perf_counter()-t0:.3f}s")
+    if exam.started_at is not None and not exam.active:
+        # only a running exam is resumed; the students of a finished one are gone, so drop them too
+        print("[Server] Logged exam already ended; starting fresh")
+        _finish_ended_exam()
+        with registry_lock:
+            students_registry.clear();registry_changes.clear()
+        _new_exam()
+        return n
+    if exam.active and exam.started_at:
+        end,armed=exam.started_at+EXAM_SECS,0
+        for r,rec in exam.items():
+            if rec.deadline is None or rec.submitted: continue
+            rec.timer=wheel.schedule(rec.deadline-time.time(),_deadline_passed,r)
+            end,armed=max(end,rec.deadline),armed+1
+        print(f"[Server] Exam still running; {armed} student deadline(s) re-armed, "
+              f"auto-submit in {max(0.0,end-time.time()):.1f}s")
+        _arm_exam_end(end)
+    return n
+
+def _finish_ended_exam():
+    """Mark the rolls a crash caught mid-finalisation: the backup's result if it has one, else the logged sheet."""
+    done={}
+    for roll,(url,job_id,_) in list(forwarded_jobs.items()):
+        try: st=proxy(url).get_job_status(job_id)
+        except Exception: st={}
+        if st.get("state") in ("done","delivered") and str(st.get("roll"))==roll: done[roll]=int(st["final"])
+    if done:
+        _record_backup_results(done)
+        _publish_finals(done)
+    with processing_lock:
+        forwarded_pending.clear();forwarded_jobs.clear()
+    rolls=set(students_registry)|{r for r,_ in exam.items()}  # _finalize_rolls skips finalised ones
+    _finalize_rolls(sorted(rolls),"Recovery")
+
+# ---- RA audit telemetry ----
+def ingest_telemetry(roll,events):
+    # one batched call per student per flush interval (see telemetry.py)
+    rows=[list(ev)+[str(roll)] for ev in events]
+    with ra_audit_lock:
+        for row in rows:
+            ra_audit.append(row)
+            ra_audit_counts[row[1]]+=1
+    return True
+
+def get_ra_audit(limit=100):
+    with ra_audit_lock: return {"counts":dict(ra_audit_counts),"recent":list(ra_audit)[-int(limit):]}
+
+def _rpc_functions():
+    return [register_student,get_registry,get_registry_since,start_mcq,input_time,get_time,start_synchronization,
+            get_mcq_active,wait_exam_state,exam_completed,finalize_all,get_question_for_student,get_exam_paper,
+            submit_mcq_answer,submit_mcq_answers_bulk,submit_mcq_final,extend_deadline,
+            backup_result,backup_results_bulk,poll_forwarded_jobs,get_processing_metrics,ingest_telemetry,get_ra_audit]
+
+# never block (no I/O, only brief locks): the asyncio front end runs these on the event loop.
+# get_exam_paper / get_question_for_student start a student's clock (stripe lock, WAL), so they stay off it
+INLINE_RPCS={"get_time","get_mcq_active","wait_exam_state","get_processing_metrics","ingest_telemetry","get_ra_audit"}
+
+def _start_background():
+    recover_state()
+    threading.Thread(target=_snapshot_loop,daemon=True).start()
+    backups.start_health_checks()
+    threading.Thread(target=_poll_forwarded_loop,daemon=True).start()
+    threading.Thread(target=_deadline_loop,daemon=True).start()
+
 def run_server():
-    srv=ThreadingXMLRPCServer((SERVER_HOST,SERVER_PORT),allow_none=True,logRequests=False)
-    srv.register_function(register_student,"register_student")
-    srv.register_function(start_mcq,"start_mcq")
-    srv.register_function(input_time,"input_time")
-    srv.register_function(get_time,"get_time")
-    srv.register_function(start_synchronization,"start_synchronization")
-    srv.register_function(get_mcq_active,"get_mcq_active")
-    srv.register_function(exam_completed, "exam_completed")
-    srv.register_function(get_question_for_student,"get_question_for_student")
-    srv.register_function(submit_mcq_answer,"submit_mcq_answer")
-    srv.register_function(submit_mcq_final,"submit_mcq_final")
-    srv.register_function(backup_result,"backup_result")
+    srv=PooledXMLRPCServer((SERVER_HOST,SERVER_PORT),requestHandler=KeepAliveRequestHandler,workers=RPC_WORKERS,
+                           queue_limit=RPC_QUEUE_LIMIT,allow_none=True,logRequests=False)
+    for fn in _rpc_functions(): srv.register_function(fn,fn.__name__)
+    _start_background()
     print("[Server] running with load-balancing on port 9000 ...")
     srv.serve_forever()
 
+def run_server_async():
+    """Same RPCs behind the asyncio front end (aio_rpc.py): connections are coroutines, not threads."""
+    import asyncio, resource
+    from aio_rpc import AsyncXMLRPCServer, AsyncBroadcaster
+    _,hard=resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE,(hard,hard))  # one fd per connection
+    async def main():
+        global broadcaster, _run_blocking
+        loop=asyncio.get_running_loop()
+        # student fan-outs run on the loop, and exam-end work in its executor, instead of on new threads
+        broadcaster=AsyncBroadcaster(loop)
+        _run_blocking=lambda fn: loop.call_soon_threadsafe(loop.run_in_executor,None,fn)
+        srv=AsyncXMLRPCServer(SERVER_HOST,SERVER_PORT,workers=RPC_WORKERS,max_pending=RPC_QUEUE_LIMIT)
+        for fn in _rpc_functions(): srv.register_function(fn,fn.__name__,inline=fn.__name__ in INLINE_RPCS)
+        await loop.run_in_executor(None,_start_background)
+        print(f"[Server] running (asyncio, up to {hard} connections) on port {SERVER_PORT} ...")
+        await srv.serve_forever()
+    asyncio.run(main())
+
 if __name__=="__main__":
-    run_server()
+    # python server.py [--asyncio]
+    if "--asyncio" in sys.argv[1:]: run_server_async()
+    else: run_server()
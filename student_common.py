@@ -1,36 +1,45 @@
 # student_common.py (fixed)
 import time
 import threading
+import json
+import hashlib
 import xmlrpc.client
 from xmlrpc.server import SimpleXMLRPCServer
 from socketserver import ThreadingMixIn
 from typing import Dict, Set
+import os
 import sys
-import http.client
 import datetime
+from rpc_pool import proxy, KeepAliveRequestHandler
+from rpc_metrics import InstrumentedMixin
+from broadcast import Broadcaster
+from mutex import MaekawaSite, grid_quorum
+from telemetry import TelemetryBuffer
 
 SERVER_URL = "http://127.0.0.1:9000/"
 RPC_TIMEOUT = 5.0
+ANSWER_FLUSH_INTERVAL = 2.0  # seconds before a failed answer upload is retried
+LONG_POLL_SECS = 30.0        # wait_exam_state hold time (the server caps it at its own LONG_POLL_SECS)
+PAPER_CACHE = os.environ.get("EXAM_PAPER_CACHE", "exam_paper.json")  # last paper fetched, shared on this machine
+RA_RETRANSMIT_SECS = 5.0     # re-send REQUEST to peers that have not answered after this long
+RA_TIMEOUT = None            # give up on a CS attempt after this many seconds (None = wait forever)
+QUORUM_RETRIES = 10         # a Maekawa message whose RPC failed is re-sent this often, RA_RETRANSMIT_SECS apart
+# "ra" (Ricart-Agrawala, N-1 OKs) or "maekawa" (sqrt(N) quorum votes); all students must agree
+MUTEX_MODE = os.environ.get("EXAM_MUTEX", "ra").lower()
 LOCAL_HOST = "127.0.0.1"
 PROBE_PORTS = range(9101, 9111)
 
-class TimeoutTransport(xmlrpc.client.Transport):
-    def __init__(self, timeout=RPC_TIMEOUT):
-        super().__init__()
-        self._timeout = timeout
-    def make_connection(self, host):
-        return http.client.HTTPConnection(host, timeout=self._timeout)
-
+# pooled keep-alive proxies; binary framing when EXAM_BINARY_RPC=1 (see rpc_pool.py)
 def new_server_proxy(timeout=RPC_TIMEOUT):
-    return xmlrpc.client.ServerProxy(SERVER_URL, allow_none=True, transport=TimeoutTransport(timeout))
+    return proxy(SERVER_URL, timeout)
 
 def new_peer_proxy(url: str, timeout=RPC_TIMEOUT):
     try:
-        return xmlrpc.client.ServerProxy(url, allow_none=True, transport=TimeoutTransport(timeout))
+        return proxy(url, timeout)
     except Exception:
         return xmlrpc.client.ServerProxy(url, allow_none=True)
 
-class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+class ThreadingXMLRPCServer(InstrumentedMixin, ThreadingMixIn, SimpleXMLRPCServer):
     daemon_threads = True
 
 # State
@@ -53,13 +62,31 @@ def update_clock(ts):
 
 _peers_lock = threading.Lock()
 peers: Dict[str,str] = {}
+# server registry version `peers` was last synced to (see _sync_registry)
+_registry_epoch = ""
+_registry_version = 0
 
 # RA state
 requesting = False
 in_cs = False
 my_ts = None
 ok_received: Set[str] = set()
+_ok_cond = threading.Condition()  # notified on every OK; guards ok_received
+_ra_timed_out = False
+ra_stats = []  # one entry per CS attempt: request-to-CS latency, retransmits, peers
 deferred: Set[str] = set()
+# held while receive_request decides to defer, and while the CS is entered/left with the deferred set
+# taken in the same step, so a REQUEST can never be deferred into a set that was already answered
+_ra_lock = threading.Lock()
+
+# Maekawa state (MUTEX_MODE == "maekawa")
+_quorum_site: MaekawaSite = None
+_quorum_cond = threading.Condition()  # guards _quorum_site; notified when it enters the CS
+
+_fanout = Broadcaster(max_workers=16)
+
+# OK/defer/CS audit events go to the server in batches, off the mutual-exclusion path
+_telemetry = TelemetryBuffer(lambda events: new_server_proxy().ingest_telemetry(my_roll, events))
 
 # Events for synchronization
 ask_request_event = threading.Event()
@@ -76,28 +103,31 @@ def receive_request(from_roll: str, ts):
     try:
         ts_i = int(float(ts))
     except Exception:
-        ts_i = int(time.time() * 1000000)
+        ts_i = int(time.time() * 1000) % (1 << 31)  # fits XML-RPC's 32-bit int, as clock values must
 
     try:
         update_clock(ts_i)
     except Exception:
         pass
 
-    should_defer = False
-    if in_cs:
-        should_defer = True
-    elif requesting and my_ts is not None:
-        try:
-            left = (int(my_ts), int(my_roll))
-            right = (int(ts_i), int(from_roll))
-            if left < right:
-                should_defer = True
-        except Exception:
-            pass
+    with _ra_lock:
+        should_defer = False
+        if in_cs:
+            should_defer = True
+        elif requesting and my_ts is not None:
+            try:
+                left = (int(my_ts), int(my_roll))
+                right = (int(ts_i), int(from_roll))
+                if left < right:
+                    should_defer = True
+            except Exception:
+                pass
+        if should_defer:
+            deferred.add(from_roll)
 
     if should_defer:
-        deferred.add(from_roll)
         _log(f"[Student {my_roll}] Deferred request from {from_roll} (req ts={ts_i}) — will grant after I exit CS.")
+        _telemetry.record("defer", from_roll, my_roll, ts_i)
     else:
         url = peers.get(from_roll)
         if not url:
@@ -116,18 +146,14 @@ def receive_request(from_roll: str, ts):
 
 def receive_ok(from_roll: str):
     from_roll = str(from_roll)
-    ok_received.add(from_roll)
+    with _ok_cond:
+        ok_received.add(from_roll)
+        got = len(ok_received)
+        _ok_cond.notify_all()  # wakes _start_ra_request immediately
     total_needed = max(0, len(peers) - 1)
-    _log(f"[Student {my_roll}] Received OK from {from_roll} ({len(ok_received)}/{total_needed})")
-
-    try:
-        srv = new_server_proxy()
-        srv.ok_signal(from_roll, my_roll)
-    except Exception:
-        pass
+    _log(f"[Student {my_roll}] Received OK from {from_roll} ({got}/{total_needed})")
 
-    if len(ok_received) >= total_needed:
-        enter_cs_event.set()
+    _telemetry.record("ok", from_roll, my_roll)
     return True
 
 def receive_release(from_roll: str):
@@ -139,6 +165,7 @@ def ping():
 
 # ---------------- server RPCs ----------------
 def ask_to_request():
+    _answer_buffer.flush()
     print(f"\n[Student {my_roll}] ✅ MCQ exam auto-submitted. Press ENTER to exit MCQ screen.")
     print(f"[Student {my_roll}] Now you can choose whether to enter ISA marks.")
     ask_request_event.set()
@@ -164,46 +191,144 @@ _mcq_answers_local: Dict[int,int] = {}
 # Event set when server calls start_mcq() on this student (server push)
 _mcq_start_event = threading.Event()
 
+class AnswerBuffer:
+    """
+    Uploads MCQ answers with submit_mcq_answers_bulk from a background
+    thread. An answer is sent as soon as no upload is in flight; answers
+    given during an upload are coalesced into the next call, so a fast
+    student makes fewer RPCs than questions without any answer waiting on a
+    timer (the server may auto-submit at any moment). A failed upload is
+    retried every `interval` seconds, and flush() uploads on demand.
+    """
+    def __init__(self, interval=ANSWER_FLUSH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int,int] = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    def put(self, qnum, ans):
+        with self._lock:
+            self._pending[int(qnum)] = int(ans)
+        self._wake.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return True
+            try:
+                ok = new_server_proxy().submit_mcq_answers_bulk(my_roll, {str(q): a for q, a in batch.items()})
+            except Exception as e:
+                with self._lock:
+                    # put them back unless newer answers arrived meanwhile
+                    for q, a in batch.items():
+                        self._pending.setdefault(q, a)
+                _log(f"[Student {my_roll}] WARN submit_mcq_answers_bulk failed: {e}")
+                return False
+            if not ok:
+                # the server has already finalised this roll; resending cannot help
+                _log(f"[Student {my_roll}] WARN server rejected {len(batch)} answer(s) {sorted(batch)}: already submitted")
+                return False
+            _log(f"[Student {my_roll}] Uploaded {len(batch)} answer(s): {sorted(batch)}")
+            return True
+
+    def _loop(self):
+        while not _mcq_done.is_set():
+            self._wake.wait(self.interval)  # woken by put(); the timeout retries a failed upload
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+_answer_buffer = AnswerBuffer()
+
 def notify_mcq_submitted():
     """Called by server when exam auto-submits this student."""
+    _answer_buffer.flush()
     _log(f"[Student {my_roll}] Received notification: MCQ EXAM auto-submitted by server, please press ENTER to exit exam hall.")
     _mcq_done.set()
     return True
 
+def _load_paper_cache():
+    # (hash, json text) of the cached paper, or ("", None) if missing or corrupt
+    try:
+        with open(PAPER_CACHE, encoding="utf-8") as f:
+            c = json.load(f)
+        if hashlib.sha256(c["paper"].encode()).hexdigest()[:16] == c["hash"]:  # same digest as the server's
+            return c["hash"], c["paper"]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return "", None
+
+def _fetch_paper(srv):
+    """
+    The whole paper as {qnum: {"q", "options"}} in one call, or None if it
+    cannot be had (the caller falls back to get_question_for_student).
+    A student restarting mid-exam sends the cached hash and gets no paper back.
+    """
+    have, text = _load_paper_cache()
+    try:
+        r = srv.get_exam_paper(my_roll, have)
+    except Exception as e:
+        _log(f"[Student {my_roll}] WARN fetching exam paper: {e}")
+        return None
+    if r["hash"] != have:
+        text = r["paper"]
+        tmp = f"{PAPER_CACHE}.{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"hash": r["hash"], "paper": text}, f)
+            os.replace(tmp, PAPER_CACHE)  # atomic, other students may be reading it
+        except OSError as e:
+            _log(f"[Student {my_roll}] WARN caching exam paper: {e}")
+    return {int(q): v for q, v in json.loads(text)["questions"].items()}
+
 def _mcq_worker():
     srv = new_server_proxy()
     _log(f"[Student {my_roll}] MCQ worker starting; waiting for MCQ to be active...")
+    # Wake up either if server reports active OR server pushed start via start_mcq RPC.
+    # wait_exam_state is a long poll: it returns when the exam state changes (or after
+    # LONG_POLL_SECS), so a student in the lobby makes one call per LONG_POLL_SECS.
+    lobby = new_server_proxy(timeout=LONG_POLL_SECS + RPC_TIMEOUT)
+    generation = -1  # never seen: the first call answers at once
     while True:
         if _mcq_done.is_set():
             return
+        if _mcq_start_event.is_set():
+            break
         try:
-            # Wake up either if server reports active OR server pushed start via start_mcq RPC
-            if _mcq_start_event.is_set():
-                break
-            if srv.get_mcq_active():
+            state = lobby.wait_exam_state(generation, LONG_POLL_SECS)
+            if state["active"]:
                 break
+            generation = state["generation"]
         except Exception as e:
             _log(f"[Student {my_roll}] WARN contacting server for MCQ active: {e}")
-        time.sleep(0.5)
+            time.sleep(0.5)
 
-    for qnum in range(1, 11):
+    paper = _fetch_paper(srv)  # one round trip instead of one per question
+    for qnum in (sorted(paper) if paper else range(1, 11)):
         if _mcq_done.is_set():
             return
 
-        try:
-            q = srv.get_question_for_student(my_roll, qnum)
-        except Exception as e:
-            _log(f"[Student {my_roll}] ERROR fetching question {qnum}: {e}")
-            time.sleep(0.5)
-            q = {}
+        if paper:
+            q = paper[qnum]
+        else:
+            try:
+                q = srv.get_question_for_student(my_roll, qnum)
+            except Exception as e:
+                _log(f"[Student {my_roll}] ERROR fetching question {qnum}: {e}")
+                time.sleep(0.5)
+                q = {}
         if not q:
             _log(f"[Student {my_roll}] No question data for q{qnum}; skipping.")
             chosen = 0
             _mcq_answers_local[qnum] = chosen
-            try:
-                srv.submit_mcq_answer(my_roll, qnum, chosen)
-            except Exception:
-                pass
+            _answer_buffer.put(qnum, chosen)
             continue
 
         _log(f"[Student {my_roll}] Q{qnum}: {q['q']}")
@@ -224,18 +349,17 @@ def _mcq_worker():
             _log(f"[Student {my_roll}] Answered Q{qnum} -> {chosen}")
 
         _mcq_answers_local[qnum] = chosen
-        try:
-            srv.submit_mcq_answer(my_roll, qnum, chosen)
-        except Exception as e:
-            _log(f"[Student {my_roll}] WARN submit_mcq_answer failed: {e}")
+        _answer_buffer.put(qnum, chosen)
 
     if _mcq_done.is_set():
         return
 
+    _answer_buffer.flush()
     _log(f"[Student {my_roll}] Completed local answering of 10 questions.")
     confirm = input(f"[Student {my_roll}] Submit test now? (Enter y): ").strip().lower()
     if confirm.startswith('y'):
         try:
+            _answer_buffer.flush()
             srv.submit_mcq_final(my_roll)
             print("\nTest Submitted.")
             _mcq_done.set()
@@ -245,28 +369,63 @@ def _mcq_worker():
         _log(f"[Student {my_roll}] Chose not to submit immediately; will be auto-submitted on timeout.")
 
 # ---------------- RA initiation ----------------
+def _send_requests(targets, ts):
+    # all peers concurrently: one slow peer no longer delays the REQUESTs behind it
+    report = _fanout.send(targets, "receive_request", my_roll, int(ts))
+    for r in report.failed:
+        _log(f"[Student {my_roll}] WARN: REQUEST failed to {r}: {report.results[r].error}")
+
+def get_ra_stats():
+    return list(ra_stats)
+
+def _await_votes(cond, missing, resend, t_request, what):
+    """
+    Wait on `cond` (held by the caller) until missing() is empty. After each quiet
+    RA_RETRANSMIT_SECS the REQUEST or its answer may have been lost, so resend(missing)
+    runs with `cond` released. Gives up at RA_TIMEOUT; returns (still missing, retransmits).
+    """
+    retransmits = 0
+    deadline = None if RA_TIMEOUT is None else t_request + RA_TIMEOUT
+    while True:
+        left = missing()
+        if not left:
+            return left, retransmits
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            return left, retransmits
+        wait = RA_RETRANSMIT_SECS if deadline is None else min(RA_RETRANSMIT_SECS, deadline - now)
+        if cond.wait(wait):
+            continue
+        left = missing()
+        if left and (deadline is None or time.monotonic() < deadline):
+            retransmits += 1
+            _log(f"[Student {my_roll}] Still waiting for {what} from: {left}; re-sending REQUEST")
+            cond.release()
+            try:
+                resend(left)
+            finally:
+                cond.acquire()
+
 def _start_ra_request():
-    global requesting, my_ts, ok_received, deferred, in_cs
+    global requesting, my_ts, ok_received, deferred, in_cs, _ra_timed_out
+    if MUTEX_MODE == "maekawa":
+        return _start_quorum_request()
     try:
-        srv = new_server_proxy()
-        reg = srv.get_registry()
-        if isinstance(reg, dict) and reg:
-            with _peers_lock:
-                peers.clear()
-                peers.update({str(k): str(v) for k, v in reg.items()})
-            _log(f"[Student {my_roll}] Registry fetched for RA: {list(peers.keys())}")
-        else:
-            _log(f"[Student {my_roll}] server.get_registry returned empty/invalid; using current peers map.")
+        if _sync_registry():
+            _log(f"[Student {my_roll}] Registry changed; peers for RA: {list(peers.keys())}")
     except Exception as e:
-        _log(f"[Student {my_roll}] WARN: could not fetch registry: {e} ; using current peers map.")
+        _log(f"[Student {my_roll}] WARN: could not sync registry: {e} ; using current peers map.")
 
     with _peers_lock:
         targets = {r: u for r, u in peers.items() if r != my_roll}
 
-    my_ts = tick()
-    requesting = True
-    ok_received.clear()
-    deferred.clear()
+    with _ra_lock:
+        my_ts = tick()
+        requesting = True
+    _ra_timed_out = False
+    with _ok_cond:
+        ok_received.clear()
+    t_request = time.monotonic()
 
     try:
         srv = new_server_proxy()
@@ -275,26 +434,132 @@ def _start_ra_request():
         _log(f"[Student {my_roll}] WARN: could not register intent with server")
 
     _log(f"[Student {my_roll}] REQUEST(ts={my_ts}) -> targets {list(targets.keys())}")
-    for r, url in targets.items():
-        try:
-            p = new_peer_proxy(url)
-            p.receive_request(my_roll, int(my_ts))
-        except Exception as e:
-            _log(f"[Student {my_roll}] WARN: REQUEST failed to {r}: {e}")
+    _send_requests(targets, my_ts)
 
     needed = set(targets.keys())
     _log(f"[Student {my_roll}] Waiting for OKs from: {needed}")
-    while True:
-        missing = needed - ok_received
-        if not missing:
-            break
-        _log(f"[Student {my_roll}] Still waiting for OKs from: {missing}")
-        time.sleep(5)
+    with _ok_cond:
+        missing, retransmits = _await_votes(
+            _ok_cond, lambda: needed - ok_received,
+            lambda left: _send_requests({r: targets[r] for r in left}, my_ts), t_request, "OKs")
+        got = len(needed & ok_received)
+
+    latency = time.monotonic() - t_request
+    entered = not missing
+    ra_stats.append({"ts": int(my_ts), "peers": len(needed), "latency": round(latency, 6),
+                     "retransmits": retransmits, "entered": entered})
+    if not entered:
+        _ra_timed_out = True
+        _log(f"[Student {my_roll}] Gave up after {latency:.3f}s; still missing OKs from {missing}.")
+        enter_cs_event.set()
+        return
+
+    in_cs = True
+    _log(f"[Student {my_roll}] All OKs received ({got}/{len(needed)}) after {latency*1000:.1f} ms. Entering CS.")
+    _telemetry.record("cs_enter", my_roll, int(my_ts), round(latency, 6))
+    enter_cs_event.set()
+
+# ---------------- Maekawa quorum mode ----------------
+def mutex_message(from_roll, kind, ts):
+    """Peer RPC carrying one Maekawa message (request/grant/release/inquire/yield/failed)."""
+    try:
+        update_clock(ts)
+    except Exception:
+        pass
+    with _quorum_cond:
+        out = _quorum_site.on_message(int(from_roll), str(kind), int(ts))
+        _quorum_cond.notify_all()  # any vote traffic: the requester's retransmit timer starts over
+    _send_quorum_messages(out)
+    return True
+
+def _send_quorum_messages(out, retries=QUORUM_RETRIES):
+    # each (kind, ts) goes to all its peers concurrently, as RA REQUESTs do: one slow voter
+    # no longer delays the rest. Sends that fail are retried later from a timer thread.
+    groups = {}
+    for dest, kind, ts in out:
+        if str(dest) == my_roll:
+            mutex_message(my_roll, kind, ts)  # our own vote, no RPC needed
+        else:
+            groups.setdefault((kind, int(ts)), []).append(str(dest))
+    failed = []
+    for (kind, ts), dests in groups.items():
+        if any(d not in peers for d in dests):
+            _refresh_peers_quiet()
+        targets = {d: peers[d] for d in dests if d in peers}
+        for d in sorted(set(dests) - set(targets)):
+            _log(f"[Student {my_roll}] WARN: no URL for {d}, cannot send {kind}")
+        report = _fanout.send(targets, "mutex_message", my_roll, kind, ts)
+        for d in report.failed:
+            _log(f"[Student {my_roll}] WARN: {kind} to {d} failed: {report.results[d].error}")
+            failed.append((int(d), kind, ts))
+    if failed and retries:
+        t = threading.Timer(RA_RETRANSMIT_SECS, _send_quorum_messages, (failed, retries - 1))
+        t.daemon = True
+        t.start()
+
+def _start_quorum_request():
+    global requesting, my_ts, in_cs, _ra_timed_out
+    _refresh_peers_quiet()
+    with _peers_lock:
+        sites = sorted(int(r) for r in peers)
+    if int(my_roll) not in sites:
+        sites = sorted(sites + [int(my_roll)])
+    quorum = grid_quorum(int(my_roll), sites)
+
+    my_ts = tick()
+    requesting = True
+    _ra_timed_out = False
+    t_request = time.monotonic()
+    with _quorum_cond:
+        _quorum_site.quorum = set(quorum)
+        out = _quorum_site.request(int(my_ts))
+    _log(f"[Student {my_roll}] QUORUM REQUEST(ts={my_ts}) -> quorum {quorum} of {len(sites)} students")
+    _send_quorum_messages(out)
+
+    me = int(my_roll)
+    with _quorum_cond:
+        missing, retransmits = _await_votes(
+            _quorum_cond, lambda: set() if _quorum_site.in_cs else _quorum_site.quorum - _quorum_site.grants,
+            lambda left: _send_quorum_messages([(v, "request", int(my_ts)) for v in sorted(left - {me})]),
+            t_request, "quorum votes")
+    entered = not missing
+    latency = time.monotonic() - t_request
+    ra_stats.append({"ts": int(my_ts), "peers": len(quorum) - 1, "latency": round(latency, 6),
+                     "retransmits": retransmits, "entered": entered})
+    if not entered:
+        _ra_timed_out = True
+        _log(f"[Student {my_roll}] Gave up after {latency:.3f}s waiting for quorum votes.")
+        enter_cs_event.set()
+        return
 
     in_cs = True
-    _log(f"[Student {my_roll}] All OKs received ({len(ok_received)}/{len(needed)}). Entering CS.")
+    _log(f"[Student {my_roll}] All {len(quorum)} quorum votes after {latency*1000:.1f} ms. Entering CS.")
+    _telemetry.record("cs_enter", my_roll, int(my_ts), round(latency, 6))
     enter_cs_event.set()
 
+def _exit_cs():
+    """Let waiting peers in: deferred OKs (RA) or RELEASE to the quorum (Maekawa)."""
+    global requesting, in_cs, my_ts
+    if in_cs:
+        _telemetry.record("cs_exit", my_roll, int(my_ts or 0))
+    if MUTEX_MODE != "maekawa":
+        with _ra_lock:
+            # leave the CS and take the deferred set in one step: later REQUESTs get an OK at once
+            targets = list(deferred)
+            deferred.clear()
+            requesting = in_cs = False
+            my_ts = None
+        _send_deferred_oks(targets)
+        return
+    with _quorum_cond:
+        if _quorum_site.my_req is None:
+            return
+        if not _quorum_site.in_cs:
+            # abandoned attempt: hand back every vote we hold or may still receive
+            _quorum_site.in_cs = True
+        out = _quorum_site.release()
+    _send_quorum_messages(out)
+
 def _main_prompt_loop():
     global requesting, in_cs, my_ts, deferred
     mcq_thread = threading.Thread(target=_mcq_worker, daemon=True)
@@ -312,6 +577,12 @@ def _main_prompt_loop():
         _log(f"[Student {my_roll}] Waiting to be allowed to enter critical section...")
         enter_cs_event.wait()
         enter_cs_event.clear()
+        if _ra_timed_out:
+            _exit_cs()
+            requesting = False
+            my_ts = None
+            ok_received.clear()
+            continue
 
         # ✨ Clear ISA entry banner
         print("\n==============================")
@@ -323,12 +594,11 @@ def _main_prompt_loop():
             marks = int(raw)
         except Exception as e:
             _log(f"[Student {my_roll}] Invalid marks input: {e}; aborting this attempt.")
-            _send_deferred_oks()
+            _exit_cs()
             requesting = False
             in_cs = False
             my_ts = None
             ok_received.clear()
-            deferred.clear()
             continue
 
         try:
@@ -338,27 +608,20 @@ def _main_prompt_loop():
         except Exception as e:
             _log(f"[Student {my_roll}] ERROR sending update_isa: {e}")
 
-        _send_deferred_oks()
+        _exit_cs()
 
         requesting = False
         in_cs = False
         my_ts = None
         ok_received.clear()
-        deferred.clear()
         _log(f"[Student {my_roll}] Completed an ISA entry cycle.")
 
-def _send_deferred_oks():
-    with _peers_lock:
-        targets = list(deferred)
-        try:
-            srv = new_server_proxy()
-            reg = srv.get_registry()
-            if isinstance(reg, dict) and reg:
-                peers.clear()
-                peers.update({str(k): str(v) for k, v in reg.items()})
-                _log(f"[Student {my_roll}] Refreshed peers before flushing deferred OKs: {list(peers.keys())}")
-        except Exception:
-            pass
+def _send_deferred_oks(targets):
+    try:
+        if _sync_registry():
+            _log(f"[Student {my_roll}] Refreshed peers before flushing deferred OKs: {list(peers.keys())}")
+    except Exception:
+        pass
 
     for r in targets:
         url = peers.get(r)
@@ -383,18 +646,28 @@ def show_results(data):
     return True
 
 
+def _sync_registry():
+    """
+    Bring `peers` up to date with the server's registry. Only the changes since
+    the last sync cross the wire, and nothing but the version when membership
+    is stable. Returns True if `peers` changed.
+    """
+    global _registry_epoch, _registry_version
+    d = new_server_proxy().get_registry_since(_registry_version, _registry_epoch)
+    changes = {str(k): str(v) for k, v in d["changes"].items()}
+    with _peers_lock:
+        if d["full"] and changes:  # an empty registry keeps whatever peers we probed
+            peers.clear()
+        peers.update(changes)
+        _registry_epoch, _registry_version = d["epoch"], d["version"]
+    return bool(changes)
+
 def _refresh_peers_quiet():
     try:
-        srv = new_server_proxy()
-        reg = srv.get_registry()
-        if isinstance(reg, dict) and reg:
-            with _peers_lock:
-                peers.clear()
-                peers.update({str(k): str(v) for k, v in reg.items()})
-            return True
+        _sync_registry()
+        return bool(peers)
     except Exception:
         return False
-    return False
 
 def _refresh_peers():
     ok = _refresh_peers_quiet()
@@ -464,11 +737,14 @@ def send_time():
 
 # ---------------- RPC server ----------------
 def _run_rpc_server(host, port):
-    srv = ThreadingXMLRPCServer((host, port), allow_none=True, logRequests=False)
+    srv = ThreadingXMLRPCServer((host, port), requestHandler=KeepAliveRequestHandler,
+                                allow_none=True, logRequests=False)
     srv.register_function(receive_request, "receive_request")
     srv.register_function(receive_ok, "receive_ok")
     srv.register_function(receive_release, "receive_release")
     srv.register_function(ping, "ping")
+    srv.register_function(get_ra_stats, "get_ra_stats")
+    srv.register_function(mutex_message, "mutex_message")
     srv.register_function(ask_to_request, "ask_to_request")
     srv.register_function(notify_selection, "notify_selection")
     srv.register_function(grant_write, "grant_write")
@@ -482,9 +758,10 @@ def _run_rpc_server(host, port):
     srv.serve_forever()
 
 def main(roll: str, host: str, port: int):
-    global my_roll, my_url
+    global my_roll, my_url, _quorum_site
     my_roll = str(roll)
     my_url = f"http://{host}:{int(port)}/"
+    _quorum_site = MaekawaSite(int(my_roll), [int(my_roll)]) if MUTEX_MODE == "maekawa" else None
     threading.Thread(target=_run_rpc_server, args=(host, int(port)), daemon=True).start()
     time.sleep(0.05)
     try:
@@ -3,15 +3,17 @@ from xmlrpc.server import SimpleXMLRPCServer
 from socketserver import ThreadingMixIn
 import datetime
 import threading
-import xmlrpc.client
 from pathlib import Path
+from rpc_pool import proxy as rpc_proxy, KeepAliveRequestHandler
+from rpc_metrics import InstrumentedMixin
 
 try:
-    from openpyxl import Workbook, load_workbook
+    from openpyxl import load_workbook
+    from results_store import ResultsStore
 except ImportError:
     raise SystemExit("Please install openpyxl: pip install openpyxl")
 
-class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+class ThreadingXMLRPCServer(InstrumentedMixin, ThreadingMixIn, SimpleXMLRPCServer):
     daemon_threads = True
 
 # sample student data (preserved)
@@ -25,6 +27,7 @@ students = {
 
 local_time = None
 excel_path = Path("results.xlsx")
+results = ResultsStore(excel_path)
 _write_lock = threading.Lock()
 results_ready = False
 
@@ -39,7 +42,7 @@ def calculate_cv(server_time_str):
     global local_time
     server_time = datetime.datetime.strptime(server_time_str, "%H-%M-%S")
     cv = (local_time - server_time).total_seconds()
-    proxy = xmlrpc.client.ServerProxy("http://127.0.0.1:9000/", allow_none=True)
+    proxy = rpc_proxy("http://127.0.0.1:9000/")
     proxy.receive_cv("Teacher", cv)
     return True
 
@@ -66,70 +69,72 @@ def deduct_marks(roll, flag):
 
 
 
+def _record_mcq(roll, mcq_marks):
+    # caller holds _write_lock
+    if roll not in students:
+        # add a new entry if teacher didn't have this student
+        students[roll] = {
+            "name": f"Student{roll}",
+            "marks": 0,
+            "flag": 0,
+            "mcq": int(mcq_marks),
+        }
+    else:
+        students[roll]["mcq"] = int(mcq_marks)
+
+    # Queue the Excel update; the store batches rows into one save
+    try:
+        if not results.exists():
+            # first write: seed a row for every known student
+            for r, info in students.items():
+                results.update(r, {}, [
+                    r,
+                    info.get("name", f"Student{r}"),
+                    info.get("marks", "NA"),
+                    info.get("mcq", "NA"),
+                    "NA",
+                ])
+        results.update(roll, {4: int(mcq_marks)}, [
+            roll,
+            students[roll].get("name", f"Student{roll}"),
+            students[roll].get("marks", "NA"),
+            int(mcq_marks),
+            "NA",
+        ])
+    except Exception as e:
+        print("[Teacher] ERROR updating Excel:", e)
+
+
 def update_mcq_marks(roll, mcq_marks):
     """
     Server calls this after MCQ finalization for each student.
-    Store MCQ marks and update Excel immediately for clarity.
+    Store MCQ marks and queue the Excel update on the batched results store.
     """
     roll = str(roll)
     with _write_lock:
-        if roll not in students:
-            # add a new entry if teacher didn't have this student
-            students[roll] = {
-                "name": f"Student{roll}",
-                "marks": 0,
-                "flag": 0,
-                "mcq": int(mcq_marks),
-            }
-        else:
-            students[roll]["mcq"] = int(mcq_marks)
+        _record_mcq(roll, mcq_marks)
         print(f"[Teacher] Received MCQ marks for roll {roll}: {mcq_marks}")
 
-        # Update Excel: create file & header if missing
-        try:
-            if not excel_path.exists():
-                wb = Workbook()
-                ws = wb.active
-                ws.append(["Roll", "Name", "Marks", "MCQ", "ISA"])
-                for r, info in students.items():
-                    ws.append([
-                        r,
-                        info.get("name", f"Student{r}"),
-                        info.get("marks", "NA"),
-                        info.get("mcq", "NA"),
-                        "NA",
-                    ])
-                wb.save(excel_path)
-            else:
-                wb = load_workbook(excel_path)
-                ws = wb.active
-                updated = False
-                for row in ws.iter_rows(min_row=2):
-                    if row and str(row[0].value) == str(roll):
-                        # ensure columns for MCQ exist
-                        while ws.max_column < 4:
-                            ws.cell(row=1, column=ws.max_column + 1, value=None)
-                        ws.cell(row=row[0].row, column=4, value=int(mcq_marks))
-                        updated = True
-                        break
-                if not updated:
-                    ws.append([
-                        roll,
-                        students[roll].get("name", f"Student{roll}"),
-                        students[roll].get("marks", "NA"),
-                        int(mcq_marks),
-                        "NA",
-                    ])
-                wb.save(excel_path)
-        except Exception as e:
-            print("[Teacher] ERROR updating Excel:", e)
-
     # ✅ mark results as ready
     global results_ready
     results_ready = True
     return True
 
 
+def update_mcq_marks_bulk(marks):
+    """
+    Server calls this once after batch finalization with {roll: mcq_marks}.
+    """
+    with _write_lock:
+        for roll, mcq_marks in marks.items():
+            _record_mcq(str(roll), mcq_marks)
+        print(f"[Teacher] Received MCQ marks for {len(marks)} roll(s)")
+
+    global results_ready
+    results_ready = True
+    return True
+
+
 
 def get_results():
     # Return tuples: (roll, name, examMarks, mcq) - mcq may be None
@@ -141,7 +146,8 @@ def get_results():
 
 
 def run_teacher():
-    server = ThreadingXMLRPCServer(("0.0.0.0", 9001), allow_none=True, logRequests=False)
+    server = ThreadingXMLRPCServer(("0.0.0.0", 9001), requestHandler=KeepAliveRequestHandler,
+                                   allow_none=True, logRequests=False)
     server.register_function(input_time, "input_time")
     server.register_function(calculate_cv, "calculate_cv")
     server.register_function(apply_adjustment, "apply_adjustment")
@@ -151,6 +157,7 @@ def run_teacher():
     server.register_function(release_results, "release_results")
 
     server.register_function(update_mcq_marks, "update_mcq_marks")
+    server.register_function(update_mcq_marks_bulk, "update_mcq_marks_bulk")
     print("[Teacher] Running on port 9001...")
     server.serve_forever()
 
@@ -159,6 +166,7 @@ def release_results():
     from openpyxl import load_workbook
 
     try:
+        results.flush()
         wb = load_workbook(excel_path)
         ws = wb.active
         data = []
@@ -170,7 +178,7 @@ def release_results():
 
     print("[Teacher] Results released to students.")
 
-    proxy = xmlrpc.client.ServerProxy("http://127.0.0.1:9000/", allow_none=True)
+    proxy = rpc_proxy("http://127.0.0.1:9000/")
     proxy.announce_results(data)
     return True
 
@@ -0,0 +1,64 @@
+# telemetry.py – fire-and-forget event buffer flushed to the server in batches
+import time, threading
+from collections import deque
+
+FLUSH_INTERVAL = 1.0
+MAX_BUFFERED = 10_000  # oldest events are dropped beyond this
+
+class TelemetryBuffer:
+    """
+    record() only appends to an in-memory deque, so callers on the critical
+    path of mutual exclusion never wait on the network. A background thread
+    hands whatever has accumulated to `send(events)` every `interval` seconds;
+    events are [unix_time, kind, *fields] lists so they travel over XML-RPC.
+
+    A batch that fails to send is kept for the next flush, unless it could
+    not be encoded at all (an int past XML-RPC's 32 bits, an unsupported
+    type): that would fail every time, so it is dropped and counted.
+    """
+    def __init__(self, send, interval=FLUSH_INTERVAL, max_buffered=MAX_BUFFERED):
+        self._send = send
+        self.interval = interval
+        self._buf = deque(maxlen=max_buffered)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.sent = self.batches = self.failures = self.dropped = 0
+
+    def record(self, kind, *fields):
+        self._buf.append([time.time(), kind, *fields])
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="telemetry", daemon=True)
+                    self._thread.start()
+
+    def flush(self):
+        batch = []
+        while self._buf:
+            try:
+                batch.append(self._buf.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return 0
+        try:
+            self._send(batch)
+        except (OverflowError, TypeError):  # raised while encoding, before anything is sent
+            self.failures += 1
+            self.dropped += len(batch)
+            return 0
+        except Exception:
+            self.failures += 1
+            # keep the newest events for the next attempt; the deque bound drops the rest
+            room = self._buf.maxlen - len(self._buf)
+            if room > 0:
+                self._buf.extendleft(reversed(batch[-room:]))
+            return 0
+        self.sent += len(batch)
+        self.batches += 1
+        return len(batch)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
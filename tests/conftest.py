@@ -0,0 +1,77 @@
+# conftest.py – shared fixtures: server.py's module state on a clean slate, and throwaway RPC servers
+import sys, threading
+from collections import Counter, deque
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from exam_state import ExamState
+from results_store import ResultsStore
+from rpc_server import PooledXMLRPCServer
+from timer_wheel import TimingWheel
+from wal import WriteAheadLog
+
+def _reset(server, monkeypatch, wal_dir):
+    for name, value in (
+            ("exam", ExamState(server.MCQ_QUESTIONS)),
+            ("wal", WriteAheadLog(wal_dir, fsync_interval=0.001)),
+            ("results", ResultsStore(wal_dir.parent / "results.xlsx")),
+            ("wheel", TimingWheel()),
+            ("students_registry", {}),
+            ("registry_changes", deque(maxlen=server.REGISTRY_LOG)),
+            ("registry_version", 0),
+            ("student_flags", {}),
+            ("processing_now", set()),
+            ("forwarded_pending", set()),
+            ("forwarded_jobs", {}),
+            ("ra_audit", deque(maxlen=100_000)),
+            ("ra_audit_counts", Counter()),
+            ("exam_end", None),
+            ("exam_end_at", 0.0)):
+        monkeypatch.setattr(server, name, value)
+
+def _disarm(server):
+    # nothing armed by one test (or one "process") may fire into the next
+    with server.exam_end_lock:
+        if server.exam_end is not None: server.exam_end.cancel()
+    for _, rec in server.exam.items():
+        if rec.timer is not None: rec.timer.cancel()
+
+@pytest.fixture
+def fresh_server(tmp_path, monkeypatch):
+    """The server module with empty state, its WAL and results.xlsx under tmp_path."""
+    import server
+    _reset(server, monkeypatch, tmp_path / "wal")
+    yield server
+    _disarm(server)
+
+@pytest.fixture
+def restart_server(fresh_server, tmp_path, monkeypatch):
+    """restart() -> fresh_server's state dropped as by a crash, then rebuilt with recover_state()."""
+    def restart():
+        fresh_server.wal.sync()
+        _disarm(fresh_server)
+        _reset(fresh_server, monkeypatch, tmp_path / "wal")
+        fresh_server.recover_state()
+        return fresh_server
+    return restart
+
+@pytest.fixture
+def serve():
+    """serve(functions) -> URL of a PooledXMLRPCServer on a free port with `functions` registered."""
+    servers = []
+
+    def start(functions):
+        srv = PooledXMLRPCServer(("127.0.0.1", 0), workers=4, allow_none=True, logRequests=False)
+        for fn in functions:
+            srv.register_function(fn, fn.__name__)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return f"http://127.0.0.1:{srv.server_address[1]}/"
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
@@ -0,0 +1,23 @@
+# test_backup.py – the backup forgets delivered jobs but can still tell a poller what happened
+import time
+
+import pytest
+
+import backup_server
+
+@pytest.fixture
+def jobs(monkeypatch):
+    monkeypatch.setattr(backup_server, "jobs", {})
+    return backup_server.jobs
+
+def test_delivered_jobs_expire(jobs, monkeypatch):
+    mine = f"{backup_server.BACKUP_PORT}-{backup_server._boot}-"
+    now = time.monotonic()
+    jobs[mine + "1"] = {"roll": "1", "state": "delivered", "final": 40, "delivered_at": now - 61}
+    jobs[mine + "2"] = {"roll": "2", "state": "delivered", "final": 30, "delivered_at": now}
+    jobs[mine + "3"] = {"roll": "3", "state": "done", "final": 20}  # not yet acknowledged: kept
+    backup_server._evict_delivered(now)
+    assert sorted(jobs) == [mine + "2", mine + "3"]
+    assert backup_server.get_job_status(mine + "1")["state"] == "expired"
+    assert backup_server.get_job_status(mine + "2")["state"] == "delivered"
+    assert backup_server.get_job_status("9099-1-1")["state"] == "unknown"  # another backup, or before a restart
@@ -0,0 +1,72 @@
+# test_binrpc.py – the binrpc codec and framing
+import enum, io, xmlrpc.client
+
+import pytest
+
+import binrpc
+
+class Colour(enum.IntEnum):
+    RED = 1
+
+VALUES = [
+    None, True, False, 0, -1, 42,
+    (1 << 63) - 1, -(1 << 63),     # the last ints that fit the 8-byte form
+    1 << 63, -(1 << 63) - 1, 10 ** 40, -10 ** 40,  # big ints travel as text
+    0.0, -2.5, 1e300, "", "roll 17", "ünïcødé ✓", b"", b"\x00\x01\xff",
+    [], [1, "a", None, [2.5, b"x"]],
+    {}, {"a": 1}, {1: 2, 10: 4}, {"17": {1: 2}, 3: [True, None]},
+]
+
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+def test_round_trip(value):
+    out = binrpc.loads(binrpc.dumps(value))
+    assert out == value
+    assert type(out) is type(value)
+
+def test_int_keys_stay_ints():
+    out = binrpc.loads(binrpc.dumps({1: 2, "1": 3}))
+    assert out == {1: 2, "1": 3}
+
+@pytest.mark.parametrize("value, expected", [
+    ((1, 2), [1, 2]),
+    (bytearray(b"ab"), b"ab"),
+    (xmlrpc.client.Binary(b"\x02\x03"), b"\x02\x03"),
+    (Colour.RED, 1),
+])
+def test_normalised_types(value, expected):
+    out = binrpc.loads(binrpc.dumps(value))
+    assert out == expected
+    assert type(out) is type(expected)
+
+def test_unsupported_type():
+    with pytest.raises(TypeError):
+        binrpc.dumps({1, 2})
+
+def test_trailing_bytes_rejected():
+    with pytest.raises(ValueError):
+        binrpc.loads(binrpc.dumps(1) + b"N")
+
+def test_bad_tag_rejected():
+    with pytest.raises(ValueError):
+        binrpc.loads(b"z")
+
+def test_frames():
+    buf = io.BytesIO(binrpc.request("submit_mcq_answers_bulk", ("17", {1: 2})) + binrpc.reply(True))
+    assert binrpc.read_frame(buf.read) == ["submit_mcq_answers_bulk", ["17", {1: 2}]]
+    assert binrpc.result_of(binrpc.read_frame(buf.read)) is True
+
+def test_not_a_frame():
+    with pytest.raises(ValueError):
+        binrpc.read_frame(io.BytesIO(b"POST / HTTP/1.1\r\n").read)
+
+def test_dispatch_faults():
+    def call(method, params):
+        if method == "fault":
+            raise xmlrpc.client.Fault(7, "nope")
+        raise ValueError("bad option")
+
+    for method, code, text in (("fault", 7, "nope"), ("boom", 1, "bad option")):
+        resp = binrpc.read_frame(io.BytesIO(binrpc.dispatch(call, [method, []])).read)
+        with pytest.raises(xmlrpc.client.Fault) as e:
+            binrpc.result_of(resp)
+        assert e.value.faultCode == code and text in e.value.faultString
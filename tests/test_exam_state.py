@@ -0,0 +1,56 @@
+# test_exam_state.py – ExamState.put keeps the running raw score exact
+import random
+
+import pytest
+
+from exam_state import ExamState
+from scoring import compute_score, sheet_to_dict
+from server import MCQ_QUESTIONS
+
+def _raw(exam, rec):
+    return compute_score(sheet_to_dict(rec.sheet, exam.qnums), 0, MCQ_QUESTIONS)[0]
+
+def test_raw_follows_random_changes():
+    rng = random.Random(7)
+    exam = ExamState(MCQ_QUESTIONS, stripes=4)
+    rolls = [str(r) for r in range(20)]
+    for _ in range(3000):
+        roll = rng.choice(rolls)
+        # unanswered (0), wrong and right answers, re-answers and repeats within one batch
+        batch = {rng.choice(exam.qnums): rng.randint(0, 4) for _ in range(rng.randint(1, 4))}
+        with exam.locked(roll) as rec:
+            exam.put(rec, batch)
+            assert rec.raw == _raw(exam, rec)
+    raws = {r: rec.raw for r, rec in exam.items()}
+    exam.rescore()
+    assert {r: rec.raw for r, rec in exam.items()} == raws
+
+@pytest.mark.parametrize("batch", [
+    {1: 2, 99: 1},   # no such question
+    {1: 2, 2: 5},    # past the last option
+    {1: 2, 2: -1},
+])
+def test_bad_batch_changes_nothing(batch):
+    exam = ExamState(MCQ_QUESTIONS)
+    with exam.locked("1") as rec:
+        exam.put(rec, {1: 1, 2: 2})
+        sheet, raw = bytes(rec.sheet), rec.raw
+        with pytest.raises(ValueError):
+            exam.put(rec, batch)
+        assert bytes(rec.sheet) == sheet and rec.raw == raw
+
+def test_answer_key_only_questions():
+    exam = ExamState({1: {"answer": 200}, 2: {"answer": 1}})
+    rec = exam.record("1")
+    exam.put(rec, {1: 200, 2: 3})
+    assert rec.raw == 10
+    with pytest.raises(ValueError):
+        exam.put(rec, {1: 256})
+
+def test_clear():
+    exam = ExamState(MCQ_QUESTIONS)
+    exam.set_active(True, 123.0)
+    exam.put(exam.record("1"), {1: 2})
+    exam.clear()
+    assert len(exam) == 0 and exam.get("1") is None
+    assert not exam.active and exam.started_at is None
@@ -0,0 +1,38 @@
+# test_mutex.py – Ricart-Agrawala and Maekawa sites, alone and in the simulator
+import pytest
+
+from mutex import MaekawaSite, simulate
+
+@pytest.mark.parametrize("algo", ["ra", "maekawa"])
+def test_every_site_enters_once_per_round(algo):
+    for seed in range(5):
+        assert simulate(9, algo, rounds=3, seed=seed)["entries"] == 27
+
+@pytest.mark.parametrize("n", [4, 9, 16, 25])
+def test_resent_requests_keep_mutual_exclusion(n):
+    for seed in range(10):
+        run = simulate(n, "maekawa", rounds=3, seed=seed, duplicate=0.5)
+        assert run["entries"] == n * 3
+
+def test_voter_ignores_resent_request():
+    voter = MaekawaSite(1, [1, 2, 3])
+    assert voter.on_message(2, "request", 5) == [(2, "grant", 5)]
+    assert voter.on_message(2, "request", 5) == []  # still holds the vote: no second GRANT
+    assert voter.on_message(3, "request", 7) == [(3, "failed", 7)]
+    assert voter.on_message(3, "request", 7) == []  # already queued
+    assert voter.waiting == [(7, 3)]
+
+def test_voter_ignores_stale_release_and_yield():
+    voter = MaekawaSite(1, [1, 2, 3])
+    voter.on_message(2, "request", 5)
+    voter.on_message(3, "request", 7)
+    assert voter.on_message(2, "release", 4) == []  # an earlier request of site 2
+    assert voter.on_message(2, "yield", 4) == []
+    assert voter.locked_for == (5, 2)
+    assert voter.on_message(2, "release", 5) == [(3, "grant", 7)]
+
+def test_grant_for_abandoned_request_is_handed_back():
+    site = MaekawaSite(2, [1, 2])
+    site.request(5)
+    site.release()
+    assert site.on_message(1, "grant", 5) == [(1, "release", 5)]
@@ -0,0 +1,25 @@
+# test_server.py – server.py's submit path: a claimed roll takes no more answers
+import time
+
+class _Teacher:
+    def __init__(self): self.marks = {}
+    def update_mcq_marks(self, roll, final): self.marks[roll] = final
+    def update_mcq_marks_bulk(self, scores): self.marks.update(scores)
+
+def test_answers_after_submit_are_refused(fresh_server, monkeypatch):
+    server, teacher = fresh_server, _Teacher()
+    monkeypatch.setattr(server, "teacher_proxy", teacher)
+    monkeypatch.setattr(server, "PROCESSING_SECS", 0.2)
+    server.exam.set_active(True, time.time())
+    server.submit_mcq_answers_bulk("7", {"1": 2, "2": 2})
+    assert server.submit_mcq_final("7")
+    # still in the finalisation queue: nothing may change the sheet the mark comes from
+    assert server.submit_mcq_answer("7", 3, 2) is False
+    assert server.submit_mcq_answers_bulk("7", {"3": 2}) is False
+    deadline = time.monotonic() + 5
+    while "7" not in teacher.marks:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    rec = server.exam.get("7")
+    assert teacher.marks["7"] == rec.final == rec.raw == 20
+    assert server.submit_mcq_final("7") and server.submit_mcq_answer("7", 3, 2) is False
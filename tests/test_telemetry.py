@@ -0,0 +1,26 @@
+# test_telemetry.py – a batch that cannot be encoded is dropped, others are retried
+import xmlrpc.client
+
+from telemetry import TelemetryBuffer
+
+def _buffer(fail=None):
+    sent = []
+
+    def send(events):
+        xmlrpc.client.dumps((events,))  # what ServerProxy does before anything goes out
+        if fail: raise fail
+        sent.append(events)
+
+    return TelemetryBuffer(send), sent
+
+def test_unencodable_batch_is_dropped():
+    buf, sent = _buffer()
+    buf._buf.append([1.0, "defer", "1", "2", 10 ** 15])
+    assert buf.flush() == 0 and buf.dropped == 1 and not buf._buf
+    buf._buf.append([2.0, "ok", "1", "2"])
+    assert buf.flush() == 1 and sent == [[[2.0, "ok", "1", "2"]]]
+
+def test_failed_send_is_kept():
+    buf, _ = _buffer(ConnectionRefusedError())
+    buf._buf.append([1.0, "ok", "1", "2"])
+    assert buf.flush() == 0 and buf.dropped == 0 and list(buf._buf) == [[1.0, "ok", "1", "2"]]
@@ -0,0 +1,56 @@
+# test_timer_wheel.py – every TimingWheel timer fires at its due tick, cancelled ones never
+import random, threading
+
+import pytest
+
+import timer_wheel
+from timer_wheel import Timer, TimingWheel
+
+@pytest.fixture
+def small_wheel(monkeypatch):
+    # 3 levels of 4 slots: 64 ticks before timers overflow the top wheel, so a few hundred ticks cover every path
+    for name, value in (("BITS", 2), ("SLOTS", 4), ("MASK", 3), ("LEVELS", 3)):
+        monkeypatch.setattr(timer_wheel, name, value)
+    return TimingWheel()
+
+def _add(wheel, due):
+    # schedule() without the wall clock (or the thread); the test drives _advance() itself
+    t = Timer(wheel, due, None, ())
+    with wheel._lock:
+        wheel._file(t)
+        wheel._count += 1
+    return t
+
+def test_fires_at_due_tick(small_wheel):
+    wheel, rng = small_wheel, random.Random(3)
+    timers, cancelled, fired = [], set(), {}
+    for tick in range(1, 1200):
+        if tick < 700:
+            for _ in range(rng.randint(0, 3)):
+                timers.append(_add(wheel, tick + rng.randint(0, 300)))  # due this tick up to far past the top wheel
+            for t in rng.sample(timers, min(len(timers), 1)):
+                if t.pending and rng.random() < 0.2:
+                    assert t.cancel()
+                    cancelled.add(t)
+        with wheel._lock:
+            for t in wheel._advance():
+                assert t not in fired and t not in cancelled
+                fired[t] = wheel._now
+    assert all(fired[t] == t.due for t in fired)
+    assert set(fired) | cancelled == set(timers)
+    assert len(wheel) == 0 and not any(t.pending for t in timers)
+
+def test_cancel_after_fire(small_wheel):
+    t = _add(small_wheel, 1)
+    with small_wheel._lock:
+        assert small_wheel._advance() == [t]
+    assert not t.pending and not t.cancel()
+
+def test_real_time():
+    wheel = TimingWheel(tick=0.01)
+    done, calls = threading.Event(), []
+    keep = wheel.schedule(0.05, lambda: (calls.append("keep"), done.set()))
+    drop = wheel.schedule(0.03, calls.append, "drop")
+    assert drop.cancel() and len(wheel) == 1
+    assert done.wait(2.0)
+    assert calls == ["keep"] and not keep.pending and len(wheel) == 0
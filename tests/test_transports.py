@@ -0,0 +1,104 @@
+# test_transports.py – the real server and backup RPCs, called over XML-RPC and over binrpc frames
+import asyncio, json, struct, time, urllib.parse, xmlrpc.client
+
+import pytest
+
+import binrpc, rpc_pool
+from aio_rpc import AsyncXMLRPCServer
+from rpc_pool import BinaryServerProxy, proxy
+from scoring import apply_penalty, compute_score, sheet_to_dict
+
+TRANSPORTS = ["xml", "binary"]
+
+def _connect(url, transport, warmup):
+    p = proxy(url, binary=transport == "binary")
+    getattr(p, warmup)()  # the first reply is XML-RPC and advertises binrpc; later calls use frames
+    if transport == "binary":
+        assert isinstance(p, BinaryServerProxy)
+        assert rpc_pool._binary_hosts.get(urllib.parse.urlsplit(url).netloc)
+    return p
+
+def _keys(answers, transport):
+    # XML-RPC structs only have string keys; binrpc carries int keys as they are
+    return answers if transport == "binary" else {str(q): a for q, a in answers.items()}
+
+def _session(p, transport, roll):
+    """One student's calls; returns the replies, less anything that depends on the roll."""
+    url = f"http://127.0.0.1:9101/{roll}"
+    out = [p.register_student(roll, url)]
+    out.append(p.get_registry()[roll] == url)
+    paper = p.get_exam_paper(roll)
+    out.append(p.get_exam_paper(roll, paper["hash"]) == {"hash": paper["hash"]})
+    out.append(sorted(json.loads(paper["paper"])["questions"]))
+    out.append(p.get_question_for_student(roll, 2)["options"])
+    out.append(p.submit_mcq_answers_bulk(roll, _keys({1: 2, 2: 1, 3: 2}, transport)))
+    out.append(p.submit_mcq_answer(roll, 2, 2))
+    with pytest.raises(xmlrpc.client.Fault) as e:
+        p.submit_mcq_answers_bulk(roll, _keys({4: 3, 5: 9}, transport))
+    out.append("out of range" in e.value.faultString)
+    state = p.wait_exam_state(-1, 0)
+    out.append(sorted(state))
+    out.append(p.wait_exam_state(state["generation"], 0.05)["generation"] == state["generation"])
+    out.append(p.ingest_telemetry(roll, [[1.5, "enter_cs", 7]]))
+    out.append(p.get_ra_audit(1)["recent"][-1][1:] == ["enter_cs", 7, roll])
+    out.append(p.get_registry_since(0, "")["changes"][roll] == url)
+    return out
+
+@pytest.fixture
+def server_url(fresh_server, serve):
+    fresh_server.exam.set_active(True, time.time())
+    return serve(fresh_server._rpc_functions())
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_server_calls(fresh_server, server_url, transport):
+    p = _connect(server_url, transport, "get_mcq_active")
+    questions = fresh_server.MCQ_QUESTIONS
+    assert _session(p, transport, "7") == [
+        True, True, True, sorted(str(q) for q in questions), questions[2]["options"], True, True, True,
+        ["active", "generation", "started_at"], True, True, True, True]
+    rec = fresh_server.exam.get("7")
+    answers = sheet_to_dict(rec.sheet, fresh_server.exam.qnums)
+    assert answers == {1: 2, 2: 2, 3: 2}  # the rejected batch wrote nothing
+    assert rec.raw == compute_score(answers, 0, fresh_server.MCQ_QUESTIONS)[0] == 30
+    assert rec.deadline is not None  # fetching the paper started the clock
+
+SHEET = bytes([2, 2, 2, 3, 2, 1, 1, 1, 1, 1])  # five right: 50 raw, 40 after one warning
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+@pytest.mark.parametrize("answers", [
+    SHEET,
+    xmlrpc.client.Binary(SHEET),
+    {q: a for q, a in enumerate(SHEET, 1)},
+    50,  # what the current server forwards: the running raw score
+], ids=["bytes", "Binary", "int-keys", "raw"])
+def test_forwarded_submission(serve, monkeypatch, transport, answers):
+    import backup_server
+    monkeypatch.setattr(backup_server, "PROCESSING_SECS", 0.0)
+    url = serve([backup_server.process_forwarded_submission, backup_server.get_job_status, backup_server.ping])
+    p = _connect(url, transport, "ping")
+    if isinstance(answers, dict):
+        answers = _keys(answers, transport)
+    job_id = p.process_forwarded_submission("7", answers, 1)
+    deadline = time.monotonic() + 5
+    while (st := p.get_job_status(job_id))["state"] not in ("done", "delivered"):
+        assert time.monotonic() < deadline, st
+        time.sleep(0.01)
+    assert st["roll"] == "7" and st["final"] == apply_penalty(50, 1) == 40
+
+class _Writer:
+    def __init__(self):
+        self.sent, self.closed = b"", False
+    def write(self, data): self.sent += data
+    async def drain(self): pass
+    def close(self): self.closed = True
+
+@pytest.mark.parametrize("payload", [b"", b"i\x00\x01", b"l\x00\x00\x00\x02N", b"s\xff\xff"])
+def test_async_server_drops_malformed_frame(payload):
+    async def run():
+        srv = AsyncXMLRPCServer("127.0.0.1", 0)
+        reader, writer = asyncio.StreamReader(), _Writer()
+        reader.feed_data(binrpc.FRAME_MARK + struct.pack(">I", len(payload)) + payload)
+        await srv._serve_conn(reader, writer)  # must not raise out of the connection task
+        return writer, srv.connections
+    writer, connections = asyncio.run(run())
+    assert writer.closed and writer.sent == b"" and connections == 0
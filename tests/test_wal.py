@@ -0,0 +1,92 @@
+# test_wal.py – WAL segments and snapshots, and server state rebuilt from them
+import random, time
+
+from wal import WriteAheadLog
+
+def test_snapshot_then_tail(tmp_path):
+    wal = WriteAheadLog(tmp_path, fsync_interval=0.001)
+    assert wal.wait(wal.append("ans", "1", 1, 2))
+    segment = wal.rotate()
+    wal.write_snapshot({"sheets": {"1": "02"}}, segment)
+    wal.append("ans", "1", 2, 3)
+    wal.append("final", "1", 20)
+    wal.sync()
+    with open(wal._seg_path(segment), "a", encoding="utf-8") as f:
+        f.write("ans\t1\t3")  # torn by a crash mid-write
+    again = WriteAheadLog(tmp_path)
+    state, events = again.load()
+    assert state == {"sheets": {"1": "02"}}
+    assert list(events) == [["ans", "1", "2", "3"], ["final", "1", "20"]]
+    assert wal._segments() == [segment]  # the segment before the snapshot is gone
+    assert again.segment > segment
+
+def _state(server):
+    students = {r: (bytes(rec.sheet), rec.raw, rec.final, rec.submitted, rec.deadline)
+                for r, rec in server.exam.items()}
+    return students, dict(server.students_registry), server.exam.active, server.exam.started_at
+
+def test_server_replays_snapshot_and_tail(fresh_server, restart_server):
+    server, rng = fresh_server, random.Random(5)
+    now = time.time()
+    server.exam.set_active(True, now, log=lambda: server.wal.append("start", now))
+    for r in range(1, 31):
+        server.register_student(str(r), f"http://127.0.0.1:{9100 + r}/")
+
+    def answer_some():
+        for _ in range(300):
+            batch = {str(q): rng.randint(0, 4) for q in rng.sample(server.exam.qnums, 3)}
+            server.submit_mcq_answers_bulk(str(rng.randint(1, 30)), batch)
+
+    answer_some()
+    server.get_exam_paper("3")  # starts roll 3's clock
+    server.take_snapshot()
+    answer_some()
+    server.extend_deadline("3", 60)
+    server.wal.wait(server._record_finals({"4": 70}))
+    assert server.submit_mcq_answers_bulk("4", {"1": 2}) is False
+    before = _state(server)
+
+    server = restart_server()
+    assert _state(server) == before
+    assert server.exam.get("3").timer.pending and server.exam_end.pending
+
+def test_server_drops_an_ended_exam(fresh_server, restart_server):
+    server = fresh_server
+    now = time.time()
+    server.exam.set_active(True, now, log=lambda: server.wal.append("start", now))
+    server.register_student("1", "http://127.0.0.1:9101/")
+    server.submit_mcq_answers_bulk("1", {"1": 2})
+    server.exam.set_active(False, log=lambda: server.wal.append("end"))
+
+    server = restart_server()
+    assert len(server.exam) == 0 and not server.students_registry
+    assert server.exam.started_at is None
+    server = restart_server()  # and it stays dropped
+    assert len(server.exam) == 0 and not server.students_registry
+
+class _Teacher:
+    def __init__(self): self.marks = {}
+    def update_mcq_marks_bulk(self, scores): self.marks.update(scores)
+
+def test_crash_during_finalise_keeps_marks(fresh_server, restart_server, serve, monkeypatch):
+    server, teacher = fresh_server, _Teacher()
+    monkeypatch.setattr(server, "teacher_proxy", teacher)
+
+    def get_job_status(job_id):
+        return {"job_id": job_id, "state": "done", "roll": "3", "final": 17}
+
+    backup = serve([get_job_status])
+    now = time.time()
+    server.exam.set_active(True, now, log=lambda: server.wal.append("start", now))
+    for r in "12345":
+        server.register_student(r, f"http://127.0.0.1:910{r}/")
+        server.submit_mcq_answers_bulk(r, {"1": 2, "2": 2, "3": int(r) % 3})
+    server.wal.wait(server._record_finals({"1": 30}))
+    # at the crash: 2 was queued locally, 3 and 4 forwarded (4's backup is gone), 5 never claimed
+    server.wal.append("fwd", "3", backup, "job-3")
+    server.wal.append("fwd", "4", "http://127.0.0.1:9/", "job-4")
+    server.exam.set_active(False, log=lambda: server.wal.append("end"))
+
+    server = restart_server()
+    assert teacher.marks == {"2": 30, "3": 17, "4": 20, "5": 30}
+    assert len(server.exam) == 0 and not server.forwarded_jobs
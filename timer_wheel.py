@@ -0,0 +1,117 @@
+# timer_wheel.py – hierarchical timing wheel: many timers on one thread, O(1) schedule and cancel
+import math, threading, time, traceback
+
+TICK = 0.05   # seconds per slot of the finest wheel
+BITS = 8      # each wheel has 2**BITS slots
+LEVELS = 4    # 2**32 ticks of 50 ms: further-out timers are parked in the last slot and re-filed
+SLOTS = 1 << BITS
+MASK = SLOTS - 1
+
+class Timer:
+    __slots__ = ("wheel", "due", "fn", "args", "slot")
+    def __init__(self, wheel, due, fn, args):
+        self.wheel, self.due, self.fn, self.args = wheel, due, fn, args
+        self.slot = None  # the dict this timer sits in; None once fired or cancelled
+
+    def cancel(self):
+        """Drop the timer if it has not fired yet; returns True if it was pending."""
+        return self.wheel.cancel(self)
+
+    @property
+    def pending(self):
+        return self.slot is not None
+
+class TimingWheel:
+    """
+    Timers for 100k+ deadlines without a thread (or a heap entry) each.
+    Level 0 has one slot per tick; each level above covers SLOTS times the
+    span of the one below. A timer goes into the finest level whose span
+    reaches it and moves down a level each time the wheel below wraps, so
+    schedule() and cancel() are a dict insert/delete and a tick only
+    touches the timers that are due.
+
+    Callbacks run on the wheel's thread, in due order between ticks but in
+    no particular order within one; hand anything slow to another thread.
+    """
+    def __init__(self, tick=TICK):
+        self.tick = tick
+        self._lock = threading.Lock()
+        self._wheels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self._t0 = time.monotonic()
+        self._now = 0  # last tick processed
+        self._count = 0
+        self._thread = None
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, delay, fn, *args):
+        """Call fn(*args) on the wheel thread after `delay` seconds (rounded up to a tick)."""
+        due = math.ceil((time.monotonic() + max(0.0, delay) - self._t0) / self.tick)
+        with self._lock:
+            t = Timer(self, max(due, self._now + 1), fn, args)
+            self._file(t)
+            self._count += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+                self._thread.start()
+        return t
+
+    def cancel(self, t):
+        with self._lock:
+            if t.slot is None:
+                return False
+            del t.slot[t]
+            t.slot = None
+            self._count -= 1
+            return True
+
+    def _file(self, t):
+        # caller holds the lock
+        due, now = t.due, self._now
+        for level in range(LEVELS):
+            shift = level * BITS
+            if (due >> shift) - (now >> shift) < SLOTS:
+                index = (due >> shift) & MASK
+                break
+        else:  # beyond the top wheel: wait in its furthest slot, then be filed again
+            index = ((now >> shift) + SLOTS - 1) & MASK
+        t.slot = self._wheels[level][index]
+        t.slot[t] = None
+
+    def _advance(self):
+        # caller holds the lock; returns the timers due at the new tick
+        self._now += 1
+        now = self._now
+        for level in range(1, LEVELS):
+            shift = level * BITS
+            if now & ((1 << shift) - 1):
+                break
+            slot = self._wheels[level][(now >> shift) & MASK]
+            if slot:
+                moved = list(slot)
+                slot.clear()
+                for t in moved:
+                    self._file(t)
+        slot = self._wheels[0][now & MASK]
+        fired = list(slot)
+        slot.clear()
+        for t in fired:
+            t.slot = None
+        self._count -= len(fired)
+        return fired
+
+    def _run(self):
+        while True:
+            target = int((time.monotonic() - self._t0) / self.tick)
+            while True:
+                with self._lock:
+                    if self._now >= target:
+                        break
+                    fired = self._advance()
+                for t in fired:
+                    try:
+                        t.fn(*t.args)
+                    except Exception:
+                        traceback.print_exc()
+            time.sleep(max(0.0, self._t0 + (target + 1) * self.tick - time.monotonic()))
@@ -0,0 +1,145 @@
+# wal.py – append-only write-ahead log with group-commit fsync and snapshots
+import os, json, time, threading
+from pathlib import Path
+
+FSYNC_INTERVAL = 0.01  # seconds between group commits
+
+class WriteAheadLog:
+    """
+    Events are tab-separated text lines ("kind<TAB>field<TAB>...") appended to
+    numbered segment files (wal-000001.log, ...). A background thread flushes
+    and fsyncs all pending writes every `fsync_interval` seconds, and callers
+    that need durability wait() for the sequence number append() gave them.
+
+    A snapshot records the full state as of the start of a segment; once it
+    is on disk, older segments are deleted. Recovery loads the newest snapshot
+    and replays only the segments written after it.
+    """
+    def __init__(self, directory, fsync_interval=FSYNC_INTERVAL):
+        self.dir = Path(directory)
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._durable = threading.Condition(threading.Lock())
+        self._seq = 0          # last sequence number handed out
+        self._durable_seq = 0  # last sequence number known to be on disk
+        self.events_since_snapshot = 0
+        # never reuse a segment number at or below the newest log or snapshot
+        self.segment = max(self._segments() + self._snapshots() + [0]) + 1
+        self._f = None
+        self._syncer = None
+
+    # ---- files ----
+    def _seg_path(self, n):
+        return self.dir / f"wal-{n:06d}.log"
+
+    def _segments(self):
+        return sorted(int(p.stem[4:]) for p in self.dir.glob("wal-*.log"))
+
+    def _snapshot_path(self, segment):
+        return self.dir / f"snapshot-{segment:06d}.json"
+
+    def _snapshots(self):
+        return sorted(int(p.stem[9:]) for p in self.dir.glob("snapshot-*.json"))
+
+    # ---- writing ----
+    def append(self, kind, *fields):
+        """Append one event; returns its sequence number for wait()."""
+        line = "\t".join((kind,) + tuple(str(f) for f in fields)) + "\n"
+        with self._lock:
+            if self._f is None:
+                self.dir.mkdir(parents=True, exist_ok=True)
+                self._f = open(self._seg_path(self.segment), "a", encoding="utf-8", buffering=1 << 16)
+                self._start_syncer()
+            self._f.write(line)
+            self._seq += 1
+            self.events_since_snapshot += 1
+            return self._seq
+
+    def wait(self, seq, timeout=1.0):
+        """Block until event `seq` has been fsynced (or `timeout` passes)."""
+        with self._durable:
+            return self._durable.wait_for(lambda: self._durable_seq >= seq, timeout)
+
+    def sync(self):
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.flush()
+            seq = self._seq
+            fd, segment = self._f.fileno(), self.segment
+        try:
+            os.fsync(fd)
+        except OSError:
+            if segment == self.segment:
+                raise
+            # rotate() closed the file under us; it fsynced everything itself
+        with self._durable:
+            self._durable_seq = max(self._durable_seq, seq)
+            self._durable.notify_all()
+
+    def _start_syncer(self):
+        if self._syncer is None:
+            self._syncer = threading.Thread(target=self._sync_loop, name="wal-sync", daemon=True)
+            self._syncer.start()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.fsync_interval)
+            if self._durable_seq < self._seq:
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"[WAL] fsync failed: {e}")
+
+    # ---- snapshots ----
+    def rotate(self):
+        """Start a new segment; returns its number. Call while the state is quiescent."""
+        with self._lock:
+            if self._f is not None:
+                self._f.flush()
+                os.fsync(self._f.fileno())
+                self._f.close()
+                self._f = None
+            self.segment += 1
+            self.events_since_snapshot = 0
+            with self._durable:
+                self._durable_seq = self._seq
+                self._durable.notify_all()
+            return self.segment
+
+    def write_snapshot(self, state, segment):
+        """Persist `state` as of the start of `segment`, then drop older segments."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        path = self._snapshot_path(segment)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segment": segment, "taken_at": time.time(), "state": state}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        for n in self._snapshots():
+            if n < segment:
+                self._snapshot_path(n).unlink()
+        for n in self._segments():
+            if n < segment:
+                self._seg_path(n).unlink()
+
+    # ---- recovery ----
+    def load(self):
+        """Return (snapshot state or None, iterator over events as lists of fields)."""
+        state, first = None, 0
+        snaps = self._snapshots()
+        if snaps:
+            with open(self._snapshot_path(snaps[-1]), encoding="utf-8") as f:
+                snap = json.load(f)
+            state, first = snap["state"], snap["segment"]
+        return state, self._events(first)
+
+    def _events(self, first):
+        for n in self._segments():
+            if n < first:
+                continue
+            with open(self._seg_path(n), encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):  # a torn last line from a crash is skipped
+                        yield line[:-1].split("\t")
@@ -0,0 +1,74 @@
+# work_queue.py – bounded job queue served by a fixed worker pool
+import time, queue, threading
+
+class WorkQueue:
+    """
+    Runs `handler(job)` on `workers` long-lived threads. The queue holds at
+    most `maxsize` waiting jobs; submit() returns False instead of blocking
+    when it is full. Wait and service times are tracked so callers can ask
+    how long a new job would wait before deciding to send it elsewhere.
+    """
+    def __init__(self, handler, workers=3, maxsize=1000, expected_service=1.0, name="worker"):
+        self.handler = handler
+        self.workers = workers
+        self._q = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._alpha = 0.2  # EWMA weight of the newest sample
+        self._ewma_service = float(expected_service)
+        self._ewma_wait = 0.0
+        self.submitted = self.completed = self.failed = self.rejected = 0
+        self.max_wait = self.max_service = 0.0
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True).start()
+
+    def submit(self, job):
+        try:
+            self._q.put_nowait((job, time.monotonic()))
+        except queue.Full:
+            with self._lock: self.rejected += 1
+            return False
+        with self._lock: self.submitted += 1
+        return True
+
+    def depth(self):
+        return self._q.qsize()
+
+    def projected_wait(self):
+        """Seconds a job submitted now would wait before a worker picks it up."""
+        with self._lock:
+            ahead = self._q.qsize() + self._busy - self.workers + 1
+            return max(0, ahead) / self.workers * self._ewma_service
+
+    def _run(self):
+        while True:
+            job, queued_at = self._q.get()
+            start = time.monotonic()
+            with self._lock:
+                self._busy += 1
+                wait = start - queued_at
+                self._ewma_wait += self._alpha * (wait - self._ewma_wait)
+                self.max_wait = max(self.max_wait, wait)
+            ok = True
+            try:
+                self.handler(job)
+            except Exception as e:
+                ok = False
+                print(f"[WorkQueue] job {job!r} failed: {e}")
+            service = time.monotonic() - start
+            with self._lock:
+                self._busy -= 1
+                self._ewma_service += self._alpha * (service - self._ewma_service)
+                self.max_service = max(self.max_service, service)
+                if ok: self.completed += 1
+                else: self.failed += 1
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "workers": self.workers, "busy": self._busy, "queue_depth": self._q.qsize(),
+                "submitted": self.submitted, "completed": self.completed,
+                "failed": self.failed, "rejected": self.rejected,
+                "avg_wait": round(self._ewma_wait, 4), "max_wait": round(self.max_wait, 4),
+                "avg_service": round(self._ewma_service, 4), "max_service": round(self.max_service, 4),
+            }